@@ -1,8 +1,9 @@
 import pytest
+from django.core.cache import cache
 from django.test import Client
-from ninja_jwt.tokens import RefreshToken
 from pytest_factoryboy import register, LazyFixture
 
+from kitchen.cache import reference_cache
 from kitchen.tests.factories import (
     RecipeFactory,
     UnitFactory,
@@ -13,8 +14,16 @@ from kitchen.tests.factories import (
     ManufacturerFactory,
     RecipeIngredientFactory,
 )
+from shared.budgets import get_query_budget
 from users.models import CustomUser
 from users.tests.factories import CustomUserFactory
+from users.tokens import UserRefreshToken
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    reference_cache.clear()
 
 
 @pytest.fixture
@@ -30,7 +39,7 @@ def password():
 @pytest.fixture
 def access_token(user):
     """Returns a JWT access token for the default user."""
-    refresh = RefreshToken.for_user(user)
+    refresh = UserRefreshToken.for_user(user)
     return str(refresh.access_token)
 
 
@@ -46,7 +55,7 @@ def get_authenticated_client(client):
     """Returns a function that creates an authenticated client for any user."""
 
     def _get(user: CustomUser):
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
         client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {access_token}"
         return client
@@ -54,6 +63,22 @@ def get_authenticated_client(client):
     return _get
 
 
+@pytest.fixture
+def assert_query_budget(django_assert_max_num_queries):
+    """Fails when the request inside exceeds the view's declared query budget."""
+
+    def _assert(view, chunks: int = 1):
+        budget = get_query_budget(view, chunks)
+        assert budget is not None, f"{view.__qualname__} declares no query budget"
+        # Reloading reference tables is paid once per change, not per request;
+        # the version check is still counted
+        reference_cache.refresh()
+        reference_cache.invalidate()
+        return django_assert_max_num_queries(budget)
+
+    return _assert
+
+
 register(CustomUserFactory, "user")
 register(CustomUserFactory, "other_user")
 register(UnitFactory)
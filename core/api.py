@@ -5,10 +5,13 @@ from django.http import HttpResponseForbidden
 from ninja_extra import NinjaExtraAPI
 
 from kitchen.api.appliances.api import AppliancesController
+from kitchen.api.bootstrap import BootstrapController
 from kitchen.api.ingredients import IngredientsController
 from kitchen.api.recipes import RecipesController
 from kitchen.api.drafts import RecipeDraftsController
 from kitchen.api.units import UnitsController
+from shared.api import MetricsController
+from shared.renderers import ORJSONParser, ORJSONRenderer
 from users.api.auth import router as auth_router
 from users.api.users import UserModelController
 
@@ -35,7 +38,11 @@ def staff_or_secret_required(view_func):
     return _wrapped_view
 
 
-api = NinjaExtraAPI(docs_decorator=staff_or_secret_required)
+api = NinjaExtraAPI(
+    docs_decorator=staff_or_secret_required,
+    renderer=ORJSONRenderer(),
+    parser=ORJSONParser(),
+)
 
 api.register_controllers(UserModelController)
 api.register_controllers(RecipesController)
@@ -43,5 +50,7 @@ api.register_controllers(RecipeDraftsController)
 api.register_controllers(IngredientsController)
 api.register_controllers(UnitsController)
 api.register_controllers(AppliancesController)
+api.register_controllers(BootstrapController)
+api.register_controllers(MetricsController)
 
 api.add_router("/auth", auth_router)
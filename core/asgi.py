@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_asgi_application()
+
+# Imported once the app registry is ready
+from kitchen.cache import reference_cache
+
+reference_cache.warm()
@@ -67,6 +67,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "shared.metrics.RequestMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -106,6 +107,30 @@ DATABASES = {
     )
 }
 
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) when running several workers
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# Units, manufacturers and appliance types are kept in process memory; each
+# worker checks the database version counters at most this often (seconds)
+REFERENCE_CACHE_CHECK_INTERVAL = float(
+    os.environ.get("REFERENCE_CACHE_CHECK_INTERVAL", "1")
+)
+
+# Recipe detail rendering: "orm" serializes prefetched models, "sql" has Postgres
+# build the whole document with json_build_object/json_agg in one query
+RECIPE_DETAIL_BACKEND = os.environ.get("RECIPE_DETAIL_BACKEND", "orm")
+
 # Auth user model
 AUTH_USER_MODEL = "users.CustomUser"
 
@@ -11,11 +11,12 @@ from .models import (
     Recipe,
     RecipeIngredient,
     Unit,
+    UnitConversion,
 )
+from .signals import invalidate_recipes
 
 admin.site.register(Unit)
-admin.site.register(Ingredient)
-admin.site.register(RecipeIngredient)
+admin.site.register(UnitConversion)
 
 logger = logging.getLogger(__name__)
 
@@ -44,9 +45,54 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ["uid"]
     inlines = [InstructionInline, RecipeIngredientInline, ApplianceInline]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Recipe.objects.filter(uid=form.instance.uid).update_search_fields()
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    fields = ["name", "image", "density"]
+    readonly_fields = ["uid"]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "name" in form.changed_data:
+            Recipe.objects.filter(ingredients=obj).update_search_fields()
+
+
+class RecipeChildAdmin(admin.ModelAdmin):
+    """
+    Recipe children edited on their own page. Deletes skip the signals (to
+    keep cascades fast), so the recipe is refreshed and invalidated here.
+    """
+
+    @staticmethod
+    def refresh_recipes(uids):
+        Recipe.objects.filter(uid__in=uids).update_search_fields()
+        invalidate_recipes(*uids)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.refresh_recipes([obj.recipe_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.refresh_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        uids = set(queryset.values_list("recipe_id", flat=True))
+        super().delete_queryset(request, queryset)
+        self.refresh_recipes(uids)
+
+
+@admin.register(RecipeIngredient)
+class RecipeIngredientAdmin(RecipeChildAdmin):
+    pass
+
 
 @admin.register(Instruction)
-class InstructionAdmin(admin.ModelAdmin):
+class InstructionAdmin(RecipeChildAdmin):
     fields = ["step", "description", "timer"]
     readonly_fields = ["uid"]
 
@@ -56,6 +102,11 @@ class ApplianceAdmin(admin.ModelAdmin):
     fields = ["model", "manufacturer", "type"]
     readonly_fields = ["uid"]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "type" in form.changed_data:
+            Recipe.objects.filter(appliances=obj).update_search_fields()
+
 
 @admin.register(ApplianceType)
 class ApplianceTypeAdmin(admin.ModelAdmin):
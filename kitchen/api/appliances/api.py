@@ -1,15 +1,34 @@
 import uuid
-from ninja_extra import api_controller, ControllerBase, http_get, http_post, status
+
+from asgiref.sync import sync_to_async
+from django.db.transaction import atomic
+from ninja_extra import (
+    api_controller,
+    ControllerBase,
+    http_get,
+    http_post,
+    http_put,
+    status,
+)
 from ninja_extra.exceptions import ValidationError
 from ninja_jwt.authentication import JWTAuth, AsyncJWTAuth
+from uuid6 import uuid7
 
-from kitchen.api.appliances.schemes import ApplianceSchema, ApplianceCreateSchema
-from kitchen.models import Appliance, Manufacturer, ApplianceType
+from kitchen.api.appliances.schemes import (
+    ApplianceSchema,
+    ApplianceCreateSchema,
+    OwnedAppliancesSchema,
+)
+from kitchen.cache import reference_cache
+from kitchen.models import Appliance, Manufacturer, ApplianceType, OwnedAppliance
+from shared.budgets import query_budget
+from users.authentication import AsyncTokenUserJWTAuth
 
 
 @api_controller("/kitchen/appliances", tags=["Appliances"])
 class AppliancesController(ControllerBase):
     @http_get("/", response=list[ApplianceSchema])
+    @query_budget(2)
     async def list_appliances(
         self,
         request,
@@ -17,13 +36,61 @@ class AppliancesController(ControllerBase):
         type_uid: uuid.UUID | None = None,
     ) -> list[Appliance]:
         """List appliances. Can be filtered by manufacturer and/or type."""
-        qs = Appliance.objects.select_related("manufacturer", "type")
         filters = {}
         if manufacturer_uid:
-            filters["manufacturer__uid"] = manufacturer_uid
+            filters["manufacturer_id"] = manufacturer_uid
         if type_uid:
-            filters["type__uid"] = type_uid
-        return [appliance async for appliance in qs.filter(**filters)]
+            filters["type_id"] = type_uid
+        appliances = [a async for a in Appliance.objects.filter(**filters)]
+        return await reference_cache.aattach(
+            appliances, manufacturer=Manufacturer, type=ApplianceType
+        )
+
+    @http_get("/mine", response=list[ApplianceSchema], auth=AsyncTokenUserJWTAuth())
+    @query_budget(2)
+    async def list_my_appliances(self, request) -> list[Appliance]:
+        """The appliances in the caller's kitchen."""
+        appliances = [
+            a
+            async for a in Appliance.objects.filter(
+                ownedappliance__user_id=request.user.uid
+            ).order_by("model")
+        ]
+        return await reference_cache.aattach(
+            appliances, manufacturer=Manufacturer, type=ApplianceType
+        )
+
+    @http_put("/mine", response=list[ApplianceSchema], auth=AsyncJWTAuth())
+    @query_budget(7)
+    async def set_my_appliances(self, request, payload: OwnedAppliancesSchema):
+        """
+        Replace the appliances in the caller's kitchen, which recipes can be
+        filtered by (``kitchen=appliances|types`` on the recipe list).
+        """
+        wanted = set(payload.appliance_uids)
+        appliances = [
+            a async for a in Appliance.objects.filter(uid__in=wanted).order_by("model")
+        ]
+        if len(appliances) != len(wanted):
+            raise ValidationError(detail="Appliance does not exist", code="invalid")
+        await sync_to_async(self.save_owned)(request.user.uid, wanted)
+        return await reference_cache.aattach(
+            appliances, manufacturer=Manufacturer, type=ApplianceType
+        )
+
+    @staticmethod
+    def save_owned(user_uid: uuid.UUID, appliance_uids: set[uuid.UUID]) -> None:
+        with atomic():
+            OwnedAppliance.objects.filter(user_id=user_uid).exclude(
+                appliance_id__in=appliance_uids
+            ).delete()
+            OwnedAppliance.objects.bulk_create(
+                [
+                    OwnedAppliance(uid=uuid7(), user_id=user_uid, appliance_id=uid)
+                    for uid in appliance_uids
+                ],
+                ignore_conflicts=True,
+            )
 
     @http_post(
         "/",
@@ -33,21 +100,27 @@ class AppliancesController(ControllerBase):
         },
         auth=AsyncJWTAuth(),
     )
+    @query_budget(5)
     async def create_appliance(self, request, payload: ApplianceCreateSchema):
         existing_appliance = await Appliance.objects.filter(
             model=payload.model,
-            manufacturer__uid=payload.manufacturer_uid,
-            type__uid=payload.type_uid,
+            manufacturer_id=payload.manufacturer_uid,
+            type_id=payload.type_uid,
         ).afirst()
         if existing_appliance:
+            (existing_appliance,) = await reference_cache.aattach(
+                [existing_appliance], manufacturer=Manufacturer, type=ApplianceType
+            )
             return status.HTTP_200_OK, existing_appliance
-        try:
-            manufacturer = await Manufacturer.objects.aget(uid=payload.manufacturer_uid)
-        except Manufacturer.DoesNotExist:
+        manufacturer = (await reference_cache.aget(Manufacturer)).get(
+            payload.manufacturer_uid
+        )
+        if manufacturer is None:
             raise ValidationError(detail="Manufacturer does not exist", code="invalid")
-        try:
-            appliance_type = await ApplianceType.objects.aget(uid=payload.type_uid)
-        except ApplianceType.DoesNotExist:
+        appliance_type = (await reference_cache.aget(ApplianceType)).get(
+            payload.type_uid
+        )
+        if appliance_type is None:
             raise ValidationError(
                 detail="Appliance type does not exist", code="invalid"
             )
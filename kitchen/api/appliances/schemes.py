@@ -37,3 +37,7 @@ class ApplianceCreateSchema(Schema):
     model: str
     manufacturer_uid: uuid.UUID
     type_uid: uuid.UUID
+
+
+class OwnedAppliancesSchema(Schema):
+    appliance_uids: list[uuid.UUID]
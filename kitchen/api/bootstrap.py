@@ -0,0 +1,113 @@
+import uuid
+
+from django.http import HttpResponse
+from ninja import Schema
+from ninja_extra import ControllerBase, api_controller, http_get, status
+
+from kitchen.api.appliances.schemes import ApplianceSchema
+from kitchen.api.ingredients import IngredientSchema
+from kitchen.api.units import UnitSchema
+from kitchen.cache import reference_cache
+from kitchen.catalogue import catalogue_version
+from kitchen.etags import content_etag, etag_matches
+from kitchen.models import Appliance, ApplianceType, Ingredient, Manufacturer, Unit
+from shared.budgets import query_budget
+
+BOOTSTRAP_INGREDIENTS = 200
+MAX_BOOTSTRAP_INGREDIENTS = 2000
+
+
+class BootstrapSchema(Schema):
+    catalogue_version: str
+    units: list[UnitSchema]
+    appliances: list[ApplianceSchema]
+    ingredients: list[IngredientSchema]
+
+
+class CompactBootstrapSchema(Schema):
+    """Rows as arrays; appliances point at manufacturers and types by uid."""
+
+    catalogue_version: str
+    units: list[tuple[uuid.UUID, str, str, str | None]]
+    manufacturers: list[tuple[uuid.UUID, str]]
+    appliance_types: list[tuple[uuid.UUID, str]]
+    appliances: list[tuple[uuid.UUID, str, uuid.UUID, uuid.UUID]]
+    ingredients: list[tuple[uuid.UUID, str]]
+
+
+def _by_name(model) -> list:
+    return sorted(reference_cache.get(model).values(), key=lambda obj: obj.name)
+
+
+def bootstrap_document(ingredients: int, compact: bool) -> dict:
+    """
+    Everything the recipe editor starts from. Rows are in a stable order so
+    the same data always renders to the same bytes, whichever worker loaded it.
+    """
+    version = catalogue_version()
+    appliances = reference_cache.attach(
+        Appliance.objects.order_by("model"),
+        manufacturer=Manufacturer,
+        type=ApplianceType,
+    )
+    top = Ingredient.objects.order_by("-usage", "-uid")[:ingredients]
+    if compact:
+        return {
+            "catalogue_version": version,
+            "units": [
+                [u.uid, u.abbreviation, u.name, u.dimension] for u in _by_name(Unit)
+            ],
+            "manufacturers": [[m.uid, m.name] for m in _by_name(Manufacturer)],
+            "appliance_types": [[t.uid, t.name] for t in _by_name(ApplianceType)],
+            "appliances": [
+                [a.uid, a.model, a.manufacturer_id, a.type_id] for a in appliances
+            ],
+            "ingredients": list(top.values_list("uid", "name")),
+        }
+    return {
+        "catalogue_version": version,
+        "units": [UnitSchema.from_orm(u).model_dump() for u in _by_name(Unit)],
+        "appliances": [ApplianceSchema.from_orm(a).model_dump() for a in appliances],
+        "ingredients": [IngredientSchema.from_orm(i).model_dump() for i in top],
+    }
+
+
+@api_controller("/kitchen/bootstrap", tags=["Bootstrap"])
+class BootstrapController(ControllerBase):
+    @http_get(
+        "/",
+        response={
+            status.HTTP_200_OK: BootstrapSchema | CompactBootstrapSchema,
+            status.HTTP_304_NOT_MODIFIED: None,
+        },
+    )
+    @query_budget(4)
+    def bootstrap(
+        self,
+        request,
+        ingredients: int = BOOTSTRAP_INGREDIENTS,
+        compact: bool = False,
+    ):
+        """
+        Units, appliances and the ``ingredients`` most used ingredients in one
+        response, for the recipe editor. ``compact`` returns rows as arrays
+        with manufacturers and types listed once. The ETag hashes the whole
+        body; keep ``catalogue_version`` to ask ``/ingredients/changes`` later.
+        """
+        limit = max(0, min(ingredients, MAX_BOOTSTRAP_INGREDIENTS))
+        content = self.api.renderer.render(
+            request,
+            bootstrap_document(limit, compact),
+            response_status=status.HTTP_200_OK,
+        )
+        etag = content_etag(content)
+        if etag_matches(request, etag):
+            self.context.response["ETag"] = etag
+            return status.HTTP_304_NOT_MODIFIED, None
+        response = HttpResponse(
+            content,
+            content_type=f"{self.api.renderer.media_type}; "
+            f"charset={self.api.renderer.charset}",
+        )
+        response["ETag"] = etag
+        return response
@@ -1,8 +1,8 @@
 import uuid
 
-from django.db.models import Prefetch
+from asgiref.sync import sync_to_async
 from django.db.transaction import atomic
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404
 from ninja_extra import (
     ControllerBase,
     api_controller,
@@ -12,44 +12,73 @@ from ninja_extra import (
     http_post,
     status,
 )
-from ninja_jwt.authentication import JWTAuth
+from ninja_jwt.authentication import AsyncJWTAuth
 
 from kitchen.api.schemes import DraftSchema, RecipeSchema
-from kitchen.models import Appliance, Instruction, Recipe, RecipeIngredient
+from kitchen.etags import (
+    etag_matches,
+    make_etag,
+    recipe_list_etag,
+    recipe_state,
+    recipe_state_values,
+)
+from kitchen.models import Appliance, Recipe
+from kitchen.reconcile import reconcile_ingredients, reconcile_instructions
+from shared.budgets import query_budget
 from users.api.users import ValidationException
-from users.authentication import OptionalJWTAuth
+from users.authentication import AsyncOptionalJWTAuth, AsyncTokenUserJWTAuth
 
 
-@api_controller("/kitchen/recipes/drafts", tags=["RecipeDrafts"], auth=JWTAuth())
+@api_controller("/kitchen/recipes/drafts", tags=["RecipeDrafts"], auth=AsyncJWTAuth())
 class RecipeDraftsController(ControllerBase):
     @staticmethod
     def get_queryset(request):
         if not request.user.is_authenticated:
             return Recipe.objects.none()
-        return (
-            Recipe.objects.select_related("author")
-            .prefetch_related(
-                "instructions",
-                Prefetch(
-                    "appliances",
-                    queryset=Appliance.objects.select_related("manufacturer", "type"),
-                ),
-                "recipeingredient_set__ingredient",
-                "recipeingredient_set__unit",
-            )
-            .filter(is_draft=True, author=request.user)
+        return Recipe.objects.with_relations().filter(
+            is_draft=True, author_id=request.user.uid
         )
 
     @http_get(
         "/",
-        response=list[RecipeSchema],
+        response={
+            status.HTTP_200_OK: list[RecipeSchema],
+            status.HTTP_304_NOT_MODIFIED: None,
+        },
+        auth=AsyncTokenUserJWTAuth(),
     )
-    def list_drafts(self, request):
-        return self.get_queryset(request)
+    @query_budget(5)
+    async def list_drafts(self, request):
+        queryset = self.get_queryset(request)
+        etag = await recipe_list_etag(queryset, request)
+        self.context.response["ETag"] = etag
+        if etag_matches(request, etag):
+            return status.HTTP_304_NOT_MODIFIED, None
+        return [recipe async for recipe in queryset]
 
-    @http_get("/{uuid:uid}", response=RecipeSchema, auth=OptionalJWTAuth())
-    def get_draft(self, request, uid: uuid.UUID):
-        return get_object_or_404(self.get_queryset(request), uid=uid)
+    @http_get(
+        "/{uuid:uid}",
+        response={
+            status.HTTP_200_OK: RecipeSchema,
+            status.HTTP_304_NOT_MODIFIED: None,
+        },
+        auth=AsyncOptionalJWTAuth(),
+    )
+    @query_budget(4)
+    async def get_draft(self, request, uid: uuid.UUID):
+        queryset = self.get_queryset(request).filter(uid=uid)
+        if request.headers.get("If-None-Match"):
+            state = await recipe_state_values(queryset).afirst()
+            if state and etag_matches(request, make_etag(*state)):
+                self.context.response["ETag"] = make_etag(*state)
+                return status.HTTP_304_NOT_MODIFIED, None
+
+        recipe = await aget_object_or_404(queryset)
+        etag = make_etag(*recipe_state(recipe))
+        self.context.response["ETag"] = etag
+        if etag_matches(request, etag):
+            return status.HTTP_304_NOT_MODIFIED, None
+        return recipe
 
     @http_post(
         "/",
@@ -59,41 +88,39 @@ class RecipeDraftsController(ControllerBase):
             status.HTTP_400_BAD_REQUEST: dict,
         },
     )
-    def create_draft(self, request):
-        if self.get_queryset(request).exists():
-            return self.get_queryset(request).first()
-        recipe = Recipe.objects.create(author=request.user)
-        return status.HTTP_201_CREATED, recipe
+    @query_budget(7)
+    async def create_draft(self, request):
+        draft = await self.get_queryset(request).afirst()
+        if draft:
+            return draft
+        recipe = await Recipe.objects.acreate(author_id=request.user.uid)
+        return status.HTTP_201_CREATED, await self.get_queryset(request).aget(
+            uid=recipe.uid
+        )
 
     @http_patch(
         "/{uuid:uid}",
         response=RecipeSchema,
     )
-    def update_draft(self, request, uid: uuid.UUID, payload: DraftSchema):
+    @query_budget(22)
+    async def update_draft(self, request, uid: uuid.UUID, payload: DraftSchema):
+        recipe = await aget_object_or_404(self.get_queryset(request), uid=uid)
+        await sync_to_async(self.save_draft)(recipe, payload)
+        return await self.get_queryset(request).aget(uid=uid)
+
+    @staticmethod
+    def save_draft(recipe: Recipe, payload: DraftSchema) -> None:
         with atomic():
-            recipe = get_object_or_404(self.get_queryset(request), uid=uid)
             recipe_payload = payload.model_dump(exclude_unset=True)
 
             if payload.ingredients is not None:
-                recipe.recipeingredient_set.all().delete()
-                for ingredient in payload.ingredients:
-                    RecipeIngredient.objects.create(
-                        recipe=recipe,
-                        ingredient_id=ingredient.ingredient_uid,
-                        unit_id=ingredient.unit_uid,
-                        quantity=ingredient.quantity,
-                    )
+                reconcile_ingredients(recipe, payload.ingredients)
 
             if payload.instructions is not None:
-                recipe.instructions.all().delete()
-                for instruction in payload.instructions:
-                    if instruction.description.strip():
-                        Instruction.objects.create(
-                            recipe=recipe,
-                            step=instruction.step,
-                            description=instruction.description,
-                            timer=instruction.timer,
-                        )
+                reconcile_instructions(
+                    recipe,
+                    [x for x in payload.instructions if x.description.strip()],
+                )
 
             if payload.appliance_uids is not None:
                 recipe.appliances.set(
@@ -108,36 +135,42 @@ class RecipeDraftsController(ControllerBase):
                 if value is not None:
                     setattr(recipe, field, value)
             recipe.save()
-            recipe.refresh_from_db()
-            return recipe
 
     @http_delete(
         path="/{uuid:uid}",
         response={status.HTTP_204_NO_CONTENT: None},
     )
-    def delete_draft(self, request, uid: uuid.UUID):
-        recipe = get_object_or_404(self.get_queryset(request), uid=uid)
-        recipe.delete()
+    @query_budget(9)
+    async def delete_draft(self, request, uid: uuid.UUID):
+        recipe = await aget_object_or_404(self.get_queryset(request), uid=uid)
+        await recipe.adelete()
         return status.HTTP_204_NO_CONTENT, None
 
     @http_post(
         path="/{uuid:uid}/finish",
         response={status.HTTP_200_OK: None},
     )
-    def finish_draft(self, request, uid: uuid.UUID):
-        recipe = get_object_or_404(self.get_queryset(request), uid=uid)
+    @query_budget(9)
+    async def finish_draft(self, request, uid: uuid.UUID):
+        recipe = await aget_object_or_404(self.get_queryset(request), uid=uid)
 
         # Validate that the recipe is complete
         errors = {}
-        if recipe.instructions.count() == 0:
+        if not recipe.instructions.all():
             errors["instructions"] = ["Instructions are required"]
-        if recipe.recipeingredient_set.count() == 0:
+        if not recipe.recipeingredient_set.all():
             errors["ingredients"] = ["Ingredients are required"]
         if not recipe.description:
             errors["description"] = ["Description is required"]
         if errors:
             raise ValidationException(detail={"errors": errors})
 
-        recipe.is_draft = False
-        recipe.save()
+        await sync_to_async(self.publish)(recipe)
         return status.HTTP_200_OK, None
+
+    @staticmethod
+    def publish(recipe: Recipe) -> None:
+        with atomic():
+            recipe.is_draft = False
+            recipe.save()
+            Recipe.objects.filter(uid=recipe.uid).update_search_fields()
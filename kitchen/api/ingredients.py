@@ -1,8 +1,16 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.db.models.functions import Upper
 from ninja import ModelSchema, Schema
 from ninja_extra import api_controller, http_get, ControllerBase, http_post, status
+from ninja_extra.pagination import paginate
 from ninja_jwt.authentication import JWTAuth
 
+from kitchen.catalogue import catalogue_changes, catalogue_version, usage_version
+from kitchen.etags import etag_matches, make_etag
 from kitchen.models import Ingredient
+from shared.budgets import query_budget
+from shared.pagination import CursorPage, KeysetPagination
 from shared.schemes import UIDSchema
 
 
@@ -12,16 +20,85 @@ class IngredientSchema(UIDSchema, ModelSchema):
         fields = ["name"]
 
 
+class IngredientChangesSchema(Schema):
+    version: str
+    reset: bool
+    items: list[IngredientSchema]
+
+
 class IngredientCreateSchema(Schema):
     name: str
     image: str | None = None
+    density: float | None = None
 
 
 @api_controller("/kitchen/ingredients", tags=["Ingredients"])
 class IngredientsController(ControllerBase):
-    @http_get("/", response=list[IngredientSchema])
-    def list_ingredients(self, request):
-        return Ingredient.objects.all()
+    @http_get(
+        "/",
+        response={
+            status.HTTP_200_OK: CursorPage[IngredientSchema],
+            status.HTTP_304_NOT_MODIFIED: None,
+        },
+    )
+    @paginate(
+        KeysetPagination,
+        ordering=("-usage", "-uid"),
+        page_size=100,
+        max_page_size=500,
+        snapshot=usage_version,
+    )
+    @query_budget(2)
+    def list_ingredients(self, request, prefix: str | None = None):
+        """
+        The catalogue, most used ingredients first, optionally only names
+        starting with ``prefix``. ``X-Catalogue-Version`` names the catalogue
+        state the page belongs to; keep it and ask ``/changes`` for what was
+        added since instead of downloading the list again.
+        """
+        version = catalogue_version()
+        etag = make_etag(version, request.get_full_path())
+        self.context.response["ETag"] = etag
+        self.context.response["X-Catalogue-Version"] = version
+        if etag_matches(request, etag):
+            return status.HTTP_304_NOT_MODIFIED, None
+        queryset = Ingredient.objects.all()
+        if prefix and prefix.strip():
+            queryset = queryset.alias(upper_name=Upper("name")).filter(
+                upper_name__startswith=prefix.strip().upper()
+            )
+        return queryset
+
+    @http_get("/changes", response=IngredientChangesSchema)
+    @query_budget(2)
+    def ingredient_changes(self, request, since: str):
+        """Ingredients created or renamed since the ``since`` catalogue version."""
+        return catalogue_changes(since)
+
+    @http_get("/autocomplete", response=list[IngredientSchema])
+    @query_budget(1)
+    def autocomplete_ingredients(self, request, q: str, limit: int = 10):
+        """
+        Typeahead over ingredient names: prefix matches first, then the closest
+        fuzzy matches by trigram similarity. Both predicates are served by the
+        trigram index on UPPER(name).
+        """
+        term = q.strip().upper()
+        if not term:
+            return []
+        return (
+            Ingredient.objects.alias(upper_name=Upper("name"))
+            .filter(
+                Q(upper_name__startswith=term) | Q(upper_name__trigram_similar=term)
+            )
+            .annotate(
+                is_prefix=ExpressionWrapper(
+                    Q(upper_name__startswith=term), output_field=BooleanField()
+                ),
+                similarity=TrigramSimilarity("upper_name", term),
+            )
+            .order_by("-is_prefix", "-similarity", "name")[: max(1, min(limit, 50))]
+        )
 
     @http_post(
         "/",
@@ -31,6 +108,7 @@ class IngredientsController(ControllerBase):
         },
         auth=JWTAuth(),
     )
+    @query_budget(3)
     def create_ingredient(self, request, payload: IngredientCreateSchema):
         existing_ingredient = Ingredient.objects.filter(name=payload.name).first()
         if existing_ingredient:
@@ -1,8 +1,14 @@
 import uuid
 
-from django.db.models import Prefetch, Q
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import IntegrityError
+from django.db.models import F, Q
 from django.db.transaction import atomic
-from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from ninja import Query
 from ninja_extra import (
     ControllerBase,
     api_controller,
@@ -12,53 +18,339 @@ from ninja_extra import (
     http_post,
     status,
 )
-from ninja_extra.exceptions import PermissionDenied
-from ninja_jwt.authentication import JWTAuth
+from ninja_extra.exceptions import (
+    NotAuthenticated,
+    PermissionDenied,
+    ValidationError,
+)
+from ninja_extra.pagination import paginate
+from ninja_jwt.authentication import AsyncJWTAuth
+from uuid6 import uuid7
+
+from kitchen.api.schemes import (
+    CookableRecipeSchema,
+    RecipeCreateSchema,
+    RecipeSchema,
+    RecipeShortSchema,
+    ShoppingListLineSchema,
+    ShoppingListSchema,
+)
+from kitchen.cache import recipe_cache, reference_cache
+from kitchen.conversions import conversion_cache
+from kitchen.cooking import (
+    MAX_PANTRY,
+    KitchenMatch,
+    attach_missing,
+    in_kitchen,
+    rank_by_coverage,
+)
+from kitchen.documents import recipe_document
+from kitchen.etags import (
+    RECIPE_STATE_FIELDS,
+    annotate_recipe_state,
+    etag_matches,
+    make_etag,
+    recipe_page_etag,
+    recipe_state,
+    recipe_state_values,
+)
+from kitchen.exports import CHUNK_SIZE, export_chunk
+from kitchen.imports import BATCH_SIZE, RecipeImporter, render_result
+from kitchen.models import (
+    SEARCH_CONFIG,
+    Appliance,
+    Ingredient,
+    Instruction,
+    Recipe,
+    RecipeIngredient,
+    Unit,
+)
+from kitchen.reconcile import reconcile_ingredients, reconcile_instructions
+from kitchen.references import fetch_references, reference_errors
+from kitchen.shopping import MAX_SHOPPING_RECIPES, shopping_list
+from shared.budgets import query_budget
+from shared.pagination import CursorPage, KeysetPagination, MergedQuerySet
+from users.api.users import ValidationException
+from users.authentication import AsyncOptionalJWTAuth
 
-from kitchen.api.schemes import RecipeCreateSchema, RecipeSchema, RecipeShortSchema
-from kitchen.models import Appliance, Instruction, Recipe, RecipeIngredient
-from users.authentication import OptionalJWTAuth
+FEED_ORDERING = ("-updated_at", "-uid")
+feed_pagination = KeysetPagination(ordering=FEED_ORDERING)
 
 
 @api_controller("/kitchen/recipes", tags=["Recipes"])
 class RecipesController(ControllerBase):
     @staticmethod
     def get_queryset(request):
-        qs = Recipe.objects.select_related("author").filter(is_draft=False)
+        qs = (
+            Recipe.objects.select_related("author")
+            .defer("search_vector")
+            .filter(is_draft=False)
+        )
         if request.user.is_authenticated:
-            qs = qs.filter(Q(author=request.user) | Q(visibility="PUBLIC"))
+            qs = qs.filter(Q(author_id=request.user.uid) | Q(visibility="PUBLIC"))
         else:
             qs = qs.filter(visibility="PUBLIC")
         return qs.order_by("-updated_at")
 
     def get_recipe_queryset(self, request):
-        return self.get_queryset(request).prefetch_related(
-            "instructions",
-            Prefetch(
-                "appliances",
-                queryset=Appliance.objects.select_related("manufacturer", "type"),
-            ),
-            Prefetch(
-                "recipeingredient_set",
-                queryset=RecipeIngredient.objects.select_related("ingredient", "unit"),
-            ),
+        return self.get_queryset(request).with_relations()
+
+    @staticmethod
+    def filter_kitchen(queryset, request, kitchen: KitchenMatch | None):
+        if kitchen is None:
+            return queryset
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+        return in_kitchen(queryset, request.user.uid, kitchen)
+
+    def get_feed(self, request, kitchen: KitchenMatch | None = None) -> MergedQuerySet:
+        """
+        The listed recipes as disjoint branches instead of an OR: public ones,
+        plus the caller's own private ones. Each is served by a partial index
+        ordered like the feed.
+        """
+        queryset = Recipe.objects.select_related("author").defer(
+            "search_vector", "ingredient_uids", "appliance_uids", "appliance_type_uids"
+        )
+        queryset = self.filter_kitchen(queryset, request, kitchen)
+        public = Q(is_draft=False, visibility=Recipe.Visibility.PUBLIC)
+        if not request.user.is_authenticated:
+            return MergedQuerySet(queryset, public)
+        own = Q(is_draft=False, author_id=request.user.uid) & ~Q(
+            visibility=Recipe.Visibility.PUBLIC
         )
+        return MergedQuerySet(queryset, public, own)
 
     @http_get(
         "/",
+        response={
+            status.HTTP_200_OK: CursorPage[RecipeShortSchema],
+            status.HTTP_304_NOT_MODIFIED: None,
+        },
+        auth=AsyncOptionalJWTAuth(),
+    )
+    @paginate(KeysetPagination, ordering=FEED_ORDERING, pass_parameter="pagination")
+    @query_budget(2)
+    async def list_recipes(
+        self, request, kitchen: KitchenMatch | None = None, **kwargs
+    ):
+        """
+        The feed, newest first. ``kitchen`` keeps only recipes the caller can
+        make with their appliances, or with appliances of the same types.
+        """
+        feed = self.get_feed(request, kitchen)
+        page = feed_pagination.get_page_queryset(feed, kwargs["pagination"])
+        etag = await recipe_page_etag(page, request)
+        self.context.response["ETag"] = etag
+        if etag_matches(request, etag):
+            return status.HTTP_304_NOT_MODIFIED, None
+        return feed
+
+    @http_get(
+        "/search",
         response=list[RecipeShortSchema],
-        auth=OptionalJWTAuth(),
+        auth=AsyncOptionalJWTAuth(),
+    )
+    @query_budget(1)
+    async def search_recipes(self, request, q: str, limit: int = 20):
+        query = SearchQuery(q, search_type="websearch", config=SEARCH_CONFIG)
+        queryset = (
+            self.get_queryset(request)
+            .filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-updated_at")[: max(1, min(limit, 50))]
+        )
+        return [recipe async for recipe in queryset]
+
+    @http_get(
+        "/cook",
+        response=list[CookableRecipeSchema],
+        auth=AsyncOptionalJWTAuth(),
+    )
+    @query_budget(2)
+    async def cook_recipes(
+        self,
+        request,
+        ingredients: Query[list[uuid.UUID]],
+        kitchen: KitchenMatch | None = None,
+        limit: int = 20,
+    ):
+        """
+        "What can I cook": recipes using any of ``ingredients``, ranked by the
+        fraction of their ingredients covered, each with what is missing.
+        """
+        pantry = set(ingredients)
+        if len(pantry) > MAX_PANTRY:
+            raise ValidationError(
+                detail=f"At most {MAX_PANTRY} ingredients", code="invalid"
+            )
+        queryset = self.filter_kitchen(self.get_queryset(request), request, kitchen)
+        queryset = rank_by_coverage(queryset, pantry)
+        recipes = [recipe async for recipe in queryset[: max(1, min(limit, 50))]]
+        await attach_missing(recipes, pantry)
+        return recipes
+
+    @http_post(
+        "/shopping-list",
+        response=list[ShoppingListLineSchema],
+        auth=AsyncOptionalJWTAuth(),
     )
-    def list_recipes(self, request):
-        return self.get_queryset(request)
+    @query_budget(3)
+    async def shopping_list(self, request, payload: ShoppingListSchema):
+        """
+        One shopping list for several recipes, each scaled by its
+        ``servings`` multiplier. Quantities of an ingredient are added up
+        after converting them to grams, millilitres or pieces where possible.
+        """
+        servings = {}
+        for item in payload.recipes:
+            servings[item.uid] = servings.get(item.uid, 0) + item.servings
+        if len(servings) > MAX_SHOPPING_RECIPES:
+            raise ValidationError(
+                detail=f"At most {MAX_SHOPPING_RECIPES} recipes", code="invalid"
+            )
+        visible = {
+            uid
+            async for uid in self.get_queryset(request)
+            .filter(uid__in=servings)
+            .values_list("uid", flat=True)
+        }
+        missing = [str(uid) for uid in servings if uid not in visible]
+        if missing:
+            raise ValidationException(
+                detail={
+                    "errors": {
+                        "recipes": [f"Recipe {uid} not found" for uid in missing]
+                    }
+                }
+            )
+        matrix = await conversion_cache.aget()
+        lines = await sync_to_async(shopping_list)(servings, matrix)
+        units = await reference_cache.aget(Unit)
+        for line in lines:
+            line["unit"] = units.get(line.pop("unit_uid"))
+        return lines
+
+    @http_get("/export", auth=AsyncJWTAuth())
+    @query_budget(5, per_chunk=4)
+    async def export_recipes(self, request, chunk_size: int = CHUNK_SIZE):
+        """Staff-only NDJSON stream of every public recipe as RecipeSchema."""
+        if not request.user.is_staff:
+            raise PermissionDenied()
+        chunk_size = max(1, min(chunk_size, CHUNK_SIZE))
+
+        async def lines():
+            after = None
+            while True:
+                content, after = await sync_to_async(export_chunk)(after, chunk_size)
+                if content:
+                    yield content
+                if after is None:
+                    return
+
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+    @http_post("/import", auth=AsyncJWTAuth())
+    @query_budget(12, per_chunk=10)
+    async def import_recipes(self, request, batch_size: int = BATCH_SIZE):
+        """
+        Staff-only bulk import. The body is NDJSON, one RecipeCreateSchema per
+        line; the response streams one NDJSON result per input line.
+        """
+        if not request.user.is_staff:
+            raise PermissionDenied()
+        importer = RecipeImporter(
+            request.user, batch_size=max(1, min(batch_size, BATCH_SIZE))
+        )
+
+        async def results():
+            for batch in importer.batches(request):
+                for result in await sync_to_async(importer.save)(batch):
+                    yield render_result(result)
+
+        return StreamingHttpResponse(results(), content_type="application/x-ndjson")
 
-    @http_get("/{uuid:uid}", response=RecipeSchema, auth=OptionalJWTAuth())
-    def get_recipe(self, request, uid: uuid.UUID):
-        return get_object_or_404(self.get_recipe_queryset(request=request), uid=uid)
+    async def load_recipe(self, request, **lookup):
+        """Load and render a recipe for the cache as (uid, slug, payload, cacheable)."""
+        queryset = self.get_queryset(request).filter(**lookup)
+        if settings.RECIPE_DETAIL_BACKEND == "sql":
+            row = await (
+                annotate_recipe_state(queryset)
+                .annotate(document=recipe_document())
+                .values_list("slug", "visibility", "document", *RECIPE_STATE_FIELDS)
+                .afirst()
+            )
+            if row is None:
+                raise Http404
+            slug, visibility, content, *state = row
+            uid = state[0]
+            payload = (make_etag(*state), content.encode())
+        else:
+            recipe = await aget_object_or_404(
+                self.get_recipe_queryset(request), **lookup
+            )
+            uid, slug, visibility = recipe.uid, recipe.slug, recipe.visibility
+            data = RecipeSchema.from_orm(recipe).model_dump()
+            content = self.api.renderer.render(
+                request, data, response_status=status.HTTP_200_OK
+            )
+            payload = (make_etag(*recipe_state(recipe)), content)
+        return uid, slug, payload, visibility == Recipe.Visibility.PUBLIC
+
+    async def get_cached_recipe(self, request, **lookup):
+        """
+        Serve public recipes from the rendered-document cache; anything else the
+        caller-specific queryset allows is rendered the same way on every call.
+        Conditional requests that miss the cache are answered from a single
+        state query before loading the whole document.
+        """
+        if request.headers.get("If-None-Match") and not await recipe_cache.apeek(
+            **lookup
+        ):
+            state = await recipe_state_values(
+                self.get_queryset(request).filter(**lookup)
+            ).afirst()
+            if state and etag_matches(request, make_etag(*state)):
+                self.context.response["ETag"] = make_etag(*state)
+                return status.HTTP_304_NOT_MODIFIED, None
+
+        etag, content = await recipe_cache.aget_or_fill(
+            lambda: self.load_recipe(request, **lookup), **lookup
+        )
+        if etag_matches(request, etag):
+            self.context.response["ETag"] = etag
+            return status.HTTP_304_NOT_MODIFIED, None
+        response = HttpResponse(
+            content,
+            content_type=f"{self.api.renderer.media_type}; "
+            f"charset={self.api.renderer.charset}",
+        )
+        response["ETag"] = etag
+        return response
+
+    @http_get(
+        "/{uuid:uid}",
+        response={
+            status.HTTP_200_OK: RecipeSchema,
+            status.HTTP_304_NOT_MODIFIED: None,
+        },
+        auth=AsyncOptionalJWTAuth(),
+    )
+    @query_budget(5)
+    async def get_recipe(self, request, uid: uuid.UUID):
+        return await self.get_cached_recipe(request, uid=uid)
 
-    @http_get("/{slug:slug}", response=RecipeSchema, auth=OptionalJWTAuth())
-    def get_recipe_by_slug(self, request, slug: str):
-        return get_object_or_404(self.get_recipe_queryset(request=request), slug=slug)
+    @http_get(
+        "/{slug:slug}",
+        response={
+            status.HTTP_200_OK: RecipeSchema,
+            status.HTTP_304_NOT_MODIFIED: None,
+        },
+        auth=AsyncOptionalJWTAuth(),
+    )
+    @query_budget(5)
+    async def get_recipe_by_slug(self, request, slug: str):
+        return await self.get_cached_recipe(request, slug=slug)
 
     @http_post(
         "/",
@@ -66,110 +358,135 @@ class RecipesController(ControllerBase):
             status.HTTP_201_CREATED: RecipeSchema,
             status.HTTP_400_BAD_REQUEST: dict,
         },
-        auth=JWTAuth(),
+        auth=AsyncJWTAuth(),
     )
-    def create_recipe(self, request, payload: RecipeCreateSchema):
-        with atomic():
-            recipe = Recipe.objects.create(
-                author=request.user,
-                title=payload.title,
-                description=payload.description,
-                notes=payload.notes,
-                image=payload.image,
-            )
+    @query_budget(14)
+    async def create_recipe(self, request, payload: RecipeCreateSchema):
+        recipe = await sync_to_async(self.save_new_recipe)(request.user, payload)
+        return status.HTTP_201_CREATED, recipe
 
-            if payload.instructions:
-                instructions_for_create = []
-                for instruction in payload.instructions:
-                    instructions_for_create.append(
-                        Instruction(
-                            recipe=recipe,
-                            step=instruction.step,
-                            description=instruction.description,
-                            timer=instruction.timer,
-                        )
-                    )
-                Instruction.objects.bulk_create(instructions_for_create)
-
-            for ingredient in payload.ingredients:
-                RecipeIngredient.objects.create(
-                    recipe=recipe,
-                    ingredient_id=ingredient.ingredient_uid,
-                    unit_id=ingredient.unit_uid,
-                    quantity=ingredient.quantity,
-                )
+    @staticmethod
+    def save_new_recipe(author, payload: RecipeCreateSchema) -> Recipe:
+        """
+        Create the recipe in a fixed number of statements whatever the size of
+        the payload: references are checked with one query per model and the
+        children bulk-inserted. The recipe comes back with its children in
+        memory, so rendering it costs no further queries.
+        """
+        references = fetch_references([payload])
+        errors = reference_errors(payload, references)
+        if errors:
+            raise ValidationException(
+                detail={
+                    "errors": {
+                        ".".join(map(str, error["loc"])): [error["msg"]]
+                        for error in errors
+                    }
+                }
+            )
 
-            if payload.appliance_uids:
-                recipe.appliances.set(
-                    Appliance.objects.filter(uid__in=payload.appliance_uids)
+        appliances = [
+            references[Appliance][uid]
+            for uid in dict.fromkeys(payload.appliance_uids or ())
+        ]
+        through = Recipe.appliances.through
+        try:
+            with atomic():
+                recipe = Recipe.objects.create(
+                    author=author,
+                    title=payload.title,
+                    description=payload.description,
+                    notes=payload.notes,
+                    image=payload.image,
                 )
-
-            recipe.refresh_from_db()
-            return status.HTTP_201_CREATED, recipe
-
-    @http_patch(
-        "/{uuid:uid}",
-        response=RecipeSchema,
-        auth=JWTAuth(),
-    )
-    def update_recipe(self, request, uid: uuid.UUID, payload: RecipeCreateSchema):
-        recipe = get_object_or_404(Recipe, uid=uid)
-        if recipe.author != request.user:
-            raise PermissionDenied()
-
-        if payload.instructions:
-            instructions_for_create = []
-            recipe.instructions.all().delete()
-            for instruction in payload.instructions:
-                instructions_for_create.append(
+                # uids are assigned here since bulk_create does not read back
+                # db_default pks, and the response is built from these objects
+                instructions = Instruction.objects.bulk_create(
                     Instruction(
+                        uid=uuid7(),
                         recipe=recipe,
                         step=instruction.step,
                         description=instruction.description,
                         timer=instruction.timer,
                     )
+                    for instruction in payload.instructions
                 )
-            Instruction.objects.bulk_create(instructions_for_create)
-
-        if payload.ingredients:
-            recipe.recipeingredient_set.all().delete()
-            ingredients_for_create = []
-            for ingredient in payload.ingredients:
-                ingredients_for_create.append(
+                ingredients = RecipeIngredient.objects.bulk_create(
                     RecipeIngredient(
+                        uid=uuid7(),
                         recipe=recipe,
-                        ingredient_id=ingredient.ingredient_uid,
-                        unit_id=ingredient.unit_uid,
+                        ingredient=references[Ingredient][ingredient.ingredient_uid],
+                        unit=references[Unit].get(ingredient.unit_uid),
                         quantity=ingredient.quantity,
+                        notes=ingredient.notes,
                     )
+                    for ingredient in payload.ingredients
                 )
-            RecipeIngredient.objects.bulk_create(ingredients_for_create)
-
-        if payload.appliance_uids is not None:
-            recipe.appliances.set(
-                Appliance.objects.filter(uid__in=payload.appliance_uids)
+                through.objects.bulk_create(
+                    through(recipe_id=recipe.uid, appliance_id=appliance.uid)
+                    for appliance in appliances
+                )
+                Recipe.objects.filter(uid=recipe.uid).update_search_fields()
+        except IntegrityError:
+            # A referenced row was deleted between the check and the commit
+            raise ValidationException(
+                detail={"errors": {"ingredients": ["References changed, try again"]}}
             )
 
-        recipe_payload = payload.model_dump(exclude_unset=True)
-        for field in ["ingredients", "instructions", "appliance_uids"]:
-            if field in recipe_payload:
-                del recipe_payload[field]
-
-        for field, value in recipe_payload.items():
-            if value is not None:
-                setattr(recipe, field, value)
-        recipe.save()
-        recipe.refresh_from_db()
+        recipe.prefill(
+            instructions=sorted(instructions, key=lambda x: x.step),
+            recipeingredient_set=ingredients,
+            appliances=sorted(appliances, key=lambda x: x.uid),
+        )
         return recipe
 
+    @http_patch(
+        "/{uuid:uid}",
+        response=RecipeSchema,
+        auth=AsyncJWTAuth(),
+    )
+    @query_budget(22)
+    async def update_recipe(self, request, uid: uuid.UUID, payload: RecipeCreateSchema):
+        recipe = await aget_object_or_404(Recipe, uid=uid)
+        if recipe.author_id != request.user.uid:
+            raise PermissionDenied()
+        return await sync_to_async(self.save_recipe)(recipe, payload)
+
+    @staticmethod
+    def save_recipe(recipe: Recipe, payload: RecipeCreateSchema) -> Recipe:
+        with atomic():
+            if payload.instructions:
+                reconcile_instructions(recipe, payload.instructions)
+
+            if payload.ingredients:
+                reconcile_ingredients(recipe, payload.ingredients)
+
+            if payload.appliance_uids is not None:
+                recipe.appliances.set(
+                    Appliance.objects.filter(uid__in=payload.appliance_uids)
+                )
+
+            recipe_payload = payload.model_dump(exclude_unset=True)
+            for field in ["ingredients", "instructions", "appliance_uids"]:
+                if field in recipe_payload:
+                    del recipe_payload[field]
+
+            for field, value in recipe_payload.items():
+                if value is not None:
+                    setattr(recipe, field, value)
+            recipe.save()
+            Recipe.objects.filter(uid=recipe.uid).update_search_fields()
+            return Recipe.objects.with_relations().get(uid=recipe.uid)
+
     @http_delete(
         path="/{uuid:uid}",
         response={status.HTTP_204_NO_CONTENT: None},
-        auth=JWTAuth(),
+        auth=AsyncJWTAuth(),
     )
-    def delete_recipe(self, request, uid: uuid.UUID):
-        recipe = get_object_or_404(Recipe, uid=uid)
-        if recipe.author != request.user:
+    @query_budget(6)
+    async def delete_recipe(self, request, uid: uuid.UUID):
+        recipe = await aget_object_or_404(Recipe, uid=uid)
+        if recipe.author_id != request.user.uid:
             raise PermissionDenied()
-        recipe.delete()
+        await recipe.adelete()
         return status.HTTP_204_NO_CONTENT, None
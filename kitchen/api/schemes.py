@@ -1,6 +1,6 @@
 import uuid
 
-from ninja import ModelSchema, Schema
+from ninja import Field, ModelSchema, Schema
 
 from kitchen.api.ingredients import IngredientSchema
 from kitchen.api.units import UnitSchema
@@ -87,6 +87,13 @@ class RecipeShortSchema(UIDSchema, ModelSchema):
     author: AuthorSchema | None = None
 
 
+class CookableRecipeSchema(RecipeShortSchema):
+    coverage: float
+    matched: int
+    total: int
+    missing: list[IngredientSchema]
+
+
 class RecipeSchema(UIDSchema, ModelSchema):
     class Meta:
         model = Recipe
@@ -113,9 +120,9 @@ class RecipeSchema(UIDSchema, ModelSchema):
 
 
 class RecipeCreateSchema(Schema):
-    title: str
+    title: str = Field(max_length=255)
     description: str
-    image: str | None = None
+    image: str | None = Field(None, max_length=255)
     notes: str | None = None
     instructions: list[InstructionCreateSchema]
     ingredients: list[IngredientInRecipeCreateSchema]
@@ -125,11 +132,27 @@ class RecipeCreateSchema(Schema):
 
 class DraftSchema(Schema):
     uid: uuid.UUID | None = None
-    title: str | None = None
+    title: str | None = Field(None, max_length=255)
     description: str | None = None
-    image: str | None = None
+    image: str | None = Field(None, max_length=255)
     notes: str | None = None
     instructions: list[InstructionCreateSchema] | None = None
     ingredients: list[IngredientInRecipeCreateSchema] | None = None
     appliance_uids: list[uuid.UUID] | None = None
     visibility: Recipe.Visibility = Recipe.Visibility.PRIVATE
+
+
+class ShoppingListItemSchema(Schema):
+    uid: uuid.UUID
+    servings: float = Field(1, gt=0)
+
+
+class ShoppingListSchema(Schema):
+    recipes: list[ShoppingListItemSchema]
+
+
+class ShoppingListLineSchema(Schema):
+    ingredient: IngredientSchema
+    unit: UnitSchema | None = None
+    quantity: float | None = None
+    recipes: int
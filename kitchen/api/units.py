@@ -1,34 +1,93 @@
+import uuid
+
+from django.db import IntegrityError, transaction
 from django.db.models import Q
-from ninja import ModelSchema
+from ninja import ModelSchema, Schema
 from ninja_extra import api_controller, ControllerBase, http_get, http_post, status
+from ninja_extra.exceptions import ValidationError
 from ninja_jwt.authentication import JWTAuth
 
-from kitchen.models import Unit
+from kitchen.cache import reference_cache
+from kitchen.conversions import conversion_cache
+from kitchen.models import Ingredient, Unit
+from shared.budgets import query_budget
 
 
 class UnitSchema(ModelSchema):
     class Meta:
         model = Unit
-        fields = ["uid", "abbreviation", "name"]
+        fields = ["uid", "abbreviation", "name", "dimension"]
+
+
+class ConversionSchema(Schema):
+    quantity: float
+    unit: UnitSchema
 
 
 @api_controller("/kitchen/units", tags=["Units"])
 class UnitsController(ControllerBase):
     @http_get("/", response=list[UnitSchema])
+    @query_budget(1)
     def list_units(self, request):
-        return Unit.objects.all()
+        return list(reference_cache.get(Unit).values())
+
+    @http_get("/convert", response=ConversionSchema)
+    @query_budget(2)
+    def convert(
+        self,
+        request,
+        quantity: float,
+        source: uuid.UUID,
+        target: uuid.UUID,
+        ingredient: uuid.UUID | None = None,
+    ):
+        """
+        ``quantity`` of ``source`` in ``target`` units. Volume and mass convert
+        into each other through the density of ``ingredient``, when known.
+        """
+        density = None
+        if ingredient:
+            density = (
+                Ingredient.objects.filter(uid=ingredient)
+                .values_list("density", flat=True)
+                .first()
+            )
+        matrix = conversion_cache.get()
+        if not {source, target} <= matrix.index.keys():
+            # Possibly created by another worker since our copy was last checked
+            reference_cache.invalidate()
+            matrix = conversion_cache.get()
+        converted = matrix.convert(quantity, source, target, density)
+        if converted is None:
+            raise ValidationError(detail="Units are not convertible", code="invalid")
+        return {"quantity": converted, "unit": reference_cache.get(Unit)[target]}
 
     @http_post(
         "/",
         response={status.HTTP_200_OK: UnitSchema, status.HTTP_201_CREATED: UnitSchema},
         auth=JWTAuth(),
     )
+    @query_budget(3)
     def create_unit(self, request, payload: UnitSchema):
         unit_name = payload.name.lower().strip()
         unit_abbreviation = payload.abbreviation.lower().strip()
-        existing_unit = Unit.objects.filter(
-            Q(name__iexact=unit_name) | Q(abbreviation__iexact=unit_abbreviation)
-        ).first()
+        existing_unit = next(
+            (
+                unit
+                for unit in reference_cache.get(Unit).values()
+                if unit.name.lower() == unit_name
+                or unit.abbreviation.lower() == unit_abbreviation
+            ),
+            None,
+        )
         if existing_unit:
             return status.HTTP_200_OK, existing_unit
-        return status.HTTP_201_CREATED, Unit.objects.create(**payload.model_dump())
+        try:
+            with transaction.atomic():
+                unit = Unit.objects.create(**payload.model_dump())
+        except IntegrityError:
+            # Created by another worker since our copy was last checked
+            return status.HTTP_200_OK, Unit.objects.get(
+                Q(name__iexact=unit_name) | Q(abbreviation__iexact=unit_abbreviation)
+            )
+        return status.HTTP_201_CREATED, unit
@@ -0,0 +1,409 @@
+import logging
+import random
+import re
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.test import Client
+from uuid6 import uuid7
+
+from kitchen.models import (
+    Appliance,
+    ApplianceType,
+    Ingredient,
+    Instruction,
+    Manufacturer,
+    Recipe,
+    RecipeIngredient,
+    Unit,
+)
+from kitchen.slugs import allocate_slugs
+from users.tokens import UserRefreshToken
+
+WORDS = [
+    "tomato",
+    "basil",
+    "garlic",
+    "onion",
+    "lentil",
+    "chickpea",
+    "pumpkin",
+    "ginger",
+    "miso",
+    "noodle",
+    "chicken",
+    "beef",
+    "mushroom",
+    "spinach",
+    "coconut",
+    "curry",
+    "lemon",
+    "roasted",
+    "smoky",
+    "spicy",
+    "creamy",
+    "quick",
+    "summer",
+    "winter",
+    "soup",
+    "stew",
+    "salad",
+    "bake",
+    "pie",
+    "risotto",
+]
+CHUNK_SIZE = 1000
+INSTRUCTIONS_PER_RECIPE = 10
+APPLIANCES_PER_RECIPE = 3
+INGREDIENT_POOL = 100_000
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Dataset:
+    recipes: int = 100_000
+    ingredients_per_recipe: int = 50
+    ingredients: int = 1_000_000
+    appliances: int = 1_000
+    units: int = 20
+
+
+def _chunks(total: int, size: int = CHUNK_SIZE):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def _title() -> str:
+    return " ".join(random.sample(WORDS, 3)).capitalize()
+
+
+def seed(dataset: Dataset, author, log: Callable[[str], None] | None = None) -> None:
+    """
+    Top every table up to the ``dataset`` sizes with bulk inserts, a chunk of
+    rows per transaction. Existing rows count towards the targets, so running
+    it again only adds what is missing. Progress goes to ``log``, or to the
+    module logger when none is given.
+    """
+    log = log or logger.info
+    missing = dataset.units - Unit.objects.count()
+    if missing > 0:
+        Unit.objects.bulk_create(
+            [
+                Unit(name=f"bench unit {n}", abbreviation=f"bu{n}")
+                for n in range(missing)
+            ],
+            ignore_conflicts=True,
+        )
+
+    missing = dataset.ingredients - Ingredient.objects.count()
+    for start, size in _chunks(max(missing, 0), 10 * CHUNK_SIZE):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"{random.choice(WORDS)} {start + n}") for n in range(size)
+        )
+        log(f"ingredients: {start + size}/{missing}")
+
+    missing = dataset.appliances - Appliance.objects.count()
+    if missing > 0:
+        manufacturers = Manufacturer.objects.bulk_create(
+            [
+                Manufacturer(uid=uuid7(), name=f"Bench maker {uuid7().hex}")
+                for _ in range(10)
+            ]
+        )
+        types = ApplianceType.objects.bulk_create(
+            [
+                ApplianceType(uid=uuid7(), name=f"Bench type {uuid7().hex}")
+                for _ in range(10)
+            ]
+        )
+        for start, size in _chunks(missing):
+            Appliance.objects.bulk_create(
+                Appliance(
+                    model=f"Bench {uuid7().hex}",
+                    manufacturer=random.choice(manufacturers),
+                    type=random.choice(types),
+                )
+                for _ in range(size)
+            )
+        log(f"appliances: {missing}")
+
+    missing = dataset.recipes - Recipe.objects.filter(is_draft=False).count()
+    if missing <= 0:
+        return
+    units = list(Unit.objects.values_list("uid", flat=True))
+    ingredients = list(
+        Ingredient.objects.order_by("?").values_list("uid", flat=True)[:INGREDIENT_POOL]
+    )
+    appliances = list(Appliance.objects.values_list("uid", flat=True))
+    per_recipe = min(dataset.ingredients_per_recipe, len(ingredients))
+    through = Recipe.appliances.through
+    for start, size in _chunks(missing):
+        with transaction.atomic():
+            titles = [_title() for _ in range(size)]
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    uid=uuid7(),
+                    author=author,
+                    title=title,
+                    slug=slug,
+                    description=f"{title}, the way it is made at home.",
+                    visibility=random.choice(
+                        (Recipe.Visibility.PUBLIC,) * 9 + (Recipe.Visibility.PRIVATE,)
+                    ),
+                    is_draft=False,
+                )
+                for title, slug in zip(titles, allocate_slugs(Recipe.objects, titles))
+            )
+            Instruction.objects.bulk_create(
+                Instruction(
+                    recipe=recipe,
+                    step=step,
+                    description=f"Step {step}: stir, season and simmer.",
+                    timer=300 if step % 3 == 0 else None,
+                )
+                for recipe in recipes
+                for step in range(1, INSTRUCTIONS_PER_RECIPE + 1)
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=uid,
+                    unit_id=random.choice(units) if units else None,
+                    quantity=random.randint(1, 500),
+                )
+                for recipe in recipes
+                for uid in random.sample(ingredients, per_recipe)
+            )
+            through.objects.bulk_create(
+                through(recipe_id=recipe.uid, appliance_id=uid)
+                for recipe in recipes
+                for uid in random.sample(
+                    appliances, min(APPLIANCES_PER_RECIPE, len(appliances))
+                )
+            )
+            Recipe.objects.filter(
+                uid__in=[r.uid for r in recipes]
+            ).update_search_fields()
+        log(f"recipes: {start + size}/{missing}")
+
+
+def _server_timing(response) -> tuple[int, float]:
+    """Query count and database milliseconds from the Server-Timing header."""
+    match = re.search(
+        r'db;dur=([\d.]+);desc="(\d+) queries"', response.get("Server-Timing", "")
+    )
+    if not match:
+        return 0, 0.0
+    return int(match[2]), float(match[1])
+
+
+def _summary(samples: list[float]) -> dict:
+    if len(samples) > 1:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p90, p95, p99 = cuts[49], cuts[89], cuts[94], cuts[98]
+    else:
+        p50 = p90 = p95 = p99 = samples[0]
+    return {
+        "min": round(min(samples), 3),
+        "mean": round(statistics.fmean(samples), 3),
+        "p50": round(p50, 3),
+        "p90": round(p90, 3),
+        "p95": round(p95, 3),
+        "p99": round(p99, 3),
+        "max": round(max(samples), 3),
+    }
+
+
+def _recipe_payload(ingredients: list, units: list, appliances: list, n: int) -> dict:
+    return {
+        "title": f"Benchmark {_title()}",
+        "description": "Created by the endpoint benchmark.",
+        "visibility": "PUBLIC",
+        "instructions": [
+            {"step": step, "description": f"Step {step} of run {n}."}
+            for step in range(1, INSTRUCTIONS_PER_RECIPE + 1)
+        ],
+        "ingredients": [
+            {
+                "ingredient_uid": str(uid),
+                "unit_uid": str(random.choice(units)) if units else None,
+                "quantity": n + 1,
+            }
+            for uid in ingredients
+        ],
+        "appliance_uids": [str(uid) for uid in appliances],
+    }
+
+
+class EndpointBenchmark:
+    """
+    Time every API endpoint in-process through the Django test client as the
+    given ``author``: latency percentiles in milliseconds plus the query count
+    and database time reported by the request metrics middleware. Writes go to
+    the configured database.
+    """
+
+    def __init__(self, author, ingredients_per_recipe: int = 50):
+        self.author = author
+        self.ingredients_per_recipe = ingredients_per_recipe
+        self.skipped: dict[str, str] = {}
+        token = UserRefreshToken.for_user(author).access_token
+        self.client = Client(
+            HTTP_HOST="127.0.0.1", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+
+    def cases(self) -> dict[str, tuple[str, Callable]]:
+        """
+        name -> (method, request(n) returning a response). Cases the database
+        has no data for are left out and listed in ``skipped`` with the reason.
+        """
+        client = self.client
+        public = list(
+            Recipe.objects.filter(is_draft=False, visibility=Recipe.Visibility.PUBLIC)
+            .order_by("?")
+            .values_list("uid", "slug")[:1000]
+        )
+        ingredients = list(
+            Ingredient.objects.values_list("uid", flat=True)[
+                : self.ingredients_per_recipe
+            ]
+        )
+        units = list(Unit.objects.values_list("uid", flat=True))
+        appliances = list(
+            Appliance.objects.values_list("uid", flat=True)[:APPLIANCES_PER_RECIPE]
+        )
+        own = Recipe.objects.filter(author=self.author, is_draft=False).first()
+        draft = Recipe.objects.filter(author=self.author, is_draft=True).first()
+        draft = draft or Recipe.objects.create(author=self.author)
+
+        def payload(n):
+            return _recipe_payload(ingredients, units, appliances, n)
+
+        def finish(n):
+            recipe = Recipe.objects.create(
+                author=self.author, description="Ready to publish."
+            )
+            Instruction.objects.create(recipe=recipe, step=1, description="Serve.")
+            RecipeIngredient.objects.create(recipe=recipe, ingredient_id=ingredients[0])
+            return recipe.uid
+
+        cases = {
+            "recipes.list": ("GET", lambda n: client.get("/api/kitchen/recipes/")),
+            "recipes.detail_uid": (
+                "GET",
+                lambda n: client.get(
+                    f"/api/kitchen/recipes/{public[n % len(public)][0]}"
+                ),
+            ),
+            "recipes.detail_slug": (
+                "GET",
+                lambda n: client.get(
+                    f"/api/kitchen/recipes/{public[-1 - n % len(public)][1]}"
+                ),
+            ),
+            "recipes.cook": (
+                "GET",
+                lambda n: client.get(
+                    "/api/kitchen/recipes/cook",
+                    {"ingredients": [str(uid) for uid in ingredients[:10]]},
+                ),
+            ),
+            "recipes.shopping_list": (
+                "POST",
+                lambda n: client.post(
+                    "/api/kitchen/recipes/shopping-list",
+                    {
+                        "recipes": [
+                            {"uid": str(uid), "servings": 2} for uid, _ in public[:20]
+                        ]
+                    },
+                    content_type="application/json",
+                ),
+            ),
+            "recipes.create": (
+                "POST",
+                lambda n: client.post(
+                    "/api/kitchen/recipes/", payload(n), content_type="application/json"
+                ),
+            ),
+            "recipes.update": (
+                "PATCH",
+                lambda n: client.patch(
+                    f"/api/kitchen/recipes/{own.uid}",
+                    payload(n),
+                    content_type="application/json",
+                ),
+            ),
+            "drafts.autosave": (
+                "PATCH",
+                lambda n: client.patch(
+                    f"/api/kitchen/recipes/drafts/{draft.uid}",
+                    payload(n),
+                    content_type="application/json",
+                ),
+            ),
+            "drafts.finish": (
+                "POST",
+                (
+                    finish,
+                    lambda uid: client.post(
+                        f"/api/kitchen/recipes/drafts/{uid}/finish"
+                    ),
+                ),
+            ),
+            "ingredients.list": (
+                "GET",
+                lambda n: client.get("/api/kitchen/ingredients/"),
+            ),
+            "units.list": ("GET", lambda n: client.get("/api/kitchen/units/")),
+            "appliances.list": (
+                "GET",
+                lambda n: client.get("/api/kitchen/appliances/"),
+            ),
+            "bootstrap": ("GET", lambda n: client.get("/api/kitchen/bootstrap/")),
+        }
+        # With --no-seed the database may lack what some cases request
+        needs = {
+            "recipes.detail_uid": (public, "no public recipes"),
+            "recipes.detail_slug": (public, "no public recipes"),
+            "recipes.shopping_list": (public, "no public recipes"),
+            "recipes.cook": (ingredients, "no ingredients"),
+            "drafts.finish": (ingredients, "no ingredients"),
+            "recipes.update": (own, "no published recipe by the benchmark user"),
+        }
+        self.skipped = {
+            name: reason for name, (data, reason) in needs.items() if not data
+        }
+        return {name: case for name, case in cases.items() if name not in self.skipped}
+
+    def run(self, iterations: int, only: list[str] | None = None) -> dict:
+        results = {}
+        for name, (method, call) in self.cases().items():
+            if only and name not in only:
+                continue
+            # Untimed per-iteration setup, e.g. a fresh draft to finish
+            setup, call = call if isinstance(call, tuple) else (lambda n: n, call)
+            latencies, queries, db = [], [], []
+            statuses = set()
+            for n in range(iterations):
+                argument = setup(n)
+                started = time.perf_counter()
+                response = call(argument)
+                latencies.append((time.perf_counter() - started) * 1000)
+                count, db_ms = _server_timing(response)
+                queries.append(count)
+                db.append(db_ms)
+                statuses.add(response.status_code)
+            results[name] = {
+                "method": method,
+                "iterations": iterations,
+                "status": sorted(statuses),
+                "latency_ms": _summary(latencies),
+                "db_ms": _summary(db),
+                "queries": {"min": min(queries), "max": max(queries)},
+            }
+        return results
@@ -0,0 +1,259 @@
+import asyncio
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+
+from kitchen.models import (
+    ApplianceType,
+    Manufacturer,
+    ReferenceVersion,
+    Unit,
+    UnitConversion,
+)
+
+MISSING = object()
+
+
+class RecipeCache:
+    """
+    Read-through cache for rendered public recipe documents.
+
+    Entries are stored under the recipe uid, and slugs map to uids. Every entry
+    is stamped with the recipe version and the catalogue generation that were
+    current before it was loaded from the database; bumping either one (on
+    write) makes the old entry unreachable, even if a slow reader stores it
+    after the invalidation. Concurrent misses for the same key are coalesced
+    with a short-lived ``cache.add`` lock so only one worker hits the database.
+
+    Version and generation keys never expire but can still be evicted (LRU,
+    restart). A missing one is re-seeded with a fresh value rather than read
+    as ``None``, so a stamp can never go back to one an old entry still holds.
+    """
+
+    generation_key = "recipe:generation"
+
+    def __init__(
+        self,
+        alias: str = "default",
+        timeout: int = 60 * 60,
+        lock_timeout: int = 10,
+        wait_interval: float = 0.02,
+        wait_attempts: int = 50,
+    ):
+        self.alias = alias
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.wait_interval = wait_interval
+        self.wait_attempts = wait_attempts
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def entry_key(uid) -> str:
+        return f"recipe:entry:{uid}"
+
+    @staticmethod
+    def version_key(uid) -> str:
+        return f"recipe:version:{uid}"
+
+    @staticmethod
+    def slug_key(slug: str) -> str:
+        return f"recipe:slug:{slug}"
+
+    async def alookup(self, uid) -> tuple[Any, tuple]:
+        """Return the cached payload (or MISSING) and the current stamp."""
+        keys = [self.entry_key(uid), self.version_key(uid), self.generation_key]
+        values = await self.cache.aget_many(keys)
+        missing = [key for key in keys[1:] if values.get(key) is None]
+        if missing:
+            # Evicted (or never set): whichever worker adds first wins
+            for key in missing:
+                await self.cache.aadd(key, time.time_ns(), None)
+            values.update(await self.cache.aget_many(missing))
+        stamp = (values.get(keys[1]), values.get(keys[2]))
+        entry = values.get(keys[0])
+        if entry is not None and entry[0] == stamp:
+            return entry[1], stamp
+        return MISSING, stamp
+
+    async def astore(self, uid, slug: str | None, stamp: tuple, payload: Any) -> None:
+        entries = {self.entry_key(uid): (stamp, payload)}
+        if slug:
+            entries[self.slug_key(slug)] = str(uid)
+        await self.cache.aset_many(entries, self.timeout)
+
+    async def apeek(self, *, uid=None, slug: str | None = None) -> Any:
+        """Return the cached payload for ``uid`` or ``slug`` without filling."""
+        known_uid = uid or await self.cache.aget(self.slug_key(slug))
+        if known_uid:
+            payload, _ = await self.alookup(known_uid)
+            if payload is not MISSING:
+                return payload
+        return None
+
+    async def aget_or_fill(
+        self,
+        load: Callable[[], Awaitable[tuple[Any, str | None, Any, bool]]],
+        *,
+        uid=None,
+        slug: str | None = None,
+    ) -> Any:
+        """
+        Return the payload for ``uid`` or ``slug``.
+
+        On a miss ``load()`` is awaited once per key across workers; it returns
+        ``(uid, slug, payload, cacheable)`` and the payload is only stored when
+        ``cacheable`` is true.
+        """
+        lock_key = f"recipe:lock:{uid or slug}"
+        stamp = None
+        for _ in range(self.wait_attempts):
+            known_uid = uid or await self.cache.aget(self.slug_key(slug))
+            if known_uid:
+                payload, stamp = await self.alookup(known_uid)
+                if payload is not MISSING:
+                    return payload
+            if await self.cache.aadd(lock_key, 1, self.lock_timeout):
+                try:
+                    return await self.afill(load, stamp)
+                finally:
+                    await self.cache.adelete(lock_key)
+            await asyncio.sleep(self.wait_interval)
+        return await self.afill(load, stamp)
+
+    async def afill(self, load, stamp: tuple | None) -> Any:
+        uid, slug, payload, cacheable = await load()
+        if not cacheable:
+            return payload
+        if stamp is None:
+            # The slug was not mapped, so nothing was stamped before the load
+            # and a write since could be missed: only map the slug, the next
+            # read knows the uid and fills the entry
+            if slug:
+                await self.cache.aset(self.slug_key(slug), str(uid), self.timeout)
+        else:
+            await self.astore(uid, slug, stamp, payload)
+        return payload
+
+    def invalidate(self, *uids) -> None:
+        version = time.time_ns()
+        self.cache.set_many({self.version_key(uid): version for uid in uids}, None)
+
+    def invalidate_all(self) -> None:
+        self.cache.set(self.generation_key, time.time_ns(), None)
+
+
+recipe_cache = RecipeCache()
+
+
+class ReferenceCache:
+    """
+    In-process copy of the small reference tables (units and their
+    conversions, manufacturers and appliance types), keyed by uid.
+
+    Triggers bump a ``ReferenceVersion`` row whenever one of the tables is
+    written. Readers compare those versions with the ones they loaded at most
+    every ``check_interval`` seconds, one query, and reload only the tables
+    that moved. Writes made by this process call ``invalidate()`` so the next
+    read checks right away; other workers catch up within the interval.
+    """
+
+    models = (Unit, UnitConversion, Manufacturer, ApplianceType)
+
+    def __init__(self, check_interval: float | None = None):
+        self._check_interval = check_interval
+        self.lock = threading.Lock()
+        self.clear()
+
+    @property
+    def check_interval(self) -> float:
+        if self._check_interval is None:
+            return settings.REFERENCE_CACHE_CHECK_INTERVAL
+        return self._check_interval
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.checked_at >= self.check_interval
+
+    def refresh(self) -> None:
+        with self.lock:
+            if not self.is_stale():
+                return
+            versions = dict(ReferenceVersion.objects.values_list("table", "version"))
+            for model in self.models:
+                version = versions.get(model._meta.db_table)
+                if model not in self.rows or version != self.versions.get(model):
+                    # Read after the version, so the rows are at least that new
+                    self.rows[model] = {obj.uid: obj for obj in model.objects.all()}
+                    self.versions[model] = version
+            self.checked_at = time.monotonic()
+
+    def get(self, model) -> dict:
+        """``{uid: instance}`` for every row of ``model``."""
+        if self.is_stale():
+            self.refresh()
+        return self.rows[model]
+
+    async def aget(self, model) -> dict:
+        if self.is_stale():
+            await sync_to_async(self.refresh)()
+        return self.rows[model]
+
+    def _attach(self, objs: list, fields: dict[str, type], rows: dict) -> bool:
+        for obj in objs:
+            for field, model in fields.items():
+                related = rows[model].get(getattr(obj, f"{field}_id"))
+                if related is None:
+                    return False
+                setattr(obj, field, related)
+        return True
+
+    def attach(self, objs: Iterable, **fields: type) -> list:
+        """
+        Point the ``fields`` foreign keys of ``objs`` at the cached rows instead
+        of joining them, e.g. ``attach(appliances, manufacturer=Manufacturer)``.
+        A row newer than this copy forces one version check.
+        """
+        objs = list(objs)
+        if not self._attach(objs, fields, {m: self.get(m) for m in fields.values()}):
+            self.invalidate()
+            self._attach(objs, fields, {m: self.get(m) for m in fields.values()})
+        return objs
+
+    async def aattach(self, objs: Iterable, **fields: type) -> list:
+        objs = list(objs)
+        rows = {model: await self.aget(model) for model in fields.values()}
+        if not self._attach(objs, fields, rows):
+            self.invalidate()
+            rows = {model: await self.aget(model) for model in fields.values()}
+            self._attach(objs, fields, rows)
+        return objs
+
+    def warm(self) -> None:
+        """Load every table at worker start; a database that is not up yet just
+        leaves it to the first request."""
+        try:
+            self.refresh()
+        except DatabaseError:
+            return
+        finally:
+            connections.close_all()
+
+    def invalidate(self) -> None:
+        """Check the versions on the next read."""
+        self.checked_at = float("-inf")
+
+    def clear(self) -> None:
+        self.rows: dict[type, dict] = {}
+        self.versions: dict[type, int | None] = {}
+        self.invalidate()
+
+
+reference_cache = ReferenceCache()
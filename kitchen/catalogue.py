@@ -0,0 +1,110 @@
+from datetime import UTC, datetime, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from ninja_extra.exceptions import ValidationError
+
+from kitchen.models import Ingredient, RecipeIngredient, ReferenceVersion
+
+VERSION_KEY = "ingredients:version"
+# ReferenceVersion row bumped whenever usage counts, and so the order, change
+USAGE_VERSION = "kitchen_ingredient.usage"
+VERSION_TIMEOUT = 300
+# Rows are stamped before their transaction commits, so a delta looks back a
+# little to pick up rows that committed after the client read its version
+DELTA_OVERLAP = timedelta(minutes=1)
+MAX_DELTA = 1000
+
+
+def refresh_ingredient_usage(queryset=None) -> int:
+    """
+    Recount how many recipe rows use each ingredient, writing only the counts
+    that changed. updated_at stays put, so deltas do not resend the rows, but
+    the version moves: the listing order changed.
+    """
+    queryset = Ingredient.objects.all() if queryset is None else queryset
+    uses = (
+        RecipeIngredient.objects.filter(ingredient=OuterRef("pk"))
+        .values("ingredient")
+        .annotate(count=Count("uid"))
+        .values("count")
+    )
+    with transaction.atomic():
+        updated = (
+            queryset.annotate(current=Coalesce(Subquery(uses), Value(0)))
+            .exclude(usage=F("current"))
+            .update(usage=F("current"))
+        )
+        if updated:
+            ReferenceVersion.objects.get_or_create(table=USAGE_VERSION)
+            ReferenceVersion.objects.filter(table=USAGE_VERSION).update(
+                version=F("version") + 1
+            )
+            transaction.on_commit(invalidate_catalogue_version)
+    return updated
+
+
+def encode_version(count: int, updated_at: datetime | None, usage: int = 0) -> str:
+    stamp = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+    return f"{count}.{stamp}.{usage}"
+
+
+def decode_version(version: str) -> tuple[int, datetime]:
+    try:
+        count, stamp, *usage = (int(part) for part in version.split("."))
+    except ValueError:
+        raise ValidationError(detail="Invalid version", code="invalid")
+    if len(usage) > 1:
+        raise ValidationError(detail="Invalid version", code="invalid")
+    return count, datetime.fromtimestamp(stamp / 1_000_000, tz=UTC)
+
+
+def catalogue_version() -> str:
+    """
+    Ingredient count, latest ``updated_at`` and usage version: it moves on
+    every create, rename or delete and when usage counts are refreshed, and
+    on nothing else. Cached until the next change.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        usage = ReferenceVersion.objects.filter(table=USAGE_VERSION).values("version")
+        state = Ingredient.objects.aggregate(
+            count=Count("uid"), at=Max("updated_at"), usage=Max(Subquery(usage))
+        )
+        version = encode_version(state["count"], state["at"], state["usage"] or 0)
+        cache.set(VERSION_KEY, version, VERSION_TIMEOUT)
+    return version
+
+
+def usage_version() -> str:
+    """The part of the catalogue version that moves when the order changes."""
+    return catalogue_version().rsplit(".", 1)[1]
+
+
+def invalidate_catalogue_version() -> None:
+    cache.delete(VERSION_KEY)
+
+
+def catalogue_changes(since: str) -> dict:
+    """
+    Ingredients created or renamed since the ``since`` version. ``reset`` asks
+    the client to refetch the whole catalogue instead: some ingredient was
+    deleted, or the delta is too large to be worth it.
+    """
+    count, updated_at = decode_version(since)
+    version = catalogue_version()
+    if version == since:
+        return {"version": version, "reset": False, "items": []}
+
+    items = list(
+        Ingredient.objects.filter(updated_at__gt=updated_at - DELTA_OVERLAP).order_by(
+            "updated_at", "uid"
+        )[: MAX_DELTA + 1]
+    )
+    created = sum(1 for item in items if item.created_at > updated_at)
+    current = int(version.split(".")[0])
+    if len(items) > MAX_DELTA or current != count + created:
+        return {"version": version, "reset": True, "items": []}
+    return {"version": version, "reset": False, "items": items}
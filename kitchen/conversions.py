@@ -0,0 +1,225 @@
+import threading
+import uuid
+from collections.abc import Iterable, Sequence
+
+from django.db import transaction
+from django.db.models import Q
+
+from kitchen.cache import reference_cache
+from kitchen.models import Unit, UnitConversion
+
+# Ingredient.density is in grams per millilitre
+DENSITY_MASS_UNIT = "g"
+DENSITY_VOLUME_UNIT = "ml"
+
+# Quantities are added up in these units, by abbreviation
+CANONICAL_UNITS = {
+    Unit.Dimension.MASS: DENSITY_MASS_UNIT,
+    Unit.Dimension.VOLUME: DENSITY_VOLUME_UNIT,
+    Unit.Dimension.COUNT: "pc",
+}
+
+STANDARD_UNITS = [
+    ("gram", "g", Unit.Dimension.MASS),
+    ("kilogram", "kg", Unit.Dimension.MASS),
+    ("milligram", "mg", Unit.Dimension.MASS),
+    ("ounce", "oz", Unit.Dimension.MASS),
+    ("pound", "lb", Unit.Dimension.MASS),
+    ("millilitre", "ml", Unit.Dimension.VOLUME),
+    ("litre", "l", Unit.Dimension.VOLUME),
+    ("teaspoon", "tsp", Unit.Dimension.VOLUME),
+    ("tablespoon", "tbsp", Unit.Dimension.VOLUME),
+    ("cup", "c", Unit.Dimension.VOLUME),
+    ("fluid ounce", "fl oz", Unit.Dimension.VOLUME),
+    ("piece", "pc", Unit.Dimension.COUNT),
+]
+
+# 1 source = factor target, by abbreviation
+STANDARD_CONVERSIONS = [
+    ("kg", "g", 1000),
+    ("g", "mg", 1000),
+    ("oz", "g", 28.349523125),
+    ("lb", "oz", 16),
+    ("l", "ml", 1000),
+    ("tsp", "ml", 4.92892159375),
+    ("tbsp", "tsp", 3),
+    ("c", "tbsp", 16),
+    ("fl oz", "tbsp", 2),
+]
+
+
+def load_standard_units() -> tuple[int, int]:
+    """
+    Create the standard units and their factors, reusing units that already
+    exist under the same name or abbreviation. Returns how many units and
+    conversions were created.
+    """
+    created = [0, 0]
+    units = {}
+    with transaction.atomic():
+        for name, abbreviation, dimension in STANDARD_UNITS:
+            unit = Unit.objects.filter(
+                Q(abbreviation__iexact=abbreviation) | Q(name__iexact=name)
+            ).first()
+            if unit is None:
+                unit = Unit.objects.create(
+                    name=name, abbreviation=abbreviation, dimension=dimension
+                )
+                created[0] += 1
+            elif unit.dimension is None:
+                unit.dimension = dimension
+                unit.save(update_fields=["dimension", "updated_at"])
+            units[abbreviation] = unit
+        for source, target, factor in STANDARD_CONVERSIONS:
+            _, new = UnitConversion.objects.get_or_create(
+                source=units[source], target=units[target], defaults={"factor": factor}
+            )
+            created[1] += new
+    return created[0], created[1]
+
+
+class ConversionMatrix:
+    """
+    Factors between every pair of units, ``factors[i][j]`` converting unit
+    ``i`` to unit ``j`` (None when they are not connected). The stored
+    conversions are edges of a graph, walked both ways; the transitive
+    closure is computed once, all pairs at a time (Floyd-Warshall), so a
+    conversion is then an index lookup and a multiplication.
+    """
+
+    def __init__(self, units: Iterable[Unit], conversions: Iterable[UnitConversion]):
+        units = list(units)
+        self.index = {unit.uid: i for i, unit in enumerate(units)}
+        self.dimensions = [unit.dimension for unit in units]
+        size = len(units)
+        factors = [[None] * size for _ in range(size)]
+        for i in range(size):
+            factors[i][i] = 1.0
+        for conversion in conversions:
+            i = self.index.get(conversion.source_id)
+            j = self.index.get(conversion.target_id)
+            if i is None or j is None or not conversion.factor:
+                continue
+            factors[i][j] = float(conversion.factor)
+            factors[j][i] = 1 / factors[i][j]
+        for k in range(size):
+            through = factors[k]
+            for row in factors:
+                to_k = row[k]
+                if to_k is None:
+                    continue
+                for j, from_k in enumerate(through):
+                    if row[j] is None and from_k is not None:
+                        row[j] = to_k * from_k
+        self.factors = factors
+
+        self.by_abbreviation = {unit.abbreviation: unit.uid for unit in units}
+        self.grams = self.index.get(self.by_abbreviation.get(DENSITY_MASS_UNIT))
+        self.millilitres = self.index.get(self.by_abbreviation.get(DENSITY_VOLUME_UNIT))
+
+    def factor(
+        self, source: uuid.UUID, target: uuid.UUID, density: float | None = None
+    ) -> float | None:
+        """
+        What one ``source`` is in ``target`` units. ``density`` (grams per
+        millilitre) bridges volume and mass units; None when not convertible.
+        """
+        i, j = self.index.get(source), self.index.get(target)
+        if i is None or j is None:
+            return None
+        factor = self.factors[i][j]
+        if factor is not None or not density:
+            return factor
+        grams, millilitres = self.grams, self.millilitres
+        if grams is None or millilitres is None:
+            return None
+        dimensions = (self.dimensions[i], self.dimensions[j])
+        if dimensions == (Unit.Dimension.VOLUME, Unit.Dimension.MASS):
+            to_ml, from_g = self.factors[i][millilitres], self.factors[grams][j]
+            if to_ml is not None and from_g is not None:
+                return to_ml * density * from_g
+        elif dimensions == (Unit.Dimension.MASS, Unit.Dimension.VOLUME):
+            to_g, from_ml = self.factors[i][grams], self.factors[millilitres][j]
+            if to_g is not None and from_ml is not None:
+                return to_g / density * from_ml
+        return None
+
+    def canonical(self, unit: uuid.UUID) -> tuple[uuid.UUID, float]:
+        """
+        The unit quantities in ``unit`` add up in and the factor to it: the
+        canonical unit of its dimension when there is a way there, otherwise
+        ``unit`` itself.
+        """
+        i = self.index.get(unit)
+        if i is not None:
+            abbreviation = CANONICAL_UNITS.get(self.dimensions[i])
+            target = self.by_abbreviation.get(abbreviation)
+            factor = self.factor(unit, target) if target else None
+            if factor is not None:
+                return target, factor
+        return unit, 1.0
+
+    def convert(
+        self,
+        quantity: float,
+        source: uuid.UUID,
+        target: uuid.UUID,
+        density: float | None = None,
+    ) -> float | None:
+        factor = self.factor(source, target, density)
+        return None if factor is None else quantity * factor
+
+    def convert_many(
+        self,
+        quantities: Sequence[float],
+        sources: Sequence[uuid.UUID],
+        targets: Sequence[uuid.UUID] | uuid.UUID,
+        densities: Sequence[float | None] | None = None,
+    ) -> list[float | None]:
+        """
+        ``convert`` over parallel sequences (``targets`` may be a single unit).
+        Each distinct unit pair is looked up once, then one pass multiplies.
+        """
+        if not isinstance(targets, Sequence):
+            targets = [targets] * len(quantities)
+        densities = densities or [None] * len(quantities)
+        keys = list(zip(sources, targets, densities))
+        factors = {key: self.factor(*key) for key in set(keys)}
+        return [
+            None if (factor := factors[key]) is None else quantity * factor
+            for quantity, key in zip(quantities, keys)
+        ]
+
+
+class ConversionCache:
+    """
+    The conversion matrix of the units in the reference cache, rebuilt only
+    when the reference cache reloads units or conversions.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sources: tuple = ()
+        self.matrix: ConversionMatrix | None = None
+
+    def build(self, units: dict, conversions: dict) -> ConversionMatrix:
+        with self.lock:
+            # The reference cache replaces a table's dict whenever it reloads it
+            sources = (units, conversions)
+            if self.matrix is None or any(
+                a is not b for a, b in zip(sources, self.sources)
+            ):
+                self.matrix = ConversionMatrix(units.values(), conversions.values())
+                self.sources = sources
+            return self.matrix
+
+    def get(self) -> ConversionMatrix:
+        units = reference_cache.get(Unit)
+        return self.build(units, reference_cache.get(UnitConversion))
+
+    async def aget(self) -> ConversionMatrix:
+        units = await reference_cache.aget(Unit)
+        return self.build(units, await reference_cache.aget(UnitConversion))
+
+
+conversion_cache = ConversionCache()
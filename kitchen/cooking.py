@@ -0,0 +1,87 @@
+import uuid
+from collections.abc import Collection
+from typing import Literal
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import F, FloatField, Func, IntegerField, UUIDField, Value
+from django.db.models.functions import Cast
+
+from kitchen.models import Ingredient, OwnedAppliance
+
+MAX_PANTRY = 50
+
+KitchenMatch = Literal["appliances", "types"]
+
+
+class CommonCount(Func):
+    """How many elements of an array expression are also in ``values``."""
+
+    output_field = IntegerField()
+
+    def __init__(self, expression, values: Collection[uuid.UUID]):
+        super().__init__(
+            expression, Value(list(values), output_field=ArrayField(UUIDField()))
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):
+        array, values = self.get_source_expressions()
+        array_sql, array_params = compiler.compile(array)
+        values_sql, values_params = compiler.compile(values)
+        sql = "(SELECT count(*) FROM unnest({}) AS item WHERE item = ANY({}))"
+        return sql.format(array_sql, values_sql), (*array_params, *values_params)
+
+
+def rank_by_coverage(queryset, pantry: Collection[uuid.UUID]):
+    """
+    Recipes of ``queryset`` sharing an ingredient with ``pantry``, best
+    covered first. The overlap filter is answered by the GIN index on
+    ingredient_uids, so only candidate recipes are read and RecipeIngredient
+    is not touched.
+    """
+    total = Func(
+        F("ingredient_uids"), function="cardinality", output_field=IntegerField()
+    )
+    return (
+        queryset.filter(ingredient_uids__overlap=list(pantry))
+        .annotate(
+            matched=CommonCount(F("ingredient_uids"), pantry),
+            total=total,
+        )
+        .annotate(coverage=Cast("matched", FloatField()) / Cast("total", FloatField()))
+        .order_by("-coverage", "-matched", "-updated_at", "-uid")
+    )
+
+
+def in_kitchen(queryset, user_uid: uuid.UUID, by: KitchenMatch = "appliances"):
+    """
+    Recipes of ``queryset`` needing only appliances the user owns or, ``by``
+    types, only types of appliance the user owns. A containment test on the
+    GIN-indexed recipe arrays against the user's set, read once per query.
+    """
+    owned = OwnedAppliance.objects.filter(user_id=user_uid)
+    if by == "types":
+        return queryset.filter(
+            appliance_type_uids__contained_by=ArraySubquery(
+                owned.values("appliance__type")
+            )
+        )
+    return queryset.filter(
+        appliance_uids__contained_by=ArraySubquery(owned.values("appliance"))
+    )
+
+
+async def attach_missing(recipes, pantry: Collection[uuid.UUID]) -> None:
+    """Set ``missing`` on each recipe to its ingredients not in ``pantry``, by name."""
+    wanted = {uid for recipe in recipes for uid in recipe.ingredient_uids} - set(pantry)
+    ingredients = {}
+    if wanted:
+        ingredients = {
+            ingredient.uid: ingredient
+            async for ingredient in Ingredient.objects.filter(uid__in=wanted)
+        }
+    for recipe in recipes:
+        recipe.missing = sorted(
+            (ingredients[uid] for uid in recipe.ingredient_uids if uid in ingredients),
+            key=lambda ingredient: ingredient.name,
+        )
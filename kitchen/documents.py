@@ -0,0 +1,116 @@
+from django.db.models import TextField
+from django.db.models.expressions import RawSQL
+
+from kitchen.models import (
+    Appliance,
+    ApplianceType,
+    Ingredient,
+    Instruction,
+    Manufacturer,
+    Recipe,
+    RecipeIngredient,
+    Unit,
+)
+from users.models import CustomUser
+
+
+def _timestamp(column: str) -> str:
+    """Format a timestamptz the way DjangoJSONEncoder does (milliseconds, Z)."""
+    return (
+        f"CASE WHEN to_char({column} AT TIME ZONE 'UTC', 'US') = '000000' "
+        f"""THEN to_char({column} AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"') """
+        f"""ELSE to_char({column} AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.MS"Z"') """
+        "END"
+    )
+
+
+def _float(column: str) -> str:
+    """
+    Format a float8 the way orjson does: plain decimal from 1e-5 up to 1e16
+    (integral values keep their ".0"), unpadded exponents below that. Going
+    through ::text keeps the shortest round-trip digits; a plain ::numeric
+    cast would round to 15. Beyond 1e16 the two may pick different digits.
+    """
+    return (
+        f"CASE WHEN {column} IS NULL THEN NULL "
+        f"WHEN abs({column}) >= 1e16 THEN to_json({column}) "
+        f"WHEN {column} = trunc({column}) "
+        f"THEN ({column}::text::numeric::text || '.0')::json "
+        f"WHEN abs({column}) >= 1e-5 "
+        f"THEN ({column}::text::numeric::text)::json "
+        f"ELSE regexp_replace({column}::text, 'e-0', 'e-')::json "
+        "END"
+    )
+
+
+def _document_sql() -> str:
+    recipe = Recipe._meta.db_table
+    through = Recipe.appliances.through._meta.db_table
+    return f"""
+    json_build_object(
+        'uid', {recipe}.uid,
+        'ingredients', COALESCE((
+            SELECT json_agg(json_build_object(
+                'uid', ri.uid,
+                'ingredient', json_build_object('uid', i.uid, 'name', i.name),
+                'unit', CASE WHEN u.uid IS NULL THEN NULL ELSE json_build_object(
+                    'uid', u.uid, 'abbreviation', u.abbreviation, 'name', u.name,
+                    'dimension', u.dimension
+                ) END,
+                'quantity', {_float("ri.quantity")},
+                'notes', ri.notes
+            ) ORDER BY ri.uid)
+            FROM {RecipeIngredient._meta.db_table} ri
+            JOIN {Ingredient._meta.db_table} i ON i.uid = ri.ingredient_id
+            LEFT JOIN {Unit._meta.db_table} u ON u.uid = ri.unit_id
+            WHERE ri.recipe_id = {recipe}.uid
+        ), '[]'),
+        'instructions', COALESCE((
+            SELECT json_agg(json_build_object(
+                'uid', s.uid,
+                'step', s.step,
+                'description', s.description,
+                'timer', s.timer
+            ) ORDER BY s.step, s.uid)
+            FROM {Instruction._meta.db_table} s
+            WHERE s.recipe_id = {recipe}.uid
+        ), '[]'),
+        'appliances', COALESCE((
+            SELECT json_agg(json_build_object(
+                'uid', a.uid,
+                'manufacturer', json_build_object('uid', m.uid, 'name', m.name),
+                'type', json_build_object('uid', t.uid, 'name', t.name),
+                'model', a.model
+            ) ORDER BY a.uid)
+            FROM {through} ra
+            JOIN {Appliance._meta.db_table} a ON a.uid = ra.appliance_id
+            JOIN {Manufacturer._meta.db_table} m ON m.uid = a.manufacturer_id
+            JOIN {ApplianceType._meta.db_table} t ON t.uid = a.type_id
+            WHERE ra.recipe_id = {recipe}.uid
+        ), '[]'),
+        'author', (
+            SELECT json_build_object(
+                'uid', au.uid, 'username', au.username, 'handler', au.handler
+            )
+            FROM {CustomUser._meta.db_table} au
+            WHERE au.uid = {recipe}.author_id
+        ),
+        'slug', {recipe}.slug,
+        'title', {recipe}.title,
+        'description', {recipe}.description,
+        'image', {recipe}.image,
+        'notes', {recipe}.notes,
+        'visibility', {recipe}.visibility,
+        'updated_at', {_timestamp(f"{recipe}.updated_at")},
+        'is_draft', {recipe}.is_draft
+    )::text
+    """
+
+
+def recipe_document() -> RawSQL:
+    """
+    The RecipeSchema document of a recipe rendered by Postgres, for annotating
+    a Recipe queryset. Keys and value formats follow the ORM path so both can
+    be served interchangeably.
+    """
+    return RawSQL(_document_sql(), (), output_field=TextField())
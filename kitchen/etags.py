@@ -0,0 +1,129 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Greatest
+from django.utils.http import parse_etags, quote_etag
+
+from kitchen.models import Appliance, Instruction, Recipe, RecipeIngredient
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=16)
+    return quote_etag(digest.hexdigest())
+
+
+def content_etag(content: bytes) -> str:
+    return quote_etag(hashlib.blake2b(content, digest_size=16).hexdigest())
+
+
+def etag_matches(request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
+
+
+def _child_state(queryset, updated_at):
+    """COUNT and MAX(updated_at) of a recipe's children as two scalar subqueries."""
+    children = queryset.filter(recipe=OuterRef("pk")).values("recipe")
+    return (
+        Subquery(children.annotate(value=Count("uid")).values("value")),
+        Subquery(children.annotate(value=Max(updated_at)).values("value")),
+    )
+
+
+RECIPE_STATE_FIELDS = (
+    "uid",
+    "updated_at",
+    "author__updated_at",
+    "instructions_count",
+    "instructions_updated_at",
+    "ingredients_count",
+    "ingredients_updated_at",
+    "appliances_count",
+    "appliances_updated_at",
+)
+
+
+def annotate_recipe_state(queryset):
+    """
+    Everything RecipeSchema renders reduces to the recipe and author timestamps
+    plus a count/max(updated_at) pair per child collection, so the ETag of a
+    recipe can be computed in one query without loading the document.
+    """
+    instructions = _child_state(Instruction.objects, "updated_at")
+    ingredients = _child_state(
+        RecipeIngredient.objects,
+        Greatest("updated_at", "ingredient__updated_at", "unit__updated_at"),
+    )
+    appliances = _child_state(
+        Appliance.objects,
+        Greatest("updated_at", "manufacturer__updated_at", "type__updated_at"),
+    )
+    return queryset.annotate(
+        instructions_count=instructions[0],
+        instructions_updated_at=instructions[1],
+        ingredients_count=ingredients[0],
+        ingredients_updated_at=ingredients[1],
+        appliances_count=appliances[0],
+        appliances_updated_at=appliances[1],
+    )
+
+
+def recipe_state_values(queryset):
+    return annotate_recipe_state(queryset).values_list(*RECIPE_STATE_FIELDS)
+
+
+def recipe_state(recipe: Recipe) -> tuple:
+    """Same values as ``RECIPE_STATE_FIELDS`` computed from a prefetched recipe."""
+    instructions = [x.updated_at for x in recipe.instructions.all()]
+    ingredients = [
+        max(
+            x
+            for x in (
+                item.updated_at,
+                item.ingredient.updated_at,
+                item.unit.updated_at if item.unit else None,
+            )
+            if x
+        )
+        for item in recipe.recipeingredient_set.all()
+    ]
+    appliances = [
+        max(item.updated_at, item.manufacturer.updated_at, item.type.updated_at)
+        for item in recipe.appliances.all()
+    ]
+    return (
+        recipe.uid,
+        recipe.updated_at,
+        recipe.author.updated_at,
+        len(instructions) or None,
+        max(instructions, default=None),
+        len(ingredients) or None,
+        max(ingredients, default=None),
+        len(appliances) or None,
+        max(appliances, default=None),
+    )
+
+
+async def recipe_list_etag(queryset, request) -> str:
+    """
+    ETag of a full RecipeSchema listing from the state of every listed recipe,
+    children and catalogue rows included, in one query.
+    """
+    rows = [row async for row in recipe_state_values(queryset.order_by("uid"))]
+    user = request.user.uid if request.user.is_authenticated else None
+    return make_etag(user, request.GET.urlencode(), *rows)
+
+
+async def recipe_page_etag(page, request) -> str:
+    """
+    ETag of one feed page from the uid and timestamps of its rows and their
+    authors: as cheap as the page itself, whatever the size of the table.
+    """
+    rows = [
+        row async for row in page.values_list("uid", "updated_at", "author__updated_at")
+    ]
+    user = request.user.uid if request.user.is_authenticated else None
+    return make_etag(user, request.GET.urlencode(), *rows)
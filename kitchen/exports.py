@@ -0,0 +1,49 @@
+from collections.abc import Iterator
+
+from kitchen.api.schemes import RecipeSchema
+from kitchen.models import Recipe
+from shared.renderers import ORJSONRenderer
+
+CHUNK_SIZE = 500
+
+renderer = ORJSONRenderer()
+
+
+def export_chunk(after=None, chunk_size: int = CHUNK_SIZE) -> tuple[bytes, object]:
+    """
+    NDJSON for the next ``chunk_size`` public recipes with a uid above ``after``,
+    plus the uid to continue from (None once the export is complete).
+
+    Chunks are keyset ranges over the primary key, each loaded with its own
+    prefetches, so memory stays flat however many recipes there are.
+    """
+    queryset = (
+        Recipe.objects.with_relations()
+        .defer(
+            "search_vector", "ingredient_uids", "appliance_uids", "appliance_type_uids"
+        )
+        .filter(is_draft=False, visibility=Recipe.Visibility.PUBLIC)
+        .order_by("uid")
+    )
+    if after is not None:
+        queryset = queryset.filter(uid__gt=after)
+    recipes = list(queryset[:chunk_size])
+    content = b"".join(
+        renderer.render(
+            None, RecipeSchema.from_orm(recipe).model_dump(), response_status=200
+        )
+        + b"\n"
+        for recipe in recipes
+    )
+    last = recipes[-1].uid if len(recipes) == chunk_size else None
+    return content, last
+
+
+def iter_export(chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    after = None
+    while True:
+        content, after = export_chunk(after, chunk_size)
+        if content:
+            yield content
+        if after is None:
+            return
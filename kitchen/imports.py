@@ -0,0 +1,160 @@
+from collections.abc import Iterable, Iterator
+
+import orjson
+from django.db import DatabaseError, transaction
+from pydantic import ValidationError
+from uuid6 import uuid7
+
+from kitchen.api.schemes import RecipeCreateSchema
+from kitchen.models import Instruction, Recipe, RecipeIngredient
+from kitchen.references import fetch_references, reference_errors
+from kitchen.slugs import allocate_slugs
+
+BATCH_SIZE = 500
+
+
+def _error(line: int, msg: str, loc: tuple = ()) -> dict:
+    return {"line": line, "errors": [{"loc": list(loc), "msg": msg}]}
+
+
+class RecipeImporter:
+    """
+    Bulk import of NDJSON ``RecipeCreateSchema`` lines.
+
+    Lines are validated as they are read and written ``batch_size`` at a time,
+    each batch in its own transaction with one ``bulk_create`` per table, so
+    memory stays bounded by the batch whatever the input size. Every input line
+    gets a result: the created uid and slug, or its errors. A bad line never
+    aborts its batch: when the database rejects a batch, its lines are written
+    again one by one, each in its own savepoint, so only the offending line fails.
+    """
+
+    def __init__(self, author, batch_size: int = BATCH_SIZE):
+        self.author = author
+        self.batch_size = batch_size
+
+    def batches(self, lines: Iterable[bytes | str]) -> Iterator[list]:
+        """Group input lines into ``(line, RecipeCreateSchema | error)`` batches."""
+        batch = []
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                batch.append((number, RecipeCreateSchema.model_validate_json(line)))
+            except ValidationError as exc:
+                batch.append(
+                    (
+                        number,
+                        {
+                            "line": number,
+                            "errors": [
+                                {"loc": list(error["loc"]), "msg": error["msg"]}
+                                for error in exc.errors(include_url=False)
+                            ],
+                        },
+                    )
+                )
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, lines: Iterable[bytes | str]) -> Iterator[dict]:
+        for batch in self.batches(lines):
+            yield from self.save(batch)
+
+    def missing_references(self, items: list) -> dict[int, dict]:
+        """Errors for lines pointing at ingredients, units or appliances that do not exist."""
+        references = fetch_references(payload for _, payload in items)
+        errors = {}
+        for number, payload in items:
+            problems = reference_errors(payload, references)
+            if problems:
+                errors[number] = {"line": number, "errors": problems}
+        return errors
+
+    def save(self, batch: list) -> list[dict]:
+        """Write the valid lines of a batch and return a result per line."""
+        results = {number: item for number, item in batch if isinstance(item, dict)}
+        items = [(number, item) for number, item in batch if number not in results]
+        try:
+            with transaction.atomic():
+                results.update(self.write(items))
+        except DatabaseError:
+            for number, item in items:
+                try:
+                    with transaction.atomic():
+                        results.update(self.write([(number, item)]))
+                except DatabaseError as exc:
+                    results[number] = _error(number, f"Line failed: {exc}")
+        return [results[number] for number, _ in batch]
+
+    def write(self, items: list) -> dict[int, dict]:
+        results = self.missing_references(items)
+        items = [(number, item) for number, item in items if number not in results]
+        results.update(self.create(items))
+        return results
+
+    def create(self, items: list) -> dict[int, dict]:
+        if not items:
+            return {}
+        slugs = allocate_slugs(Recipe.objects, [payload.title for _, payload in items])
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    # Assigned here so children can point at recipes before
+                    # bulk_create, which does not read back db_default pks
+                    uid=uuid7(),
+                    author=self.author,
+                    title=payload.title,
+                    slug=slug,
+                    description=payload.description,
+                    notes=payload.notes,
+                    image=payload.image,
+                    visibility=payload.visibility,
+                    is_draft=False,
+                )
+                for (_, payload), slug in zip(items, slugs)
+            ]
+        )
+
+        instructions, ingredients, appliances = [], [], []
+        through = Recipe.appliances.through
+        for (_, payload), recipe in zip(items, recipes):
+            instructions.extend(
+                Instruction(
+                    recipe=recipe,
+                    step=instruction.step,
+                    description=instruction.description,
+                    timer=instruction.timer,
+                )
+                for instruction in payload.instructions
+            )
+            ingredients.extend(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient.ingredient_uid,
+                    unit_id=ingredient.unit_uid,
+                    quantity=ingredient.quantity,
+                    notes=ingredient.notes,
+                )
+                for ingredient in payload.ingredients
+            )
+            appliances.extend(
+                through(recipe_id=recipe.uid, appliance_id=uid)
+                for uid in dict.fromkeys(payload.appliance_uids or ())
+            )
+        Instruction.objects.bulk_create(instructions)
+        RecipeIngredient.objects.bulk_create(ingredients)
+        through.objects.bulk_create(appliances)
+        Recipe.objects.filter(uid__in=[r.uid for r in recipes]).update_search_fields()
+
+        return {
+            number: {"line": number, "uid": recipe.uid, "slug": recipe.slug}
+            for (number, _), recipe in zip(items, recipes)
+        }
+
+
+def render_result(result: dict) -> bytes:
+    return orjson.dumps(result, default=str) + b"\n"
@@ -0,0 +1,85 @@
+import json
+import subprocess
+from datetime import UTC, datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from kitchen.benchmarks import Dataset, EndpointBenchmark, seed
+from kitchen.models import Appliance, Ingredient, Recipe, RecipeIngredient
+
+BENCHMARK_EMAIL = "benchmark@example.com"
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large dataset and measure latency percentiles and query counts "
+        "of every API endpoint, writing the results as JSON. Writes to the "
+        "configured database: never run it against production."
+    )
+
+    def add_arguments(self, parser):
+        defaults = Dataset()
+        parser.add_argument("--output", default="-", help="JSON file, or - for stdout")
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--only", nargs="*", help="Endpoint names to run")
+        parser.add_argument("--no-seed", action="store_true")
+        parser.add_argument("--recipes", type=int, default=defaults.recipes)
+        parser.add_argument(
+            "--ingredients-per-recipe",
+            type=int,
+            default=defaults.ingredients_per_recipe,
+        )
+        parser.add_argument("--ingredients", type=int, default=defaults.ingredients)
+        parser.add_argument("--appliances", type=int, default=defaults.appliances)
+
+    def handle(self, *args, **options):
+        dataset = Dataset(
+            recipes=options["recipes"],
+            ingredients_per_recipe=options["ingredients_per_recipe"],
+            ingredients=options["ingredients"],
+            appliances=options["appliances"],
+        )
+        author, _ = get_user_model().objects.get_or_create(
+            email=BENCHMARK_EMAIL, defaults={"username": "Benchmark"}
+        )
+        if not options["no_seed"]:
+            seed(dataset, author, log=self.stderr.write)
+
+        benchmark = EndpointBenchmark(author, dataset.ingredients_per_recipe)
+        report = {
+            "commit": git_commit(),
+            "created_at": datetime.now(UTC).isoformat(),
+            "dataset": {
+                "recipes": Recipe.objects.filter(is_draft=False).count(),
+                "recipe_ingredients": RecipeIngredient.objects.count(),
+                "ingredients": Ingredient.objects.count(),
+                "appliances": Appliance.objects.count(),
+            },
+            "endpoints": benchmark.run(options["iterations"], options["only"]),
+            "skipped": benchmark.skipped,
+        }
+
+        content = json.dumps(report, indent=2)
+        if options["output"] == "-":
+            self.stdout.write(content)
+        else:
+            with open(options["output"], "w") as f:
+                f.write(content + "\n")
+        for name, result in report["endpoints"].items():
+            latency = result["latency_ms"]
+            self.stderr.write(
+                f"{name}: p50 {latency['p50']}ms, p95 {latency['p95']}ms, "
+                f"p99 {latency['p99']}ms, {result['queries']['max']} queries"
+            )
+        for name, reason in benchmark.skipped.items():
+            self.stderr.write(f"{name}: skipped, {reason}")
@@ -0,0 +1,105 @@
+import json
+import timeit
+import uuid
+from datetime import UTC, datetime
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from ninja.parser import Parser
+from ninja.renderers import JSONRenderer
+
+from shared.renderers import ORJSONParser, ORJSONRenderer
+
+
+def sample_recipe(ingredients: int) -> dict:
+    """A rendered RecipeSchema document with ``ingredients`` ingredient rows."""
+    now = datetime.now(UTC)
+    return {
+        "uid": uuid.uuid4(),
+        "ingredients": [
+            {
+                "uid": uuid.uuid4(),
+                "ingredient": {"uid": uuid.uuid4(), "name": f"Ingredient {i}"},
+                "unit": {
+                    "uid": uuid.uuid4(),
+                    "abbreviation": "g",
+                    "name": "gram",
+                    "dimension": "MASS",
+                },
+                "quantity": 12.5 * i,
+                "notes": "finely chopped" if i % 3 else None,
+            }
+            for i in range(ingredients)
+        ],
+        "instructions": [
+            {
+                "uid": uuid.uuid4(),
+                "step": i,
+                "description": "Stir gently and simmer until reduced by half. " * 3,
+                "timer": 300 if i % 2 else None,
+            }
+            for i in range(ingredients // 5)
+        ],
+        "appliances": [
+            {
+                "uid": uuid.uuid4(),
+                "manufacturer": {"uid": uuid.uuid4(), "name": "Le Creuset"},
+                "type": {"uid": uuid.uuid4(), "name": "Dutch oven"},
+                "model": "Signature 26",
+            }
+        ],
+        "author": {"uid": uuid.uuid4(), "username": "Cook", "handler": "cook"},
+        "slug": "big-soup",
+        "title": "Big soup",
+        "description": "A soup with a lot of ingredients.",
+        "image": None,
+        "notes": None,
+        "visibility": "PUBLIC",
+        "updated_at": now,
+        "is_draft": False,
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare the stdlib and orjson renderer/parser on a large recipe."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ingredients", type=int, default=50)
+        parser.add_argument("--number", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        data = sample_recipe(options["ingredients"])
+        number = options["number"]
+        body = json.dumps(
+            {
+                "title": data["title"],
+                "description": data["description"],
+                "instructions": [
+                    {k: x[k] for k in ("step", "description", "timer")}
+                    for x in data["instructions"]
+                ],
+                "ingredients": [
+                    {"ingredient_uid": str(x["ingredient"]["uid"]), "quantity": 1.5}
+                    for x in data["ingredients"]
+                ],
+            }
+        ).encode()
+        request = RequestFactory().post("/", data=body, content_type="application/json")
+
+        def render(renderer):
+            return lambda: renderer.render(request, data, response_status=200)
+
+        def parse(parser):
+            return lambda: parser.parse_body(request)
+
+        cases = [
+            ("render", render(JSONRenderer()), render(ORJSONRenderer())),
+            ("parse", parse(Parser()), parse(ORJSONParser())),
+        ]
+        for name, stdlib, fast in cases:
+            base = timeit.timeit(stdlib, number=number)
+            new = timeit.timeit(fast, number=number)
+            self.stdout.write(
+                f"{name}: stdlib {base / number * 1e6:.1f}us, "
+                f"orjson {new / number * 1e6:.1f}us ({base / new:.1f}x)"
+            )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from kitchen.exports import CHUNK_SIZE, iter_export
+
+
+class Command(BaseCommand):
+    help = "Write every public recipe as NDJSON RecipeSchema documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Output file or -")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = iter_export(options["chunk_size"])
+        if options["path"] == "-":
+            for content in chunks:
+                self.stdout.write(content.decode(), ending="")
+            return
+        with open(options["path"], "wb") as target:
+            for content in chunks:
+                target.write(content)
@@ -0,0 +1,38 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from kitchen.imports import BATCH_SIZE, RecipeImporter, render_result
+
+
+class Command(BaseCommand):
+    help = (
+        "Import recipes from an NDJSON file of RecipeCreateSchema objects "
+        "and write one NDJSON result per line."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON file, or - for stdin")
+        parser.add_argument("--author", required=True, help="Author email")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            author = get_user_model().objects.get(email=options["author"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['author']} does not exist")
+
+        importer = RecipeImporter(author, batch_size=options["batch_size"])
+        source = (
+            sys.stdin.buffer if options["path"] == "-" else open(options["path"], "rb")  # noqa: SIM115
+        )
+        created = failed = 0
+        with source:
+            for result in importer.run(source):
+                self.stdout.write(render_result(result).decode(), ending="")
+                if "errors" in result:
+                    failed += 1
+                else:
+                    created += 1
+        self.stderr.write(f"Imported {created} recipes, {failed} failed")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from kitchen.conversions import load_standard_units
+
+
+class Command(BaseCommand):
+    help = "Create the standard metric and US units and the factors between them."
+
+    def handle(self, *args, **options):
+        units, conversions = load_standard_units()
+        self.stdout.write(f"Created {units} units and {conversions} conversions")
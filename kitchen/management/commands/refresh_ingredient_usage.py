@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from kitchen.catalogue import refresh_ingredient_usage
+
+
+class Command(BaseCommand):
+    help = "Recount recipe usage of every ingredient; run it periodically."
+
+    def handle(self, *args, **options):
+        updated = refresh_ingredient_usage()
+        self.stdout.write(f"Updated usage of {updated} ingredients")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("kitchen", "0015_recipe_appliances"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-updated_at", "-uid"], name="recipe_feed_idx"),
+        ),
+    ]
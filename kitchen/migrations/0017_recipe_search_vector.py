@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:03
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vector(apps, schema_editor):
+    Recipe = apps.get_model("kitchen", "Recipe")
+    Instruction = apps.get_model("kitchen", "Instruction")
+    RecipeIngredient = apps.get_model("kitchen", "RecipeIngredient")
+    db_alias = schema_editor.connection.alias
+
+    instructions = (
+        Instruction.objects.using(db_alias)
+        .filter(recipe=OuterRef("pk"))
+        .values("recipe")
+        .annotate(text=StringAgg("description", delimiter=" "))
+        .values("text")
+    )
+    ingredients = (
+        RecipeIngredient.objects.using(db_alias)
+        .filter(recipe=OuterRef("pk"))
+        .values("recipe")
+        .annotate(text=StringAgg("ingredient__name", delimiter=" "))
+        .values("text")
+    )
+    Recipe.objects.using(db_alias).update(
+        search_vector=(
+            SearchVector("title", weight="A", config="english")
+            + SearchVector(Subquery(ingredients), weight="B", config="english")
+            + SearchVector("description", weight="C", config="english")
+            + SearchVector(Subquery(instructions), weight="D", config="english")
+            + SearchVector("notes", weight="D", config="english")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("kitchen", "0016_recipe_recipe_feed_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="recipe_search_idx"
+            ),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
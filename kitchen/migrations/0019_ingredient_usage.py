@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:42
+
+from django.db import migrations, models
+
+POPULATE_USAGE = """
+UPDATE kitchen_ingredient AS i
+SET usage = uses.count
+FROM (
+    SELECT ingredient_id, COUNT(*) AS count
+    FROM kitchen_recipeingredient
+    GROUP BY ingredient_id
+) AS uses
+WHERE uses.ingredient_id = i.uid
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("kitchen", "0018_ingredient_name_trgm_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredient",
+            name="usage",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(POPULATE_USAGE, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(fields=["-usage", "-uid"], name="ingredient_usage_idx"),
+        ),
+    ]
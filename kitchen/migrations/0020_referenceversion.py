@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+TABLES = ["kitchen_unit", "kitchen_manufacturer", "kitchen_appliancetype"]
+
+CREATE_TRIGGERS = """
+CREATE SEQUENCE kitchen_referenceversion_seq;
+
+INSERT INTO kitchen_referenceversion ("table", version)
+SELECT name, nextval('kitchen_referenceversion_seq')
+FROM unnest(ARRAY['kitchen_unit', 'kitchen_manufacturer', 'kitchen_appliancetype']) AS name;
+
+CREATE FUNCTION kitchen_bump_reference_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE kitchen_referenceversion
+    SET version = nextval('kitchen_referenceversion_seq')
+    WHERE "table" = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""" + "".join(
+    f"""
+CREATE TRIGGER {table}_reference_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+FOR EACH STATEMENT EXECUTE FUNCTION kitchen_bump_reference_version();
+"""
+    for table in TABLES
+)
+
+DROP_TRIGGERS = "".join(
+    f"DROP TRIGGER {table}_reference_version ON {table};\n" for table in TABLES
+) + (
+    "DROP FUNCTION kitchen_bump_reference_version();\n"
+    "DROP SEQUENCE kitchen_referenceversion_seq;\n"
+)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("kitchen", "0019_ingredient_usage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReferenceVersion",
+            fields=[
+                (
+                    "table",
+                    models.CharField(max_length=63, primary_key=True, serialize=False),
+                ),
+                ("version", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
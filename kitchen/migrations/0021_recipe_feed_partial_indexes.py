@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("kitchen", "0020_referenceversion"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="recipe",
+            name="recipe_feed_idx",
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                condition=models.Q(("is_draft", False), ("visibility", "PUBLIC")),
+                fields=["-updated_at", "-uid"],
+                name="recipe_public_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                condition=models.Q(("is_draft", False)),
+                fields=["author", "-updated_at", "-uid"],
+                name="recipe_author_feed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:06
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import migrations, models
+from django.db.models import OuterRef
+
+
+def populate_ingredient_uids(apps, schema_editor):
+    Recipe = apps.get_model("kitchen", "Recipe")
+    RecipeIngredient = apps.get_model("kitchen", "RecipeIngredient")
+    db_alias = schema_editor.connection.alias
+
+    uids = (
+        RecipeIngredient.objects.using(db_alias)
+        .filter(recipe=OuterRef("pk"))
+        .order_by("ingredient")
+        .distinct()
+        .values("ingredient")
+    )
+    Recipe.objects.using(db_alias).update(ingredient_uids=ArraySubquery(uids))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("kitchen", "0021_recipe_feed_partial_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="ingredient_uids",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.UUIDField(), default=list, editable=False, size=None
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["ingredient_uids"], name="recipe_ingredients_idx"
+            ),
+        ),
+        migrations.RunPython(populate_ingredient_uids, migrations.RunPython.noop),
+    ]
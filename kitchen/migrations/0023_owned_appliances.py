@@ -0,0 +1,99 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:13
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import shared.models
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import migrations, models
+from django.db.models import OuterRef
+
+
+def populate_appliance_uids(apps, schema_editor):
+    Recipe = apps.get_model("kitchen", "Recipe")
+    Appliance = apps.get_model("kitchen", "Appliance")
+    db_alias = schema_editor.connection.alias
+
+    appliances = Appliance.objects.using(db_alias).filter(recipe=OuterRef("pk"))
+    Recipe.objects.using(db_alias).update(
+        appliance_uids=ArraySubquery(appliances.order_by("uid").values("uid")),
+        appliance_type_uids=ArraySubquery(
+            appliances.order_by("type").distinct().values("type")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("kitchen", "0022_recipe_ingredient_uids"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OwnedAppliance",
+            fields=[
+                (
+                    "uid",
+                    models.UUIDField(
+                        db_default=shared.models.UUIDv7(),
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="appliance_type_uids",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.UUIDField(), default=list, editable=False, size=None
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="appliance_uids",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.UUIDField(), default=list, editable=False, size=None
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["appliance_uids"], name="recipe_appliances_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["appliance_type_uids"], name="recipe_appliance_types_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ownedappliance",
+            name="appliance",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="kitchen.appliance"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ownedappliance",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="owned_appliances",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ownedappliance",
+            constraint=models.UniqueConstraint(
+                fields=("user", "appliance"), name="unique_owned_appliance"
+            ),
+        ),
+        migrations.RunPython(populate_appliance_uids, migrations.RunPython.noop),
+    ]
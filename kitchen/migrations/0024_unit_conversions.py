@@ -0,0 +1,84 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:17
+
+import django.db.models.deletion
+import shared.models
+from django.db import migrations, models
+
+TRIGGER = """
+INSERT INTO kitchen_referenceversion ("table", version)
+VALUES ('kitchen_unitconversion', nextval('kitchen_referenceversion_seq'));
+
+CREATE TRIGGER kitchen_unitconversion_reference_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON kitchen_unitconversion
+FOR EACH STATEMENT EXECUTE FUNCTION kitchen_bump_reference_version();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER kitchen_unitconversion_reference_version ON kitchen_unitconversion;
+DELETE FROM kitchen_referenceversion WHERE "table" = 'kitchen_unitconversion';
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("kitchen", "0023_owned_appliances"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredient",
+            name="density",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="unit",
+            name="dimension",
+            field=models.CharField(
+                blank=True,
+                choices=[("MASS", "Mass"), ("VOLUME", "Volume"), ("COUNT", "Count")],
+                max_length=10,
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="UnitConversion",
+            fields=[
+                (
+                    "uid",
+                    models.UUIDField(
+                        db_default=shared.models.UUIDv7(),
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("factor", models.FloatField()),
+                (
+                    "source",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="kitchen.unit",
+                    ),
+                ),
+                (
+                    "target",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="kitchen.unit",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("source", "target"), name="unique_unit_conversion"
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(TRIGGER, DROP_TRIGGER),
+    ]
@@ -1,19 +1,54 @@
 from django.conf import settings
-from django.db import models
-from nanoid import generate
-from slugify import slugify
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import IntegrityError, models, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Upper
 
+from kitchen.slugs import allocate_slugs
 from shared.models import Common
 
 
 class Unit(Common):
+    class Dimension(models.TextChoices):
+        MASS = "MASS"
+        VOLUME = "VOLUME"
+        COUNT = "COUNT"
+
     name = models.CharField(max_length=255, db_index=True, unique=True)
     abbreviation = models.CharField(max_length=255, db_index=True, unique=True)
+    dimension = models.CharField(
+        max_length=10, choices=Dimension.choices, null=True, blank=True
+    )
 
     def __str__(self):
         return self.name
 
 
+class UnitConversion(Common):
+    """
+    ``1 source = factor target``. Only direct factors are stored; the
+    conversion matrix derives the reverse and every chained pair.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "target"], name="unique_unit_conversion"
+            )
+        ]
+
+    source = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name="+")
+    target = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name="+")
+    factor = models.FloatField()
+
+    def __str__(self):
+        return f"1 {self.source} = {self.factor} {self.target}"
+
+
 class Instruction(Common):
     class Meta:
         ordering = ["step"]
@@ -30,14 +65,112 @@ class Instruction(Common):
 
 
 class Ingredient(Common):
+    class Meta:
+        indexes = [
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="ingredient_name_trgm_idx",
+            ),
+            models.Index(fields=["-usage", "-uid"], name="ingredient_usage_idx"),
+        ]
+
     name = models.CharField(max_length=255, db_index=True)
     image = models.CharField(max_length=255, null=True, blank=True)
+    # Number of recipe rows using the ingredient, see refresh_ingredient_usage
+    usage = models.PositiveIntegerField(default=0, editable=False)
+    # Grams per millilitre, for volume to mass conversions
+    density = models.FloatField(null=True, blank=True)
 
     def __str__(self):
         return self.name
 
 
+SEARCH_CONFIG = "english"
+SLUG_ATTEMPTS = 3
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_relations(self):
+        """Load everything RecipeSchema renders, children ordered by uid."""
+        return self.select_related("author").prefetch_related(
+            "instructions",
+            models.Prefetch(
+                "appliances",
+                queryset=Appliance.objects.select_related(
+                    "manufacturer", "type"
+                ).order_by("uid"),
+            ),
+            models.Prefetch(
+                "recipeingredient_set",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient", "unit"
+                ).order_by("uid"),
+            ),
+        )
+
+    def update_search_fields(self):
+        """
+        Recompute the search columns from the recipe text and its children:
+        search_vector, the ingredient_uids behind the "what can I cook" search
+        and the appliance arrays behind the "my kitchen" filter.
+        """
+        instructions = (
+            Instruction.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe")
+            .annotate(text=StringAgg("description", delimiter=" "))
+            .values("text")
+        )
+        ingredients = (
+            RecipeIngredient.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe")
+            .annotate(text=StringAgg("ingredient__name", delimiter=" "))
+            .values("text")
+        )
+        uids = (
+            RecipeIngredient.objects.filter(recipe=OuterRef("pk"))
+            .order_by("ingredient")
+            .distinct()
+            .values("ingredient")
+        )
+        appliances = Appliance.objects.filter(recipe=OuterRef("pk"))
+        return self.update(
+            ingredient_uids=ArraySubquery(uids),
+            appliance_uids=ArraySubquery(
+                appliances.order_by("uid").values("uid"),
+            ),
+            appliance_type_uids=ArraySubquery(
+                appliances.order_by("type").distinct().values("type"),
+            ),
+            search_vector=(
+                SearchVector("title", weight="A", config=SEARCH_CONFIG)
+                + SearchVector(Subquery(ingredients), weight="B", config=SEARCH_CONFIG)
+                + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+                + SearchVector(Subquery(instructions), weight="D", config=SEARCH_CONFIG)
+                + SearchVector("notes", weight="D", config=SEARCH_CONFIG)
+            ),
+        )
+
+
 class Recipe(Common):
+    class Meta:
+        indexes = [
+            # The feed merges these two instead of OR-ing visibility and author
+            models.Index(
+                fields=["-updated_at", "-uid"],
+                name="recipe_public_feed_idx",
+                condition=models.Q(is_draft=False, visibility="PUBLIC"),
+            ),
+            models.Index(
+                fields=["author", "-updated_at", "-uid"],
+                name="recipe_author_feed_idx",
+                condition=models.Q(is_draft=False),
+            ),
+            GinIndex(fields=["search_vector"], name="recipe_search_idx"),
+            GinIndex(fields=["ingredient_uids"], name="recipe_ingredients_idx"),
+            GinIndex(fields=["appliance_uids"], name="recipe_appliances_idx"),
+            GinIndex(fields=["appliance_type_uids"], name="recipe_appliance_types_idx"),
+        ]
+
     class Visibility(models.TextChoices):
         PUBLIC = "PUBLIC"
         FRIENDS = "FRIENDS"
@@ -64,14 +197,42 @@ class Recipe(Common):
     ingredients = models.ManyToManyField(Ingredient, through="RecipeIngredient")
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     appliances = models.ManyToManyField("Appliance")
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Distinct ingredients of the recipe, an inverted index once GIN-indexed
+    ingredient_uids = ArrayField(models.UUIDField(), default=list, editable=False)
+    # Copies of the appliances M2M and of their types, for containment filters
+    appliance_uids = ArrayField(models.UUIDField(), default=list, editable=False)
+    appliance_type_uids = ArrayField(models.UUIDField(), default=list, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
-        if not self.slug and self.title:
-            slug = slugify(self.title)
-            while Recipe.objects.filter(slug=slug).exists():
-                slug = f"{slugify(self.title)}-{generate(size=4)}"
-            self.slug = slug
-        super().save(*args, **kwargs)
+        if self.slug or not self.title:
+            return super().save(*args, **kwargs)
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = allocate_slugs(Recipe.objects, [self.title])[0]
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # A concurrent save took the slug after it was allocated; only
+                # retry when that is what failed
+                slug, self.slug = self.slug, None
+                last = attempt + 1 == SLUG_ATTEMPTS
+                if last or not Recipe.objects.filter(slug=slug).exists():
+                    raise
+
+    def prefill(self, **relations):
+        """
+        Serve ``self.<relation>.all()`` from the given objects, as if they had
+        been loaded with prefetch_related, e.g. right after creating them.
+        """
+        cache = self.__dict__.setdefault("_prefetched_objects_cache", {})
+        for name, objects in relations.items():
+            queryset = getattr(self, name).all()
+            queryset._result_cache = list(objects)
+            queryset._prefetch_done = True
+            cache[name] = queryset
 
     def __str__(self):
         return self.title or f"draft__{self.uid}"
@@ -110,3 +271,38 @@ class Appliance(Common):
 
     def __str__(self):
         return f"{self.manufacturer} {self.model} ({self.type})"
+
+
+class OwnedAppliance(Common):
+    """An appliance in a user's kitchen."""
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "appliance"], name="unique_owned_appliance"
+            )
+        ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="owned_appliances",
+    )
+    appliance = models.ForeignKey(Appliance, on_delete=models.CASCADE)
+
+    def __str__(self):
+        return f"{self.user} - {self.appliance}"
+
+
+class ReferenceVersion(models.Model):
+    """
+    One row per reference table (units, manufacturers, appliance types). A
+    database trigger sets ``version`` from a sequence on every write to the
+    table, so a value is never reused, not even after a rollback.
+    """
+
+    table = models.CharField(max_length=63, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
@@ -0,0 +1,98 @@
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+
+from django.db import models
+from django.utils import timezone
+
+from kitchen.models import Instruction, Recipe, RecipeIngredient
+
+
+def _keyed(rows: Iterable, key: Callable) -> dict:
+    """Index rows by (key, n) so repeated keys pair up in order."""
+    seen = defaultdict(int)
+    keyed = {}
+    for row in rows:
+        value = key(row)
+        keyed[(value, seen[value])] = row
+        seen[value] += 1
+    return keyed
+
+
+def reconcile(
+    model: type[models.Model],
+    existing: Iterable[models.Model],
+    incoming: Iterable[models.Model],
+    key: Callable,
+    fields: list[str],
+) -> None:
+    """
+    Make the ``existing`` child rows match the unsaved ``incoming`` ones.
+
+    Rows are paired by ``key``: pairs keep their uid and are only written when
+    one of ``fields`` differs, existing rows without a pair are deleted and
+    incoming rows without one are inserted. That is at most one UPDATE, one
+    DELETE and one INSERT, and nothing at all when the lists are unchanged.
+    ``updated_at`` is bumped on updated rows since bulk_update skips auto_now.
+    """
+    current = _keyed(existing, key)
+    wanted = _keyed(incoming, key)
+
+    changed = []
+    now = timezone.now()
+    for position, row in wanted.items():
+        if position not in current:
+            continue
+        target = current[position]
+        if any(getattr(target, f) != getattr(row, f) for f in fields):
+            for field in fields:
+                setattr(target, field, getattr(row, field))
+            target.updated_at = now
+            changed.append(target)
+
+    stale = [row.uid for position, row in current.items() if position not in wanted]
+    if stale:
+        model.objects.filter(uid__in=stale).delete()
+    if changed:
+        model.objects.bulk_update(changed, [*fields, "updated_at"])
+    new = [row for position, row in wanted.items() if position not in current]
+    if new:
+        model.objects.bulk_create(new)
+
+
+def reconcile_instructions(recipe: Recipe, instructions: Iterable) -> None:
+    """Match instructions by step."""
+    reconcile(
+        Instruction,
+        recipe.instructions.all(),
+        [
+            Instruction(
+                recipe=recipe,
+                step=instruction.step,
+                description=instruction.description,
+                timer=instruction.timer,
+            )
+            for instruction in instructions
+        ],
+        key=lambda row: row.step,
+        fields=["description", "timer"],
+    )
+
+
+def reconcile_ingredients(recipe: Recipe, ingredients: Iterable) -> None:
+    """Match ingredient rows by ingredient uid."""
+    reconcile(
+        RecipeIngredient,
+        recipe.recipeingredient_set.all(),
+        [
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient.ingredient_uid,
+                unit_id=ingredient.unit_uid,
+                quantity=ingredient.quantity,
+                notes=ingredient.notes,
+            )
+            for ingredient in ingredients
+        ],
+        key=lambda row: row.ingredient_id,
+        fields=["unit_id", "quantity", "notes"],
+    )
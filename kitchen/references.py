@@ -0,0 +1,70 @@
+from collections.abc import Iterable
+
+from kitchen.cache import reference_cache
+from kitchen.models import Appliance, ApplianceType, Ingredient, Manufacturer, Unit
+
+
+def fetch_references(payloads: Iterable) -> dict[type, dict]:
+    """
+    The ingredients, units and appliances that ``payloads`` (RecipeCreateSchema
+    or DraftSchema) point at, by uid: one query for ingredients and one for
+    appliances, none when unused. Units come from the reference cache, and so
+    do the manufacturers and types attached to the appliances.
+    """
+    wanted = {Ingredient: set(), Unit: set(), Appliance: set()}
+    for payload in payloads:
+        for ingredient in payload.ingredients or ():
+            wanted[Ingredient].add(ingredient.ingredient_uid)
+            if ingredient.unit_uid:
+                wanted[Unit].add(ingredient.unit_uid)
+        wanted[Appliance].update(payload.appliance_uids or ())
+    units = reference_cache.get(Unit) if wanted[Unit] else {}
+    if not wanted[Unit] <= units.keys():
+        # Possibly created by another worker since our copy was last checked
+        reference_cache.invalidate()
+        units = reference_cache.get(Unit)
+    appliances = (
+        reference_cache.attach(
+            Appliance.objects.filter(uid__in=wanted[Appliance]),
+            manufacturer=Manufacturer,
+            type=ApplianceType,
+        )
+        if wanted[Appliance]
+        else []
+    )
+    ingredients = (
+        Ingredient.objects.filter(uid__in=wanted[Ingredient])
+        if wanted[Ingredient]
+        else []
+    )
+    return {
+        Ingredient: {obj.uid: obj for obj in ingredients},
+        Unit: {uid: units[uid] for uid in wanted[Unit] if uid in units},
+        Appliance: {obj.uid: obj for obj in appliances},
+    }
+
+
+def reference_errors(payload, references: dict[type, dict]) -> list[dict]:
+    """``{"loc", "msg"}`` for every uid in ``payload`` missing from ``references``."""
+    errors = []
+    for index, ingredient in enumerate(payload.ingredients or ()):
+        if ingredient.ingredient_uid not in references[Ingredient]:
+            errors.append(
+                {
+                    "loc": ["ingredients", index, "ingredient_uid"],
+                    "msg": "Ingredient does not exist",
+                }
+            )
+        if ingredient.unit_uid and ingredient.unit_uid not in references[Unit]:
+            errors.append(
+                {
+                    "loc": ["ingredients", index, "unit_uid"],
+                    "msg": "Unit does not exist",
+                }
+            )
+    for index, uid in enumerate(payload.appliance_uids or ()):
+        if uid not in references[Appliance]:
+            errors.append(
+                {"loc": ["appliance_uids", index], "msg": "Appliance does not exist"}
+            )
+    return errors
@@ -0,0 +1,81 @@
+import uuid
+
+from django.db import connection
+
+from kitchen.conversions import (
+    DENSITY_MASS_UNIT,
+    DENSITY_VOLUME_UNIT,
+    ConversionMatrix,
+)
+from kitchen.models import Ingredient, RecipeIngredient, Unit
+
+MAX_SHOPPING_RECIPES = 200
+
+
+def _shopping_sql() -> str:
+    return f"""
+    SELECT
+        ri.ingredient_id,
+        i.name,
+        line.unit_id,
+        SUM(ri.quantity * r.servings * line.factor),
+        COUNT(DISTINCT ri.recipe_id)
+    FROM {RecipeIngredient._meta.db_table} ri
+    JOIN unnest(%s::uuid[], %s::float8[]) AS r(recipe_id, servings)
+        ON r.recipe_id = ri.recipe_id
+    JOIN {Ingredient._meta.db_table} i ON i.uid = ri.ingredient_id
+    LEFT JOIN unnest(%s::uuid[], %s::uuid[], %s::float8[], %s::float8[])
+        AS c(unit_id, canonical_id, factor, to_ml)
+        ON c.unit_id = ri.unit_id
+    CROSS JOIN LATERAL (
+        SELECT
+            CASE WHEN i.density IS NOT NULL AND c.to_ml IS NOT NULL
+                THEN %s::uuid ELSE COALESCE(c.canonical_id, ri.unit_id) END,
+            CASE WHEN i.density IS NOT NULL AND c.to_ml IS NOT NULL
+                THEN c.to_ml * i.density ELSE COALESCE(c.factor, 1) END
+    ) AS line(unit_id, factor)
+    GROUP BY ri.ingredient_id, i.name, line.unit_id
+    ORDER BY i.name, ri.ingredient_id, line.unit_id NULLS FIRST
+    """
+
+
+def shopping_list(servings: dict[uuid.UUID, float], matrix: ConversionMatrix) -> list:
+    """
+    The ingredients of the recipes in ``servings`` (uid -> multiplier), one
+    line per ingredient and canonical unit: grams, millilitres or pieces
+    when a unit converts to them, and grams for any volume of an ingredient
+    with a density. Lines that cannot be converted keep their own unit.
+
+    One query: the multipliers and each unit's factor to its canonical unit
+    go in as arrays, and Postgres scales, groups and sums the rows.
+    """
+    units = list(matrix.index)
+    canonical = [matrix.canonical(uid) for uid in units]
+    grams = matrix.by_abbreviation.get(DENSITY_MASS_UNIT)
+    millilitres = matrix.by_abbreviation.get(DENSITY_VOLUME_UNIT)
+    to_ml = [
+        matrix.factor(uid, millilitres)
+        if grams and millilitres and matrix.dimensions[i] == Unit.Dimension.VOLUME
+        else None
+        for i, uid in enumerate(units)
+    ]
+    params = [
+        list(servings),
+        [float(multiplier) for multiplier in servings.values()],
+        units,
+        [target for target, _ in canonical],
+        [factor for _, factor in canonical],
+        to_ml,
+        grams,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(_shopping_sql(), params)
+        return [
+            {
+                "ingredient": {"uid": ingredient_uid, "name": name},
+                "unit_uid": unit_uid,
+                "quantity": quantity,
+                "recipes": recipes,
+            }
+            for ingredient_uid, name, unit_uid, quantity, recipes in cursor.fetchall()
+        ]
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from kitchen.cache import recipe_cache, reference_cache
+from kitchen.catalogue import invalidate_catalogue_version
+from kitchen.models import (
+    Appliance,
+    ApplianceType,
+    Ingredient,
+    Instruction,
+    Manufacturer,
+    Recipe,
+    RecipeIngredient,
+    Unit,
+    UnitConversion,
+)
+
+
+def invalidate_recipes(*uids):
+    transaction.on_commit(lambda: recipe_cache.invalidate(*uids))
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes(instance.uid)
+
+
+# Only post_save: a post_delete receiver would disable fast deletes of children.
+# The API write paths save the parent recipe after touching them, and the
+# standalone admin pages refresh it themselves.
+@receiver(post_save, sender=Instruction)
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_child_changed(sender, instance, **kwargs):
+    invalidate_recipes(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.appliances.through)
+def recipe_appliances_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        invalidate_recipes(instance.uid)
+    elif pk_set:
+        invalidate_recipes(*pk_set)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Unit)
+@receiver([post_save, post_delete], sender=Appliance)
+@receiver([post_save, post_delete], sender=Manufacturer)
+@receiver([post_save, post_delete], sender=ApplianceType)
+def catalogue_changed(sender, instance, created=False, **kwargs):
+    if sender is Ingredient:
+        transaction.on_commit(invalidate_catalogue_version)
+    # Fresh catalogue rows are not referenced by any cached recipe yet
+    if not created:
+        transaction.on_commit(recipe_cache.invalidate_all)
+
+
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Appliance)
+def recipe_reference_deleted(sender, instance, **kwargs):
+    # The cascade drops the recipe rows but not the uids copied onto recipes
+    field = "ingredient_uids" if sender is Ingredient else "appliance_uids"
+    Recipe.objects.filter(
+        **{f"{field}__contains": [instance.uid]}
+    ).update_search_fields()
+
+
+@receiver(pre_delete, sender=Unit)
+def unit_deleting(sender, instance, **kwargs):
+    # The cascade drops the recipe rows in that unit, and with them
+    # ingredients the recipes may no longer have
+    uids = list(
+        RecipeIngredient.objects.filter(unit=instance)
+        .values_list("recipe_id", flat=True)
+        .distinct()
+    )
+    if uids:
+        transaction.on_commit(
+            lambda: Recipe.objects.filter(pk__in=uids).update_search_fields()
+        )
+
+
+@receiver([post_save, post_delete], sender=Unit)
+@receiver([post_save, post_delete], sender=UnitConversion)
+@receiver([post_save, post_delete], sender=Manufacturer)
+@receiver([post_save, post_delete], sender=ApplianceType)
+def reference_changed(sender, instance, **kwargs):
+    # Now for reads later in this transaction, again once other readers can
+    # see the change
+    reference_cache.invalidate()
+    transaction.on_commit(reference_cache.invalidate)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and not {"username", "handler"} & set(update_fields)):
+        return
+    uids = Recipe.objects.filter(
+        author=instance, is_draft=False, visibility=Recipe.Visibility.PUBLIC
+    ).values_list("uid", flat=True)
+    if uids:
+        invalidate_recipes(*uids)
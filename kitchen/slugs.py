@@ -0,0 +1,59 @@
+from collections.abc import Sequence
+
+from nanoid import generate
+from slugify import slugify
+
+SUFFIX_SIZE = 4
+CANDIDATES_PER_TITLE = 8
+
+
+def _candidates(base: str, with_base: bool) -> list[str]:
+    candidates = [base] if with_base and base else []
+    while len(candidates) < CANDIDATES_PER_TITLE:
+        candidates.append(f"{base}-{generate(size=SUFFIX_SIZE)}")
+    return candidates
+
+
+def allocate_slugs(queryset, titles: Sequence[str | None]) -> list[str | None]:
+    """
+    Unique slugs for ``titles``, None where there is no title.
+
+    Every title gets its plain slug plus a handful of random suffixed
+    alternatives, and one ``slug IN (...)`` lookup on the unique index tells
+    which of them are taken, so a batch costs a single query however common
+    the titles are. Slugs handed out earlier in the same batch are skipped too.
+    ``queryset`` is the recipe manager to check against, which lets migrations
+    pass their historical model.
+    """
+    slugs: list[str | None] = [None] * len(titles)
+    pending = [index for index, title in enumerate(titles) if title]
+    bases = {index: slugify(titles[index]) for index in pending}
+    used: set[str] = set()
+    first_round = True
+    while pending:
+        candidates = {
+            index: _candidates(bases[index], first_round) for index in pending
+        }
+        taken = set(
+            queryset.filter(
+                slug__in=[slug for group in candidates.values() for slug in group]
+            ).values_list("slug", flat=True)
+        )
+        unresolved = []
+        for index in pending:
+            free = next(
+                (
+                    slug
+                    for slug in candidates[index]
+                    if slug not in taken and slug not in used
+                ),
+                None,
+            )
+            if free is None:
+                unresolved.append(index)
+                continue
+            slugs[index] = free
+            used.add(free)
+        pending = unresolved
+        first_round = False
+    return slugs
@@ -2,7 +2,7 @@ import pytest
 import uuid6
 from ninja_extra import status
 
-from kitchen.models import Appliance, Manufacturer, ApplianceType
+from kitchen.models import Appliance, Manufacturer, ApplianceType, OwnedAppliance
 
 
 @pytest.mark.django_db
@@ -130,3 +130,42 @@ def test_create_appliance_validation_error(
 
     assert resp.status_code == status.HTTP_400_BAD_REQUEST
     assert resp.json() == ["Appliance type does not exist"]
+
+
+@pytest.mark.django_db
+def test_set_my_appliances(authenticated_client, user, appliance_factory):
+    kept, dropped, added = appliance_factory.create_batch(3)
+    OwnedAppliance.objects.create(user=user, appliance=kept)
+    OwnedAppliance.objects.create(user=user, appliance=dropped)
+
+    resp = authenticated_client.put(
+        "/api/kitchen/appliances/mine",
+        {"appliance_uids": [str(kept.uid), str(added.uid)]},
+        content_type="application/json",
+    )
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert {x["uid"] for x in resp.json()} == {str(kept.uid), str(added.uid)}
+    mine = authenticated_client.get("/api/kitchen/appliances/mine").json()
+    assert {x["uid"] for x in mine} == {str(kept.uid), str(added.uid)}
+
+
+@pytest.mark.django_db
+def test_set_my_appliances_unknown(authenticated_client, user, appliance):
+    OwnedAppliance.objects.create(user=user, appliance=appliance)
+
+    resp = authenticated_client.put(
+        "/api/kitchen/appliances/mine",
+        {"appliance_uids": [str(uuid6.uuid7())]},
+        content_type="application/json",
+    )
+
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    assert OwnedAppliance.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+def test_my_appliances_requires_auth(client):
+    resp = client.get("/api/kitchen/appliances/mine")
+
+    assert resp.status_code == status.HTTP_401_UNAUTHORIZED
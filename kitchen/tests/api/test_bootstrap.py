@@ -0,0 +1,73 @@
+import pytest
+from ninja_extra import status
+
+from kitchen.models import Ingredient, Unit
+
+URL = "/api/kitchen/bootstrap/"
+
+
+@pytest.mark.django_db
+def test_bootstrap(client, unit, appliance, ingredient_factory):
+    ingredients = ingredient_factory.create_batch(3)
+    Ingredient.objects.filter(uid=ingredients[1].uid).update(usage=5)
+
+    resp = client.get(f"{URL}?ingredients=2")
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp["ETag"]
+    data = resp.json()
+    assert data["units"] == [
+        {
+            "uid": str(unit.uid),
+            "abbreviation": unit.abbreviation,
+            "name": unit.name,
+            "dimension": None,
+        }
+    ]
+    assert data["appliances"][0]["manufacturer"]["name"] == appliance.manufacturer.name
+    assert data["appliances"][0]["type"]["name"] == appliance.type.name
+    assert len(data["ingredients"]) == 2
+    assert data["ingredients"][0]["uid"] == str(ingredients[1].uid)
+    assert (
+        data["catalogue_version"]
+        == client.get("/api/kitchen/ingredients/").headers["X-Catalogue-Version"]
+    )
+
+
+@pytest.mark.django_db
+def test_bootstrap_compact(client, unit, appliance, ingredient):
+    unit.dimension = Unit.Dimension.MASS
+    unit.save()
+    resp = client.get(f"{URL}?compact=true")
+
+    assert resp.status_code == status.HTTP_200_OK
+    data = resp.json()
+    assert data["units"] == [[str(unit.uid), unit.abbreviation, unit.name, "MASS"]]
+    assert data["manufacturers"] == [
+        [str(appliance.manufacturer.uid), appliance.manufacturer.name]
+    ]
+    assert data["appliance_types"] == [[str(appliance.type.uid), appliance.type.name]]
+    assert data["appliances"] == [
+        [
+            str(appliance.uid),
+            appliance.model,
+            str(appliance.manufacturer.uid),
+            str(appliance.type.uid),
+        ]
+    ]
+    assert data["ingredients"] == [[str(ingredient.uid), ingredient.name]]
+    assert resp["ETag"] != client.get(URL)["ETag"]
+
+
+@pytest.mark.django_db
+def test_bootstrap_not_modified(client, unit, appliance, ingredient, unit_factory):
+    etag = client.get(URL)["ETag"]
+
+    resp = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+    assert resp["ETag"] == etag
+
+    unit_factory(name="pinch", abbreviation="pn")
+    resp = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp["ETag"] != etag
@@ -1,6 +1,11 @@
+import base64
+import json
+
 import pytest
+from django.core.management import call_command
 from ninja_extra import status
 
+from kitchen.catalogue import refresh_ingredient_usage
 from kitchen.models import Ingredient
 
 
@@ -9,12 +14,147 @@ def test_list_ingredients(client, ingredient_factory):
     ings = ingredient_factory.create_batch(5)
     resp = client.get("/api/kitchen/ingredients/")
     assert resp.status_code == status.HTTP_200_OK
-    data = resp.json()
+    data = resp.json()["items"]
     names = sorted(d["name"] for d in data)
 
     assert {ing.name for ing in ings} == set(names)
 
 
+@pytest.mark.django_db
+def test_list_ingredients_by_usage(
+    client, recipe, ingredient_factory, recipe_ingredient_factory, unit
+):
+    popular = ingredient_factory(name="Salt")
+    recipe_ingredient_factory.create_batch(
+        5, recipe=recipe, ingredient=popular, unit=unit
+    )
+    refresh_ingredient_usage()
+
+    names, cursor = [], ""
+    while cursor is not None:
+        page = client.get(f"/api/kitchen/ingredients/?page_size=1&cursor={cursor}")
+        names += [x["name"] for x in page.json()["items"]]
+        cursor = page.json()["next_cursor"]
+
+    assert names[0] == "Salt"
+    assert sorted(names) == sorted(Ingredient.objects.values_list("name", flat=True))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("values", [["many", "garbage"], [None, None]])
+def test_list_ingredients_invalid_cursor(client, values):
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    resp = client.get(f"/api/kitchen/ingredients/?cursor={cursor}")
+
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_list_ingredients_prefix(client, ingredient_factory):
+    for name in ["Tomato", "tomatillo", "Potato"]:
+        ingredient_factory(name=name)
+
+    resp = client.get("/api/kitchen/ingredients/?prefix=TOM")
+
+    assert {x["name"] for x in resp.json()["items"]} == {"Tomato", "tomatillo"}
+
+
+@pytest.mark.django_db
+def test_list_ingredients_not_modified(
+    client,
+    ingredient_factory,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    ingredient_factory(name="Tomato")
+    resp = client.get("/api/kitchen/ingredients/")
+    etag = resp["ETag"]
+
+    with django_assert_num_queries(0):
+        cached = client.get("/api/kitchen/ingredients/", HTTP_IF_NONE_MATCH=etag)
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient_factory(name="Basil")
+    changed = client.get("/api/kitchen/ingredients/", HTTP_IF_NONE_MATCH=etag)
+
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed["X-Catalogue-Version"] != resp["X-Catalogue-Version"]
+
+
+@pytest.mark.django_db
+def test_list_ingredients_usage_refresh(
+    client, recipe, ingredient_factory, django_capture_on_commit_callbacks
+):
+    ingredient_factory.create_batch(3)
+    first = client.get("/api/kitchen/ingredients/?page_size=2")
+    version = first["X-Catalogue-Version"]
+    cursor = first.json()["next_cursor"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        refresh_ingredient_usage()
+    resp = client.get(
+        "/api/kitchen/ingredients/?page_size=2", HTTP_IF_NONE_MATCH=first["ETag"]
+    )
+    changes = client.get(f"/api/kitchen/ingredients/changes?since={version}").json()
+
+    # New order, new tag; the delta still applies
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp["X-Catalogue-Version"] != version
+    assert changes["reset"] is False
+    # A cursor from before the refresh could skip or repeat rows
+    resp = client.get(f"/api/kitchen/ingredients/?page_size=2&cursor={cursor}")
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_ingredient_changes(
+    client, ingredient_factory, django_capture_on_commit_callbacks
+):
+    ingredient_factory(name="Tomato")
+    version = client.get("/api/kitchen/ingredients/")["X-Catalogue-Version"]
+
+    unchanged = client.get(f"/api/kitchen/ingredients/changes?since={version}").json()
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient_factory(name="Basil")
+    changed = client.get(f"/api/kitchen/ingredients/changes?since={version}").json()
+
+    assert unchanged == {"version": version, "reset": False, "items": []}
+    assert changed["version"] != version
+    assert not changed["reset"]
+    assert "Basil" in {x["name"] for x in changed["items"]}
+
+
+@pytest.mark.django_db
+def test_ingredient_changes_reset_after_delete(
+    client, ingredient_factory, django_capture_on_commit_callbacks
+):
+    ingredient = ingredient_factory(name="Tomato")
+    ingredient_factory(name="Basil")
+    version = client.get("/api/kitchen/ingredients/")["X-Catalogue-Version"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient.delete()
+    resp = client.get(f"/api/kitchen/ingredients/changes?since={version}").json()
+
+    assert resp["reset"] is True
+
+
+@pytest.mark.django_db
+def test_ingredient_changes_invalid_version(client):
+    resp = client.get("/api/kitchen/ingredients/changes?since=nope")
+
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_refresh_ingredient_usage_command(recipe):
+    Ingredient.objects.update(usage=0)
+
+    call_command("refresh_ingredient_usage", stdout=None)
+
+    assert set(Ingredient.objects.values_list("usage", flat=True)) == {1}
+
+
 @pytest.mark.django_db
 def test_create_ingredient(authenticated_client):
     url = "/api/kitchen/ingredients/"
@@ -53,3 +193,40 @@ def test_create_ingredient_idempotent_by_name(authenticated_client, name):
 
     assert r2.status_code == status.HTTP_200_OK
     assert r2.json()["uid"] == first_uid
+
+
+@pytest.mark.django_db
+def test_autocomplete_ingredients(client, ingredient_factory):
+    for name in ["Tomato", "Tomatillo", "Potato", "Basil"]:
+        ingredient_factory(name=name)
+
+    resp = client.get("/api/kitchen/ingredients/autocomplete?q=toma")
+    assert resp.status_code == status.HTTP_200_OK
+    names = [d["name"] for d in resp.json()]
+
+    assert names[:2] == ["Tomato", "Tomatillo"]
+    assert "Basil" not in names
+
+
+@pytest.mark.django_db
+def test_autocomplete_ingredients_fuzzy(client, ingredient_factory):
+    ingredient_factory(name="Tomato")
+    ingredient_factory(name="Basil")
+
+    resp = client.get("/api/kitchen/ingredients/autocomplete?q=tomatoe")
+    names = [d["name"] for d in resp.json()]
+
+    assert names == ["Tomato"]
+
+
+@pytest.mark.django_db
+def test_autocomplete_ingredients_limit(client, ingredient_factory):
+    for i in range(5):
+        ingredient_factory(name=f"Pepper {i}")
+
+    resp = client.get("/api/kitchen/ingredients/autocomplete?q=pep&limit=3")
+
+    assert len(resp.json()) == 3
+    resp = client.get("/api/kitchen/ingredients/autocomplete?q=pep&limit=-1")
+    assert resp.status_code == status.HTTP_200_OK
+    assert len(resp.json()) == 1
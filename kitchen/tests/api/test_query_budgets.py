@@ -0,0 +1,486 @@
+import json
+
+import pytest
+from ninja_extra import status
+
+from core.api import api
+from kitchen.api.appliances.api import AppliancesController
+from kitchen.api.bootstrap import BootstrapController
+from kitchen.api.drafts import RecipeDraftsController
+from kitchen.api.ingredients import IngredientsController
+from kitchen.api.recipes import RecipesController
+from kitchen.api.units import UnitsController
+from kitchen.models import OwnedAppliance, Recipe
+from shared.budgets import get_query_budget
+
+SIZES = [1, 10, 100]
+
+# Social login runs the python-social-auth pipeline, which is not ours to budget
+UNBUDGETED = {"/auth"}
+
+
+def test_every_endpoint_declares_a_budget():
+    missing = [
+        f"{op.methods} {prefix}{path}"
+        for prefix, router in api._routers
+        if prefix not in UNBUDGETED
+        for path, view in router.path_operations.items()
+        for op in view.operations
+        if get_query_budget(op.view_func) is None
+    ]
+
+    assert not missing
+
+
+@pytest.fixture
+def make_recipe(
+    user,
+    recipe_factory,
+    recipe_ingredient_factory,
+    instruction_factory,
+    appliance_factory,
+    unit,
+):
+    """A recipe of the user's with ``size`` extra ingredients, steps and appliances."""
+
+    def _make(size, **kwargs):
+        recipe = recipe_factory(
+            author=user,
+            ingredients__unit=unit,
+            appliances=appliance_factory.create_batch(size),
+            **kwargs,
+        )
+        recipe_ingredient_factory.create_batch(size, recipe=recipe, unit=unit)
+        instruction_factory.create_batch(size, recipe=recipe)
+        return recipe
+
+    return _make
+
+
+@pytest.fixture
+def make_payload(ingredient_factory, appliance_factory, unit):
+    def _make(size):
+        return {
+            "title": "Budget soup",
+            "description": "Hot",
+            "visibility": "PUBLIC",
+            "instructions": [
+                {"step": step, "description": f"Step {step}"} for step in range(size)
+            ],
+            "ingredients": [
+                {
+                    "ingredient_uid": str(ingredient.uid),
+                    "unit_uid": str(unit.uid),
+                    "quantity": 1,
+                }
+                for ingredient in ingredient_factory.create_batch(size)
+            ],
+            "appliance_uids": [
+                str(appliance.uid) for appliance in appliance_factory.create_batch(size)
+            ],
+        }
+
+    return _make
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_list_recipes_budget(
+    authenticated_client,
+    user,
+    recipe_factory,
+    unit,
+    appliance,
+    assert_query_budget,
+    size,
+):
+    recipe_factory.create_batch(
+        size, author=user, ingredients__unit=unit, appliances=[appliance]
+    )
+
+    with assert_query_budget(RecipesController.list_recipes):
+        resp = authenticated_client.get("/api/kitchen/recipes/")
+
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_list_recipes_in_kitchen_budget(
+    authenticated_client, user, make_recipe, assert_query_budget, size
+):
+    recipes = [make_recipe(size, visibility="PUBLIC", is_draft=False) for _ in range(3)]
+    Recipe.objects.all().update_search_fields()
+    for appliance in recipes[0].appliances.all():
+        OwnedAppliance.objects.create(user=user, appliance=appliance)
+
+    with assert_query_budget(RecipesController.list_recipes):
+        resp = authenticated_client.get("/api/kitchen/recipes/?kitchen=types")
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["items"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_my_appliances_budget(
+    authenticated_client, appliance_factory, assert_query_budget, size
+):
+    # The factory gets or creates by model name, so a batch may repeat rows
+    uids = {str(appliance.uid) for appliance in appliance_factory.create_batch(size)}
+
+    with assert_query_budget(AppliancesController.set_my_appliances):
+        resp = authenticated_client.put(
+            "/api/kitchen/appliances/mine",
+            {"appliance_uids": list(uids)},
+            content_type="application/json",
+        )
+    assert resp.status_code == status.HTTP_200_OK
+
+    with assert_query_budget(AppliancesController.list_my_appliances):
+        resp = authenticated_client.get("/api/kitchen/appliances/mine")
+    assert len(resp.json()) == len(uids)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_search_recipes_budget(
+    authenticated_client,
+    user,
+    recipe_factory,
+    unit,
+    appliance,
+    assert_query_budget,
+    size,
+):
+    recipe_factory.create_batch(
+        size,
+        author=user,
+        title="Tomato soup",
+        ingredients__unit=unit,
+        appliances=[appliance],
+    )
+
+    with assert_query_budget(RecipesController.search_recipes):
+        resp = authenticated_client.get("/api/kitchen/recipes/search?q=tomato")
+
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_cook_recipes_budget(client, make_recipe, assert_query_budget, size):
+    recipes = [make_recipe(size, visibility="PUBLIC", is_draft=False) for _ in range(3)]
+    Recipe.objects.all().update_search_fields()
+    pantry = recipes[0].recipeingredient_set.values_list("ingredient", flat=True)
+    query = "&".join(f"ingredients={uid}" for uid in pantry[:5])
+
+    with assert_query_budget(RecipesController.cook_recipes):
+        resp = client.get(f"/api/kitchen/recipes/cook?{query}")
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_shopping_list_budget(
+    authenticated_client, make_recipe, assert_query_budget, size
+):
+    recipes = [make_recipe(size) for _ in range(3)]
+    payload = {"recipes": [{"uid": str(r.uid), "servings": 2} for r in recipes]}
+
+    with assert_query_budget(RecipesController.shopping_list):
+        resp = authenticated_client.post(
+            "/api/kitchen/recipes/shopping-list",
+            payload,
+            content_type="application/json",
+        )
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_get_recipe_budget(client, make_recipe, assert_query_budget, size):
+    recipe = make_recipe(size)
+
+    with assert_query_budget(RecipesController.get_recipe):
+        resp = client.get(f"/api/kitchen/recipes/{recipe.uid}")
+    with assert_query_budget(RecipesController.get_recipe_by_slug):
+        client.get(f"/api/kitchen/recipes/{recipe.slug}")
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert len(resp.json()["ingredients"]) == size + 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_create_recipe_budget(
+    authenticated_client, make_payload, assert_query_budget, size
+):
+    payload = make_payload(size)
+
+    with assert_query_budget(RecipesController.create_recipe):
+        resp = authenticated_client.post(
+            "/api/kitchen/recipes/", payload, content_type="application/json"
+        )
+
+    assert resp.status_code == status.HTTP_201_CREATED
+    assert len(resp.json()["ingredients"]) == size
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_update_recipe_budget(
+    authenticated_client, make_recipe, make_payload, assert_query_budget, size
+):
+    recipe = make_recipe(size)
+    payload = make_payload(size)
+
+    with assert_query_budget(RecipesController.update_recipe):
+        resp = authenticated_client.patch(
+            f"/api/kitchen/recipes/{recipe.uid}",
+            payload,
+            content_type="application/json",
+        )
+
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_delete_recipe_budget(
+    authenticated_client, make_recipe, assert_query_budget, size
+):
+    recipe = make_recipe(size)
+
+    with assert_query_budget(RecipesController.delete_recipe):
+        resp = authenticated_client.delete(f"/api/kitchen/recipes/{recipe.uid}")
+
+    assert resp.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_export_recipes_budget(
+    get_authenticated_client,
+    user,
+    recipe_factory,
+    unit,
+    appliance,
+    assert_query_budget,
+    size,
+):
+    user.is_staff = True
+    user.save()
+    authenticated_client = get_authenticated_client(user)
+    recipe_factory.create_batch(
+        size, author=user, ingredients__unit=unit, appliances=[appliance]
+    )
+
+    with assert_query_budget(RecipesController.export_recipes):
+        resp = authenticated_client.get("/api/kitchen/recipes/export")
+        lines = b"".join(resp).splitlines()
+
+    assert len(lines) == size
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_export_recipes_budget_per_chunk(
+    get_authenticated_client,
+    user,
+    recipe_factory,
+    unit,
+    appliance,
+    assert_query_budget,
+    size,
+):
+    user.is_staff = True
+    user.save()
+    authenticated_client = get_authenticated_client(user)
+    recipe_factory.create_batch(
+        size, author=user, ingredients__unit=unit, appliances=[appliance]
+    )
+    chunk_size = 3
+    # A last, empty chunk ends the stream when the size is a multiple
+    chunks = size // chunk_size + 1
+    url = f"/api/kitchen/recipes/export?chunk_size={chunk_size}"
+
+    with assert_query_budget(RecipesController.export_recipes, chunks):
+        lines = b"".join(authenticated_client.get(url)).splitlines()
+    # The budget is per chunk: one chunk less would not fit
+    if chunks > 1:
+        with pytest.raises(pytest.fail.Exception):
+            with assert_query_budget(RecipesController.export_recipes, chunks - 1):
+                b"".join(authenticated_client.get(url))
+
+    assert len(lines) == size
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_import_recipes_budget(
+    authenticated_client, user, make_payload, assert_query_budget, size
+):
+    user.is_staff = True
+    user.save()
+    body = "\n".join(json.dumps(make_payload(1)) for _ in range(size))
+
+    with assert_query_budget(RecipesController.import_recipes):
+        resp = authenticated_client.post(
+            "/api/kitchen/recipes/import",
+            data=body,
+            content_type="application/x-ndjson",
+        )
+        results = [json.loads(line) for line in b"".join(resp).splitlines()]
+
+    assert all("uid" in result for result in results)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_import_recipes_budget_per_batch(
+    authenticated_client, user, make_payload, assert_query_budget, size
+):
+    user.is_staff = True
+    user.save()
+    body = "\n".join(json.dumps(make_payload(1)) for _ in range(size))
+    batch_size = 3
+    batches = -(-size // batch_size)
+
+    def post():
+        resp = authenticated_client.post(
+            f"/api/kitchen/recipes/import?batch_size={batch_size}",
+            data=body,
+            content_type="application/x-ndjson",
+        )
+        return [json.loads(line) for line in b"".join(resp).splitlines()]
+
+    with assert_query_budget(RecipesController.import_recipes, batches):
+        results = post()
+    if batches > 1:
+        with pytest.raises(pytest.fail.Exception):
+            with assert_query_budget(RecipesController.import_recipes, batches - 1):
+                post()
+
+    assert len(results) == size
+    assert all("uid" in result for result in results)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_list_drafts_budget(
+    authenticated_client, make_recipe, assert_query_budget, size
+):
+    make_recipe(size, is_draft=True)
+    make_recipe(size, is_draft=True)
+
+    with assert_query_budget(RecipeDraftsController.list_drafts):
+        resp = authenticated_client.get("/api/kitchen/recipes/drafts/")
+
+    assert len(resp.json()) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_get_draft_budget(authenticated_client, make_recipe, assert_query_budget, size):
+    draft = make_recipe(size, is_draft=True)
+
+    with assert_query_budget(RecipeDraftsController.get_draft):
+        resp = authenticated_client.get(f"/api/kitchen/recipes/drafts/{draft.uid}")
+
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_create_draft_budget(
+    authenticated_client, make_recipe, assert_query_budget, size
+):
+    with assert_query_budget(RecipeDraftsController.create_draft):
+        resp = authenticated_client.post("/api/kitchen/recipes/drafts/")
+    assert resp.status_code == status.HTTP_201_CREATED
+
+    make_recipe(size, is_draft=True)
+    with assert_query_budget(RecipeDraftsController.create_draft):
+        resp = authenticated_client.post("/api/kitchen/recipes/drafts/")
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_update_draft_budget(
+    authenticated_client, make_recipe, make_payload, assert_query_budget, size
+):
+    draft = make_recipe(size, is_draft=True)
+    payload = make_payload(size)
+
+    with assert_query_budget(RecipeDraftsController.update_draft):
+        resp = authenticated_client.patch(
+            f"/api/kitchen/recipes/drafts/{draft.uid}",
+            payload,
+            content_type="application/json",
+        )
+
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_finish_draft_budget(
+    authenticated_client, make_recipe, assert_query_budget, size
+):
+    draft = make_recipe(size, is_draft=True)
+
+    with assert_query_budget(RecipeDraftsController.finish_draft):
+        resp = authenticated_client.post(
+            f"/api/kitchen/recipes/drafts/{draft.uid}/finish"
+        )
+
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_delete_draft_budget(
+    authenticated_client, make_recipe, assert_query_budget, size
+):
+    draft = make_recipe(size, is_draft=True)
+
+    with assert_query_budget(RecipeDraftsController.delete_draft):
+        resp = authenticated_client.delete(f"/api/kitchen/recipes/drafts/{draft.uid}")
+
+    assert resp.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_catalogue_budgets(
+    client,
+    ingredient_factory,
+    unit_factory,
+    appliance_factory,
+    assert_query_budget,
+    size,
+):
+    ingredient_factory.create_batch(size)
+    appliance_factory.create_batch(size)
+    for n in range(size):
+        unit_factory(name=f"unit {n}", abbreviation=f"u{n}")
+
+    with assert_query_budget(IngredientsController.list_ingredients):
+        client.get("/api/kitchen/ingredients/")
+    with assert_query_budget(IngredientsController.autocomplete_ingredients):
+        client.get("/api/kitchen/ingredients/autocomplete?q=a")
+    with assert_query_budget(UnitsController.list_units):
+        client.get("/api/kitchen/units/")
+    with assert_query_budget(AppliancesController.list_appliances):
+        resp = client.get("/api/kitchen/appliances/")
+    assert resp.status_code == status.HTTP_200_OK
+
+    with assert_query_budget(BootstrapController.bootstrap):
+        resp = client.get("/api/kitchen/bootstrap/?compact=true")
+    assert resp.status_code == status.HTTP_200_OK
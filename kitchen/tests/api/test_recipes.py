@@ -1,18 +1,37 @@
+import base64
+import json
+from io import StringIO
+
 import pytest
 import uuid6
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
 from ninja_extra import status
 
-from kitchen.models import Ingredient, Instruction, Recipe, Unit
+from kitchen.api.recipes import RecipesController
+from kitchen.cooking import rank_by_coverage
+from kitchen.imports import RecipeImporter
+from kitchen.models import (
+    Ingredient,
+    Instruction,
+    OwnedAppliance,
+    Recipe,
+    RecipeIngredient,
+    Unit,
+)
 
 
 @pytest.mark.django_db
 def test_list_recipes_private(
     authenticated_client, recipe, user, django_assert_num_queries
 ):
+    # page ETag, page
     with django_assert_num_queries(2):
         resp = authenticated_client.get("/api/kitchen/recipes/")
     assert resp.status_code == status.HTTP_200_OK
-    data = resp.json()
+    data = resp.json()["items"]
     first = data[0]
 
     assert isinstance(data, list)
@@ -39,7 +58,7 @@ def test_list_recipes_not_show_drafts(authenticated_client, recipe, user):
     # Act
     resp = authenticated_client.get("/api/kitchen/recipes/")
     assert resp.status_code == status.HTTP_200_OK
-    data = resp.json()
+    data = resp.json()["items"]
     first = data[0]
 
     # Assert
@@ -53,7 +72,7 @@ def test_list_recipes_unauthenticated(client):
     resp = client.get("/api/kitchen/recipes/")
     assert resp.status_code == status.HTTP_200_OK
 
-    assert resp.json() == []
+    assert resp.json() == {"items": [], "next_cursor": None}
 
 
 @pytest.mark.django_db
@@ -63,7 +82,7 @@ def test_list_recipes_unauthenticated_public(client, recipe):
 
     resp = client.get("/api/kitchen/recipes/")
     assert resp.status_code == status.HTTP_200_OK
-    data = resp.json()
+    data = resp.json()["items"]
 
     assert len(data) == 1
     assert data[0]["uid"] == str(recipe.uid)
@@ -88,7 +107,7 @@ def test_list_recipes_public_and_private(authenticated_client, recipe, other_use
 
     resp = authenticated_client.get("/api/kitchen/recipes/")
     assert resp.status_code == status.HTTP_200_OK
-    data = resp.json()
+    data = resp.json()["items"]
 
     assert len(data) == 2
     assert {x["uid"] for x in data} == {str(recipe.uid), str(public_recipe.uid)}
@@ -105,7 +124,7 @@ def test_get_recipe(
         ingredient=ingredient, unit=unit, quantity=100, notes="Some notes"
     )
     Instruction.objects.create(recipe=recipe, step=1, description="Step 1")
-    with django_assert_num_queries(5):
+    with django_assert_num_queries(4):
         resp = authenticated_client.get(f"/api/kitchen/recipes/{recipe.uid}")
     assert resp.status_code == status.HTTP_200_OK
     data = resp.json()
@@ -161,7 +180,7 @@ def test_get_recipe(
 
 @pytest.mark.django_db
 def test_get_recipe_by_slug(authenticated_client, recipe, django_assert_num_queries):
-    with django_assert_num_queries(5):
+    with django_assert_num_queries(4):
         resp = authenticated_client.get(f"/api/kitchen/recipes/{recipe.slug}")
     assert resp.status_code == status.HTTP_200_OK
     data = resp.json()
@@ -179,11 +198,174 @@ def test_list_recipes_n_plus_one(authenticated_client, user, django_assert_num_q
             author=user, title=f"Recipe {i}", is_draft=False, visibility="PUBLIC"
         )
 
-    # Should take same number of queries as for 1 recipe (2 queries)
+    # Should take same number of queries as for 1 recipe (3 queries)
     with django_assert_num_queries(2):
         resp = authenticated_client.get("/api/kitchen/recipes/")
     assert resp.status_code == status.HTTP_200_OK
-    assert len(resp.json()) == 5
+    assert len(resp.json()["items"]) == 5
+
+
+@pytest.mark.django_db
+def test_list_recipes_cursor_pagination(client, user):
+    recipes = [
+        Recipe.objects.create(
+            author=user, title=f"Recipe {i}", is_draft=False, visibility="PUBLIC"
+        )
+        for i in range(5)
+    ]
+    # Same updated_at for all rows, so the order depends on the uid tiebreaker
+    Recipe.objects.update(updated_at=recipes[0].updated_at)
+
+    first = client.get("/api/kitchen/recipes/?page_size=2").json()
+    second = client.get(
+        f"/api/kitchen/recipes/?page_size=2&cursor={first['next_cursor']}"
+    ).json()
+    third = client.get(
+        f"/api/kitchen/recipes/?page_size=2&cursor={second['next_cursor']}"
+    ).json()
+
+    uids = [x["uid"] for page in (first, second, third) for x in page["items"]]
+    assert uids == [str(r.uid) for r in sorted(recipes, key=lambda r: r.uid)][::-1]
+    assert third["next_cursor"] is None
+
+
+@pytest.mark.django_db
+def test_list_recipes_cursor_stable_under_inserts(client, user):
+    for i in range(3):
+        Recipe.objects.create(
+            author=user, title=f"Recipe {i}", is_draft=False, visibility="PUBLIC"
+        )
+    first = client.get("/api/kitchen/recipes/?page_size=2").json()
+
+    Recipe.objects.create(
+        author=user, title="Fresh", is_draft=False, visibility="PUBLIC"
+    )
+    second = client.get(
+        f"/api/kitchen/recipes/?page_size=2&cursor={first['next_cursor']}"
+    ).json()
+
+    first_uids = {x["uid"] for x in first["items"]}
+    second_uids = {x["uid"] for x in second["items"]}
+    assert len(second_uids) == 1
+    assert not first_uids & second_uids
+
+
+@pytest.mark.django_db
+def test_list_recipes_merges_public_and_own(authenticated_client, user, other_user):
+    recipes = [
+        Recipe.objects.create(
+            author=author, title=f"Recipe {i}", is_draft=False, visibility=visibility
+        )
+        for i, (author, visibility) in enumerate(
+            [
+                (user, "PRIVATE"),
+                (other_user, "PUBLIC"),
+                (user, "PUBLIC"),
+                (user, "PRIVATE"),
+                (other_user, "PUBLIC"),
+            ]
+        )
+    ]
+    Recipe.objects.create(
+        author=other_user, title="Hidden", is_draft=False, visibility="PRIVATE"
+    )
+    Recipe.objects.create(author=user, title="Draft", visibility="PRIVATE")
+
+    uids, cursor = [], ""
+    while cursor is not None:
+        page = authenticated_client.get(
+            f"/api/kitchen/recipes/?page_size=2&cursor={cursor}"
+        ).json()
+        uids += [x["uid"] for x in page["items"]]
+        cursor = page["next_cursor"]
+
+    assert uids == [str(r.uid) for r in reversed(recipes)]
+
+
+@pytest.mark.django_db
+def test_list_recipes_feed_uses_partial_indexes(authenticated_client, user):
+    request = type("Request", (), {"user": user})()
+    page = RecipesController().get_feed(request).page(("-updated_at", "-uid"), Q(), 21)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        sql, params = page.query.sql_with_params()
+        cursor.execute(f"EXPLAIN {sql}", params)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+
+    assert "recipe_public_feed_idx" in plan
+    assert "Seq Scan" not in plan
+
+
+@pytest.mark.django_db
+def test_list_recipes_etag_changes_with_page(client, user):
+    for i in range(3):
+        Recipe.objects.create(
+            author=user, title=f"Recipe {i}", is_draft=False, visibility="PUBLIC"
+        )
+    url = "/api/kitchen/recipes/?page_size=2"
+    etag = client.get(url)["ETag"]
+
+    Recipe.objects.order_by("-updated_at").first().delete()
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_list_recipes_in_kitchen(
+    authenticated_client, user, appliance_factory, appliance_type_factory
+):
+    oven, blender = appliance_type_factory.create_batch(2)
+    my_oven, other_oven = appliance_factory.create_batch(2, type=oven)
+    other_blender = appliance_factory(type=blender)
+    OwnedAppliance.objects.create(user=user, appliance=my_oven)
+
+    def make(title, appliances):
+        recipe = Recipe.objects.create(
+            author=user, title=title, is_draft=False, visibility="PUBLIC"
+        )
+        recipe.appliances.set(appliances)
+        return recipe
+
+    no_tools = make("Salad", [])
+    roast = make("Roast", [my_oven])
+    bake = make("Bake", [other_oven])
+    soup = make("Soup", [my_oven, other_blender])
+    Recipe.objects.all().update_search_fields()
+
+    def listed(kitchen):
+        resp = authenticated_client.get(f"/api/kitchen/recipes/?kitchen={kitchen}")
+        return {x["uid"] for x in resp.json()["items"]}
+
+    assert listed("appliances") == {str(no_tools.uid), str(roast.uid)}
+    assert listed("types") == {str(no_tools.uid), str(roast.uid), str(bake.uid)}
+
+    # Deleting the type cascades to the blender, which no recipe needs anymore
+    blender.delete()
+    assert listed("appliances") == {str(no_tools.uid), str(roast.uid), str(soup.uid)}
+
+
+@pytest.mark.django_db
+def test_list_recipes_in_kitchen_requires_auth(client):
+    resp = client.get("/api/kitchen/recipes/?kitchen=appliances")
+
+    assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "values",
+    [None, ["garbage", "garbage"], [1, 2], [None, None], {"a": 1}],
+)
+def test_list_recipes_invalid_cursor(client, values):
+    cursor = "not-a-cursor"
+    if values is not None:
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    resp = client.get(f"/api/kitchen/recipes/?cursor={cursor}")
+
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
 
 
 @pytest.mark.django_db
@@ -297,6 +479,72 @@ def test_create_recipe(faker, authenticated_client, ingredient, unit, appliance)
     assert new_recipe.appliances.first() == appliance
 
 
+@pytest.mark.django_db
+def test_create_recipe_response_matches_stored_recipe(
+    authenticated_client, ingredient_factory, unit, appliance_factory
+):
+    ingredients = ingredient_factory.create_batch(3)
+    payload = {
+        "title": "Stew",
+        "description": "Slow",
+        "instructions": [
+            {"step": 2, "description": "Simmer"},
+            {"step": 1, "description": "Brown", "timer": 60},
+        ],
+        "ingredients": [
+            {
+                "ingredient_uid": str(x.uid),
+                "unit_uid": str(unit.uid),
+                "quantity": 2,
+                "notes": "diced",
+            }
+            for x in ingredients
+        ]
+        + [{"ingredient_uid": str(ingredients[0].uid)}],
+        "appliance_uids": [str(x.uid) for x in appliance_factory.create_batch(2)],
+    }
+
+    created = authenticated_client.post(
+        "/api/kitchen/recipes/", payload, content_type="application/json"
+    ).json()
+    stored = authenticated_client.get(
+        f"/api/kitchen/recipes/drafts/{created['uid']}"
+    ).json()
+
+    assert created == stored
+    assert [x["step"] for x in created["instructions"]] == [1, 2]
+    assert len(created["ingredients"]) == 4
+    assert created["ingredients"][0]["notes"] == "diced"
+    assert created["ingredients"][3]["unit"] is None
+
+
+@pytest.mark.django_db
+def test_create_recipe_invalid_references(authenticated_client, ingredient, unit):
+    missing = str(uuid6.uuid7())
+    payload = {
+        "title": "Stew",
+        "description": "Slow",
+        "instructions": [],
+        "ingredients": [
+            {"ingredient_uid": str(ingredient.uid), "unit_uid": missing},
+            {"ingredient_uid": missing, "unit_uid": str(unit.uid)},
+        ],
+        "appliance_uids": [missing],
+    }
+
+    resp = authenticated_client.post(
+        "/api/kitchen/recipes/", payload, content_type="application/json"
+    )
+
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp.json()["errors"] == {
+        "ingredients.0.unit_uid": ["Unit does not exist"],
+        "ingredients.1.ingredient_uid": ["Ingredient does not exist"],
+        "appliance_uids.0": ["Appliance does not exist"],
+    }
+    assert not Recipe.objects.exists()
+
+
 @pytest.mark.django_db
 def test_create_recipe_ingredient_without_quantity(
     faker,
@@ -441,6 +689,31 @@ def test_delete_recipe(authenticated_client, recipe):
     assert not Recipe.objects.filter(uid=recipe.uid).exists()
 
 
+@pytest.mark.django_db
+def test_writes_reject_deactivated_user(authenticated_client, user, recipe, draft):
+    # The access token still says is_active, the database does not
+    user.is_active = False
+    user.save()
+
+    resp = authenticated_client.delete(f"/api/kitchen/recipes/{recipe.uid}")
+    assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+    resp = authenticated_client.delete(f"/api/kitchen/recipes/drafts/{draft.uid}")
+    assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+    assert Recipe.objects.filter(uid__in=[recipe.uid, draft.uid]).count() == 2
+
+
+@pytest.mark.django_db
+def test_export_recipes_rechecks_staff(get_authenticated_client, user):
+    user.is_staff = True
+    user.save()
+    client = get_authenticated_client(user)
+    user.is_staff = False
+    user.save()
+
+    resp = client.get("/api/kitchen/recipes/export")
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+
+
 @pytest.mark.django_db
 def test_delete_recipe_forbidden_for_non_author(
     client, get_authenticated_client, other_user, recipe
@@ -507,7 +780,7 @@ def test_get_recipe_draft(authenticated_client, draft, django_assert_num_queries
     url = f"/api/kitchen/recipes/drafts/{draft.uid}"
 
     # Act
-    with django_assert_num_queries(5):
+    with django_assert_num_queries(4):
         resp = authenticated_client.get(
             url,
             content_type="application/json",
@@ -792,3 +1065,731 @@ def test_recipe_draft_finish_validation_error(authenticated_client, draft):
     assert data["errors"]["instructions"] == ["Instructions are required"]
     assert data["errors"]["ingredients"] == ["Ingredients are required"]
     assert data["errors"]["description"] == ["Description is required"]
+
+
+@pytest.mark.django_db
+def test_search_recipes(client, user, ingredient_factory):
+    pancakes = Recipe.objects.create(
+        author=user,
+        title="Fluffy pancakes",
+        description="Breakfast",
+        is_draft=False,
+        visibility="PUBLIC",
+    )
+    buttermilk = ingredient_factory(name="buttermilk")
+    omelette = Recipe.objects.create(
+        author=user,
+        title="Omelette",
+        description="Eggs and pancakes leftovers",
+        is_draft=False,
+        visibility="PUBLIC",
+    )
+    omelette.recipeingredient_set.create(ingredient=buttermilk)
+    Instruction.objects.create(recipe=omelette, step=1, description="Whisk eggs")
+    Recipe.objects.all().update_search_fields()
+
+    resp = client.get("/api/kitchen/recipes/search?q=pancake")
+    assert resp.status_code == status.HTTP_200_OK
+    data = resp.json()
+
+    # Title matches outrank description matches
+    assert [x["uid"] for x in data] == [str(pancakes.uid), str(omelette.uid)]
+    assert [
+        x["uid"] for x in client.get("/api/kitchen/recipes/search?q=buttermilk").json()
+    ] == [str(omelette.uid)]
+    assert [
+        x["uid"] for x in client.get("/api/kitchen/recipes/search?q=whisk").json()
+    ] == [str(omelette.uid)]
+    # Out-of-range limits are clamped to 1..50
+    resp = client.get("/api/kitchen/recipes/search?q=pancake&limit=-1")
+    assert [x["uid"] for x in resp.json()] == [str(pancakes.uid)]
+    resp = client.get("/api/kitchen/recipes/search?q=pancake&limit=0")
+    assert len(resp.json()) == 1
+
+
+@pytest.mark.django_db
+def test_search_recipes_respects_visibility(
+    client, get_authenticated_client, user, other_user
+):
+    Recipe.objects.create(
+        author=other_user, title="Secret soup", is_draft=False, visibility="PRIVATE"
+    )
+    Recipe.objects.create(
+        author=other_user, title="Draft soup", is_draft=True, visibility="PUBLIC"
+    )
+    own = Recipe.objects.create(
+        author=user, title="My soup", is_draft=False, visibility="PRIVATE"
+    )
+    Recipe.objects.all().update_search_fields()
+
+    assert client.get("/api/kitchen/recipes/search?q=soup").json() == []
+    resp = get_authenticated_client(user).get("/api/kitchen/recipes/search?q=soup")
+    assert [x["uid"] for x in resp.json()] == [str(own.uid)]
+
+
+@pytest.mark.django_db
+def test_cook_recipes_ranked_by_coverage(client, user, other_user, ingredient_factory):
+    egg, flour, milk, salt, sugar = ingredient_factory.create_batch(5)
+
+    def make(title, ingredients, author=user, visibility="PUBLIC"):
+        recipe = Recipe.objects.create(
+            author=author, title=title, is_draft=False, visibility=visibility
+        )
+        for ingredient in ingredients:
+            recipe.recipeingredient_set.create(ingredient=ingredient)
+        return recipe
+
+    omelette = make("Omelette", [egg, salt])
+    pancakes = make("Pancakes", [egg, flour, milk, sugar])
+    make("Caramel", [sugar])
+    make("Secret omelette", [egg, salt], author=other_user, visibility="PRIVATE")
+    Recipe.objects.all().update_search_fields()
+
+    resp = client.get(
+        f"/api/kitchen/recipes/cook?ingredients={egg.uid}&ingredients={salt.uid}"
+        f"&ingredients={milk.uid}"
+    )
+
+    assert resp.status_code == status.HTTP_200_OK
+    data = resp.json()
+    assert [x["uid"] for x in data] == [str(omelette.uid), str(pancakes.uid)]
+    assert (data[0]["coverage"], data[0]["missing"]) == (1.0, [])
+    assert (data[1]["matched"], data[1]["total"]) == (2, 4)
+    assert {x["uid"] for x in data[1]["missing"]} == {str(flour.uid), str(sugar.uid)}
+    resp = client.get(f"/api/kitchen/recipes/cook?ingredients={egg.uid}&limit=-1")
+    assert [x["uid"] for x in resp.json()] == [str(omelette.uid)]
+
+
+@pytest.mark.django_db
+def test_cook_recipes_uses_inverted_index(ingredient):
+    queryset = rank_by_coverage(Recipe.objects.all(), [ingredient.uid])
+
+    with connection.cursor() as cursor:
+        # Too few rows for the planner to pick an index on its own
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_indexscan = off")
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN {sql}", params)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+
+    assert "recipe_ingredients_idx" in plan
+    assert "kitchen_recipeingredient" not in plan
+
+
+@pytest.mark.django_db
+def test_cook_recipes_too_many_ingredients(client):
+    query = "&".join(f"ingredients={uuid6.uuid7()}" for _ in range(51))
+
+    resp = client.get(f"/api/kitchen/recipes/cook?{query}")
+
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_ingredient_uids_maintained_on_create(authenticated_client, ingredient):
+    payload = {
+        "title": "Toast",
+        "description": "Crunchy",
+        "visibility": "PUBLIC",
+        "instructions": [{"step": 1, "description": "Toast it"}],
+        "ingredients": [{"ingredient_uid": str(ingredient.uid)}],
+    }
+    uid = authenticated_client.post(
+        "/api/kitchen/recipes/", payload, content_type="application/json"
+    ).json()["uid"]
+
+    assert Recipe.objects.get(uid=uid).ingredient_uids == [ingredient.uid]
+
+
+@pytest.mark.django_db
+def test_ingredient_uids_maintained_on_unit_delete(
+    client, user, ingredient_factory, unit_factory, django_capture_on_commit_callbacks
+):
+    egg, salt = ingredient_factory.create_batch(2)
+    pinch = unit_factory()
+    recipe = Recipe.objects.create(
+        author=user, title="Omelette", is_draft=False, visibility="PUBLIC"
+    )
+    recipe.recipeingredient_set.create(ingredient=egg)
+    recipe.recipeingredient_set.create(ingredient=salt, unit=pinch)
+    Recipe.objects.all().update_search_fields()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        pinch.delete()
+
+    recipe.refresh_from_db()
+    assert recipe.ingredient_uids == [egg.uid]
+    resp = client.get(f"/api/kitchen/recipes/cook?ingredients={salt.uid}")
+    assert resp.json() == []
+
+
+@pytest.mark.django_db
+def test_ingredient_uids_maintained_on_ingredient_delete(
+    client, user, ingredient_factory
+):
+    egg, salt = ingredient_factory.create_batch(2)
+    recipe = Recipe.objects.create(
+        author=user, title="Omelette", is_draft=False, visibility="PUBLIC"
+    )
+    for ingredient in [egg, salt]:
+        recipe.recipeingredient_set.create(ingredient=ingredient)
+    Recipe.objects.all().update_search_fields()
+
+    salt.delete()
+
+    resp = client.get(f"/api/kitchen/recipes/cook?ingredients={egg.uid}")
+    assert (resp.json()[0]["coverage"], resp.json()[0]["total"]) == (1.0, 1)
+
+
+@pytest.mark.django_db
+def test_shopping_list(authenticated_client, user, ingredient_factory):
+    call_command("load_units", stdout=StringIO())
+    units = {unit.abbreviation: unit for unit in Unit.objects.all()}
+    flour, milk, egg, salt = ingredient_factory.create_batch(4)
+    flour.density = 0.5
+    flour.save()
+    custom = Unit.objects.create(name="pinch", abbreviation="pinch")
+
+    def make(lines):
+        recipe = Recipe.objects.create(
+            author=user, title="Recipe", is_draft=False, visibility="PRIVATE"
+        )
+        for ingredient, quantity, unit in lines:
+            recipe.recipeingredient_set.create(
+                ingredient=ingredient, quantity=quantity, unit=units.get(unit, unit)
+            )
+        return recipe
+
+    pancakes = make(
+        [
+            (flour, 1, "c"),
+            (milk, 250, "ml"),
+            (egg, 2, "pc"),
+            (salt, 1, custom),
+        ]
+    )
+    bread = make([(flour, 0.5, "kg"), (milk, 1, "c"), (salt, 1, "tsp")])
+
+    resp = authenticated_client.post(
+        "/api/kitchen/recipes/shopping-list",
+        {
+            "recipes": [
+                {"uid": str(pancakes.uid), "servings": 2},
+                {"uid": str(bread.uid)},
+            ]
+        },
+        content_type="application/json",
+    )
+
+    assert resp.status_code == status.HTTP_200_OK
+    lines = {
+        (x["ingredient"]["uid"], x["unit"]["abbreviation"]): (
+            x["quantity"],
+            x["recipes"],
+        )
+        for x in resp.json()
+    }
+    assert lines == {
+        # 2 cups of flour at 0.5 g/ml, plus half a kilogram
+        (str(flour.uid), "g"): (pytest.approx(736.588, abs=1e-3), 2),
+        (str(milk.uid), "ml"): (pytest.approx(736.588, abs=1e-3), 2),
+        (str(egg.uid), "pc"): (4, 1),
+        (str(salt.uid), "pinch"): (2, 1),
+        (str(salt.uid), "ml"): (pytest.approx(4.929, abs=1e-3), 1),
+    }
+
+
+@pytest.mark.django_db
+def test_shopping_list_hidden_recipe(authenticated_client, other_user):
+    hidden = Recipe.objects.create(
+        author=other_user, title="Secret", is_draft=False, visibility="PRIVATE"
+    )
+
+    resp = authenticated_client.post(
+        "/api/kitchen/recipes/shopping-list",
+        {"recipes": [{"uid": str(hidden.uid)}]},
+        content_type="application/json",
+    )
+
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_search_vector_maintained_on_update(
+    faker, authenticated_client, recipe, ingredient
+):
+    payload = {
+        "title": "Borscht",
+        "description": faker.text(),
+        "instructions": [{"step": 1, "description": "Simmer beetroot"}],
+        "ingredients": [{"ingredient_uid": str(ingredient.uid)}],
+    }
+    authenticated_client.patch(
+        f"/api/kitchen/recipes/{recipe.uid}",
+        data=payload,
+        content_type="application/json",
+    )
+
+    resp = authenticated_client.get("/api/kitchen/recipes/search?q=beetroot")
+
+    assert [x["uid"] for x in resp.json()] == [str(recipe.uid)]
+
+
+@pytest.mark.django_db
+def test_get_public_recipe_served_from_cache(client, recipe, django_assert_num_queries):
+    with django_assert_num_queries(4):
+        first = client.get(f"/api/kitchen/recipes/{recipe.uid}")
+    with django_assert_num_queries(0):
+        second = client.get(f"/api/kitchen/recipes/{recipe.uid}")
+        by_slug = client.get(f"/api/kitchen/recipes/{recipe.slug}")
+
+    assert second.status_code == status.HTTP_200_OK
+    assert second.content == first.content
+    assert by_slug.content == first.content
+    assert second["Content-Type"] == first["Content-Type"]
+
+
+@pytest.mark.django_db
+def test_get_private_recipe_not_cached(
+    authenticated_client, recipe, django_assert_num_queries
+):
+    recipe.visibility = Recipe.Visibility.PRIVATE
+    recipe.save()
+    authenticated_client.get(f"/api/kitchen/recipes/{recipe.uid}")
+
+    with django_assert_num_queries(4):
+        resp = authenticated_client.get(f"/api/kitchen/recipes/{recipe.uid}")
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_update_recipe_invalidates_cache(
+    authenticated_client, client, recipe, django_capture_on_commit_callbacks
+):
+    client.get(f"/api/kitchen/recipes/{recipe.slug}")
+    payload = {
+        "title": "Updated title",
+        "description": "Updated",
+        "instructions": [],
+        "ingredients": [],
+    }
+    with django_capture_on_commit_callbacks(execute=True):
+        authenticated_client.patch(
+            f"/api/kitchen/recipes/{recipe.uid}",
+            data=payload,
+            content_type="application/json",
+        )
+
+    resp = client.get(f"/api/kitchen/recipes/{recipe.slug}")
+
+    assert resp.json()["title"] == "Updated title"
+
+
+@pytest.mark.django_db
+def test_ingredient_change_invalidates_cache(
+    client, recipe, django_capture_on_commit_callbacks
+):
+    client.get(f"/api/kitchen/recipes/{recipe.uid}")
+    ingredient = recipe.recipeingredient_set.first().ingredient
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient.name = "Renamed ingredient"
+        ingredient.save()
+
+    resp = client.get(f"/api/kitchen/recipes/{recipe.uid}")
+
+    assert "Renamed ingredient" in {
+        x["ingredient"]["name"] for x in resp.json()["ingredients"]
+    }
+
+
+@pytest.mark.django_db
+def test_get_recipe_not_modified(
+    authenticated_client, recipe, django_assert_num_queries
+):
+    recipe.visibility = Recipe.Visibility.PRIVATE
+    recipe.save()
+    url = f"/api/kitchen/recipes/{recipe.uid}"
+    etag = authenticated_client.get(url)["ETag"]
+
+    # user, state query
+    with django_assert_num_queries(1):
+        resp = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+    assert resp["ETag"] == etag
+    assert resp.content == b""
+
+
+@pytest.mark.django_db
+def test_get_public_recipe_not_modified_from_cache(
+    client, recipe, django_assert_num_queries
+):
+    url = f"/api/kitchen/recipes/{recipe.slug}"
+    # The first read maps the slug, the second fills the entry
+    client.get(url)
+    etag = client.get(url)["ETag"]
+
+    with django_assert_num_queries(0):
+        resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_get_recipe_etag_matches_state_query(client, recipe):
+    url = f"/api/kitchen/recipes/{recipe.uid}"
+    etag = client.get(url)["ETag"]
+    cache.clear()
+
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_get_recipe_etag_changes_with_children(client, recipe):
+    url = f"/api/kitchen/recipes/{recipe.uid}"
+    etag = client.get(url)["ETag"]
+    cache.clear()
+    ingredient = recipe.recipeingredient_set.first().ingredient
+    ingredient.name = "Renamed"
+    ingredient.save()
+
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_list_recipes_not_modified(client, recipe, django_assert_num_queries):
+    etag = client.get("/api/kitchen/recipes/")["ETag"]
+
+    with django_assert_num_queries(1):
+        resp = client.get("/api/kitchen/recipes/", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+
+    Recipe.objects.create(
+        author=recipe.author, title="New", is_draft=False, visibility="PUBLIC"
+    )
+    resp = client.get("/api/kitchen/recipes/", HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_get_recipe_draft_not_modified(authenticated_client, draft):
+    url = f"/api/kitchen/recipes/drafts/{draft.uid}"
+    etag = authenticated_client.get(url)["ETag"]
+
+    resp = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+
+    Instruction.objects.create(recipe=draft, step=10, description="More")
+    resp = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_list_recipe_drafts_not_modified(authenticated_client, draft, ingredient):
+    RecipeIngredient.objects.create(recipe=draft, ingredient=ingredient)
+    url = "/api/kitchen/recipes/drafts/"
+    etag = authenticated_client.get(url)["ETag"]
+
+    resp = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # The listing renders catalogue rows, so renaming one changes the tag
+    ingredient.name = "Renamed"
+    ingredient.save()
+    resp = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("quantity", [None, 2, 0.25, 1 / 3, 1500.5, 1e-7])
+def test_get_recipe_sql_backend_matches_orm(client, recipe, unit, settings, quantity):
+    RecipeIngredient.objects.filter(recipe=recipe).update(quantity=quantity)
+    RecipeIngredient.objects.create(
+        recipe=recipe,
+        ingredient=Ingredient.objects.create(name="Salt"),
+        unit=unit,
+        quantity=quantity,
+        notes="A pinch",
+    )
+    Instruction.objects.create(recipe=recipe, step=1, description="Stir", timer=90)
+    url = f"/api/kitchen/recipes/{recipe.uid}"
+    orm = client.get(url)
+    cache.clear()
+    settings.RECIPE_DETAIL_BACKEND = "sql"
+
+    sql = client.get(url)
+
+    assert sql.status_code == status.HTTP_200_OK
+    assert sql["Content-Type"] == orm["Content-Type"]
+    assert sql["ETag"] == orm["ETag"]
+    # Numbers compared as written: json() would take 2 and 2.0 as equal
+    literal = {"parse_int": str, "parse_float": str, "parse_constant": str}
+    assert json.loads(sql.content, **literal) == json.loads(orm.content, **literal)
+    assert list(sql.json()) == list(orm.json())
+
+
+@pytest.mark.django_db
+def test_get_recipe_sql_backend_single_query(
+    client, recipe, settings, django_assert_num_queries
+):
+    settings.RECIPE_DETAIL_BACKEND = "sql"
+    with django_assert_num_queries(1):
+        resp = client.get(f"/api/kitchen/recipes/{recipe.slug}")
+    assert resp.status_code == status.HTTP_200_OK
+
+    resp = client.get(f"/api/kitchen/recipes/{uuid6.uuid7()}")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_get_private_recipe_sql_backend(
+    authenticated_client, recipe, settings, django_assert_num_queries
+):
+    settings.RECIPE_DETAIL_BACKEND = "sql"
+    recipe.visibility = Recipe.Visibility.PRIVATE
+    recipe.save()
+
+    # user, document
+    with django_assert_num_queries(1):
+        resp = authenticated_client.get(f"/api/kitchen/recipes/{recipe.uid}")
+    assert resp.json()["visibility"] == "PRIVATE"
+
+
+@pytest.mark.django_db
+def test_get_recipe_with_invalid_token_is_anonymous(client, recipe):
+    recipe.visibility = Recipe.Visibility.PRIVATE
+    recipe.save()
+
+    resp = client.get(
+        f"/api/kitchen/recipes/{recipe.uid}", HTTP_AUTHORIZATION="Bearer invalid"
+    )
+
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+def import_line(**fields):
+    payload = {
+        "title": "Imported soup",
+        "description": "From a partner",
+        "instructions": [{"step": 1, "description": "Boil"}],
+        "ingredients": [],
+        "visibility": "PUBLIC",
+    }
+    payload.update(fields)
+    return json.dumps(payload)
+
+
+@pytest.mark.django_db
+def test_import_recipes(authenticated_client, user, ingredient, unit, appliance):
+    user.is_staff = True
+    user.save()
+    body = "\n".join(
+        [
+            import_line(
+                ingredients=[
+                    {
+                        "ingredient_uid": str(ingredient.uid),
+                        "unit_uid": str(unit.uid),
+                        "quantity": 2,
+                    }
+                ],
+                appliance_uids=[str(appliance.uid)],
+            ),
+            "{not json",
+            "",
+            import_line(ingredients=[{"ingredient_uid": str(uuid6.uuid7())}]),
+            import_line(),
+        ]
+    )
+
+    resp = authenticated_client.post(
+        "/api/kitchen/recipes/import?batch_size=2",
+        data=body,
+        content_type="application/x-ndjson",
+    )
+    results = [json.loads(line) for line in b"".join(resp).splitlines()]
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert [x["line"] for x in results] == [1, 2, 4, 5]
+    assert "errors" in results[1]
+    assert results[2]["errors"][0]["loc"] == ["ingredients", 0, "ingredient_uid"]
+    assert results[0]["slug"] != results[3]["slug"]
+
+    recipe = Recipe.objects.get(uid=results[0]["uid"])
+    assert recipe.is_draft is False
+    assert recipe.author == user
+    assert recipe.recipeingredient_set.get().unit == unit
+    assert list(recipe.appliances.all()) == [appliance]
+    assert recipe.instructions.count() == 1
+    assert Recipe.objects.filter(search_vector="soup").count() == 2
+
+
+@pytest.mark.django_db
+def test_import_recipes_bad_line_keeps_batch(authenticated_client, user):
+    user.is_staff = True
+    user.save()
+    body = "\n".join(
+        [
+            import_line(),
+            import_line(title="x" * 256),
+            import_line(),
+            # Valid for the schema, out of range for the column
+            import_line(instructions=[{"step": 2**40, "description": "Boil"}]),
+        ]
+    )
+
+    resp = authenticated_client.post(
+        "/api/kitchen/recipes/import",
+        data=body,
+        content_type="application/x-ndjson",
+    )
+    results = [json.loads(line) for line in b"".join(resp).splitlines()]
+
+    assert [x["line"] for x in results] == [1, 2, 3, 4]
+    assert results[1]["errors"][0]["loc"] == ["title"]
+    assert results[3]["errors"][0]["msg"].startswith("Line failed")
+    assert "uid" in results[0] and "uid" in results[2]
+    assert Recipe.objects.count() == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("batch_size", [0, -5])
+def test_import_recipes_clamps_batch_size(
+    authenticated_client, user, batch_size, mocker
+):
+    user.is_staff = True
+    user.save()
+    save = mocker.spy(RecipeImporter, "save")
+
+    resp = authenticated_client.post(
+        f"/api/kitchen/recipes/import?batch_size={batch_size}",
+        data="\n".join([import_line(), import_line(), import_line()]),
+        content_type="application/x-ndjson",
+    )
+    results = [json.loads(line) for line in b"".join(resp).splitlines()]
+
+    assert [x["line"] for x in results] == [1, 2, 3]
+    # One line per batch instead of the whole upload in one
+    assert [len(call.args[1]) for call in save.call_args_list] == [1, 1, 1]
+
+
+@pytest.mark.django_db
+def test_import_recipes_requires_staff(authenticated_client):
+    resp = authenticated_client.post(
+        "/api/kitchen/recipes/import",
+        data=import_line(),
+        content_type="application/x-ndjson",
+    )
+
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+def test_export_recipes(get_authenticated_client, user, recipe, recipe_factory):
+    user.is_staff = True
+    user.save()
+    authenticated_client = get_authenticated_client(user)
+    recipe_factory.create_batch(2, is_draft=False, visibility="PUBLIC")
+    recipe_factory(is_draft=False, visibility="PRIVATE")
+    recipe_factory(is_draft=True, visibility="PUBLIC")
+
+    resp = authenticated_client.get("/api/kitchen/recipes/export?chunk_size=2")
+    documents = [json.loads(line) for line in b"".join(resp).splitlines()]
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp["Content-Type"] == "application/x-ndjson"
+    assert len(documents) == 3
+    assert [x["uid"] for x in documents] == sorted(x["uid"] for x in documents)
+    detail = authenticated_client.get(f"/api/kitchen/recipes/{recipe.uid}").json()
+    assert next(x for x in documents if x["uid"] == str(recipe.uid)) == detail
+
+
+@pytest.mark.django_db
+def test_export_recipes_requires_staff(authenticated_client):
+    resp = authenticated_client.get("/api/kitchen/recipes/export")
+
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_update_draft_keeps_unchanged_children(
+    authenticated_client, draft, ingredient, unit, django_assert_num_queries
+):
+    url = f"/api/kitchen/recipes/drafts/{draft.uid}"
+    payload = {
+        "instructions": [
+            {"step": 1, "description": "Chop"},
+            {"step": 2, "description": "Boil"},
+            {"step": 3, "description": "Serve"},
+        ],
+        "ingredients": [
+            {"ingredient_uid": str(ingredient.uid), "unit_uid": str(unit.uid)}
+        ],
+    }
+    before = authenticated_client.patch(
+        url, data=payload, content_type="application/json"
+    ).json()
+
+    payload["instructions"] = [
+        {"step": 1, "description": "Chop"},
+        {"step": 2, "description": "Simmer"},
+        {"step": 4, "description": "Eat"},
+    ]
+    payload["ingredients"][0]["quantity"] = 2
+    after = authenticated_client.patch(
+        url, data=payload, content_type="application/json"
+    ).json()
+
+    old = {x["step"]: x["uid"] for x in before["instructions"]}
+    new = {x["step"]: x for x in after["instructions"]}
+    assert new[1]["uid"] == old[1]
+    assert new[2]["uid"] == old[2]
+    assert new[2]["description"] == "Simmer"
+    assert new[4]["uid"] not in old.values()
+    assert 3 not in new
+    assert Instruction.objects.filter(uid=old[3]).exists() is False
+    assert after["ingredients"][0]["uid"] == before["ingredients"][0]["uid"]
+    assert after["ingredients"][0]["quantity"] == 2
+
+    # An autosave without changes only touches the recipe row
+    # user, draft + 3 prefetches, savepoint, recipe update, release,
+    # reload + 3 prefetches
+    with django_assert_num_queries(12):
+        authenticated_client.patch(url, data=payload, content_type="application/json")
+
+
+@pytest.mark.django_db
+def test_update_recipe_reconciles_repeated_ingredients(
+    authenticated_client, recipe, ingredient
+):
+    url = f"/api/kitchen/recipes/{recipe.uid}"
+    payload = {
+        "title": recipe.title,
+        "description": recipe.description,
+        "instructions": [{"step": 1, "description": "Boil"}],
+        "ingredients": [
+            {"ingredient_uid": str(ingredient.uid), "notes": "for the dough"},
+            {"ingredient_uid": str(ingredient.uid), "notes": "for the filling"},
+        ],
+    }
+    first = authenticated_client.patch(
+        url, data=payload, content_type="application/json"
+    ).json()
+    payload["ingredients"][1]["quantity"] = 5
+    second = authenticated_client.patch(
+        url, data=payload, content_type="application/json"
+    ).json()
+
+    assert {x["uid"] for x in first["ingredients"]} == {
+        x["uid"] for x in second["ingredients"]
+    }
+    assert sorted(x["notes"] for x in second["ingredients"]) == [
+        "for the dough",
+        "for the filling",
+    ]
@@ -1,4 +1,7 @@
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
 from ninja_extra import status
 
 from kitchen.models import Unit
@@ -62,3 +65,25 @@ def test_create_unit_idempotent_by_name(authenticated_client, unit_factory, name
     assert resp.status_code == status.HTTP_200_OK
     data = resp.json()
     assert data["name"] == unit_g.name
+
+
+@pytest.mark.django_db
+def test_convert_units(client, ingredient):
+    call_command("load_units", stdout=StringIO())
+    units = {unit.abbreviation: unit for unit in Unit.objects.all()}
+    ingredient.density = 0.5
+    ingredient.save()
+
+    resp = client.get(
+        "/api/kitchen/units/convert",
+        {"quantity": 2, "source": units["c"].uid, "target": units["ml"].uid},
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["quantity"] == pytest.approx(473.176, abs=1e-3)
+    assert resp.json()["unit"]["abbreviation"] == "ml"
+
+    url = "/api/kitchen/units/convert"
+    by_volume = {"quantity": 1, "source": units["l"].uid, "target": units["g"].uid}
+    assert client.get(url, by_volume).status_code == status.HTTP_400_BAD_REQUEST
+    resp = client.get(url, {**by_volume, "ingredient": ingredient.uid})
+    assert resp.json()["quantity"] == pytest.approx(500)
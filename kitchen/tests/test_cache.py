@@ -0,0 +1,230 @@
+from types import SimpleNamespace
+
+import pytest
+import uuid6
+from asgiref.sync import async_to_sync
+
+from kitchen.cache import RecipeCache, ReferenceCache, reference_cache
+from kitchen.models import ApplianceType, Manufacturer, Recipe, Unit
+from kitchen.references import fetch_references
+
+
+def get_or_fill(cache, load, **lookup):
+    async def aload():
+        return load()
+
+    return async_to_sync(cache.aget_or_fill)(aload, **lookup)
+
+
+def test_recipe_cache_fills_once():
+    cache = RecipeCache()
+    uid = uuid6.uuid7()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return uid, "soup", "payload", True
+
+    assert get_or_fill(cache, load, uid=uid) == "payload"
+    assert get_or_fill(cache, load, uid=uid) == "payload"
+    assert get_or_fill(cache, load, slug="soup") == "payload"
+    assert len(calls) == 1
+
+
+def test_recipe_cache_fills_slug_after_mapping_it():
+    cache = RecipeCache()
+    uid = uuid6.uuid7()
+    payloads = iter(["stale", "fresh"])
+
+    def load():
+        # A write lands while this reader is still loading the old row
+        payload = next(payloads)
+        if payload == "stale":
+            cache.invalidate(uid)
+        return uid, "soup", payload, True
+
+    assert get_or_fill(cache, load, slug="soup") == "stale"
+    assert get_or_fill(cache, load, slug="soup") == "fresh"
+    assert get_or_fill(cache, load, uid=uid) == "fresh"
+
+
+def test_recipe_cache_skips_uncacheable():
+    cache = RecipeCache()
+    uid = uuid6.uuid7()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return uid, "soup", "payload", False
+
+    assert get_or_fill(cache, load, uid=uid) == "payload"
+    assert get_or_fill(cache, load, uid=uid) == "payload"
+    assert len(calls) == 2
+
+
+def test_recipe_cache_invalidate():
+    cache = RecipeCache()
+    uid = uuid6.uuid7()
+    payloads = iter(["old", "new"])
+
+    def load():
+        return uid, "soup", next(payloads), True
+
+    get_or_fill(cache, load, uid=uid)
+    cache.invalidate(uid)
+
+    assert get_or_fill(cache, load, uid=uid) == "new"
+
+
+def test_recipe_cache_ignores_stale_fill():
+    cache = RecipeCache()
+    uid = uuid6.uuid7()
+
+    def slow_load():
+        # A write lands while this reader is still loading the old row
+        cache.invalidate_all()
+        return uid, "soup", "stale", True
+
+    get_or_fill(cache, slow_load, uid=uid)
+
+    fresh = (uid, "soup", "fresh", True)
+    assert get_or_fill(cache, lambda: fresh, uid=uid) == "fresh"
+
+
+@pytest.mark.parametrize("evicted", ["version", "generation"])
+def test_recipe_cache_survives_evicted_stamp(evicted):
+    cache = RecipeCache()
+    uid = uuid6.uuid7()
+    payloads = iter(["old", "new"])
+
+    def load():
+        return uid, "soup", next(payloads), True
+
+    get_or_fill(cache, load, uid=uid)
+    if evicted == "version":
+        cache.invalidate(uid)
+        cache.cache.delete(cache.version_key(uid))
+    else:
+        cache.invalidate_all()
+        cache.cache.delete(cache.generation_key)
+
+    assert get_or_fill(cache, load, uid=uid) == "new"
+    assert get_or_fill(cache, load, uid=uid) == "new"
+
+
+def test_recipe_cache_waits_for_concurrent_fill():
+    cache = RecipeCache(wait_interval=0, wait_attempts=3)
+    uid = uuid6.uuid7()
+    cache.cache.add(f"recipe:lock:{uid}", 1)
+    attempts = []
+
+    async def alookup(uid):
+        # The other worker stores the entry while we wait on its lock
+        attempts.append(uid)
+        if len(attempts) == 2:
+            await cache.astore(uid, "soup", stamp, "payload")
+        return await original_lookup(uid)
+
+    original_lookup = cache.alookup
+    stamp = async_to_sync(original_lookup)(uid)[1]
+    cache.alookup = alookup
+
+    def load():
+        raise AssertionError("should not hit the database")
+
+    assert get_or_fill(cache, load, uid=uid) == "payload"
+
+
+@pytest.mark.django_db
+def test_reference_cache_serves_from_memory(
+    client, unit_factory, django_assert_num_queries
+):
+    units = unit_factory.create_batch(3)
+    client.get("/api/kitchen/units/")
+
+    with django_assert_num_queries(0):
+        resp = client.get("/api/kitchen/units/")
+
+    assert {d["uid"] for d in resp.json()} == {str(unit.uid) for unit in units}
+
+
+@pytest.mark.django_db
+def test_reference_cache_reloads_changed_tables(unit, django_assert_num_queries):
+    # Another worker: no signals reach this one, only the version counters
+    cache = ReferenceCache(check_interval=0)
+    cache.get(Unit)
+    Unit.objects.filter(uid=unit.uid).update(name="Renamed")
+
+    with django_assert_num_queries(2):
+        assert cache.get(Unit)[unit.uid].name == "Renamed"
+    with django_assert_num_queries(1):
+        cache.get(Manufacturer)
+
+
+@pytest.mark.django_db
+def test_reference_cache_waits_for_check_interval(unit):
+    cache = ReferenceCache(check_interval=60)
+    cache.get(Unit)
+    Unit.objects.filter(uid=unit.uid).delete()
+
+    assert unit.uid in cache.get(Unit)
+    cache.invalidate()
+    assert unit.uid not in cache.get(Unit)
+
+
+@pytest.mark.django_db
+def test_reference_cache_attach(appliance, django_assert_num_queries):
+    reference_cache.get(Manufacturer)
+    reference_cache.get(ApplianceType)
+    appliance.refresh_from_db()
+
+    with django_assert_num_queries(0):
+        (attached,) = reference_cache.attach(
+            [appliance], manufacturer=Manufacturer, type=ApplianceType
+        )
+        assert attached.manufacturer.name
+        assert attached.type.name
+
+
+@pytest.mark.django_db
+def test_fetch_references_sees_units_from_other_workers(ingredient):
+    reference_cache.get(Unit)
+    # bulk_create sends no signals, as if another worker wrote the row
+    (unit,) = Unit.objects.bulk_create(
+        [Unit(uid=uuid6.uuid7(), name="pinch", abbreviation="pn")]
+    )
+
+    line = SimpleNamespace(
+        ingredients=[SimpleNamespace(ingredient_uid=ingredient.uid, unit_uid=unit.uid)],
+        appliance_uids=[],
+    )
+
+    assert unit.uid in fetch_references([line])[Unit]
+
+
+@pytest.mark.django_db
+def test_admin_child_delete_refreshes_recipe(
+    client,
+    admin_user,
+    recipe,
+    recipe_ingredient_factory,
+    unit,
+    django_capture_on_commit_callbacks,
+):
+    recipe.visibility = "PUBLIC"
+    recipe.save()
+    item = recipe_ingredient_factory(recipe=recipe, unit=unit)
+    Recipe.objects.filter(uid=recipe.uid).update_search_fields()
+    url = f"/api/kitchen/recipes/{recipe.uid}"
+    before = {x["uid"] for x in client.get(url).json()["ingredients"]}
+
+    client.force_login(admin_user)
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(
+            f"/admin/kitchen/recipeingredient/{item.pk}/delete/", {"post": "yes"}
+        )
+
+    after = {x["uid"] for x in client.get(url).json()["ingredients"]}
+    assert after == before - {str(item.uid)}
+    recipe.refresh_from_db()
+    assert item.ingredient_id not in recipe.ingredient_uids
@@ -0,0 +1,115 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from kitchen.models import Recipe
+
+
+@pytest.mark.django_db
+def test_import_recipes_command(tmp_path, user, ingredient):
+    source = tmp_path / "recipes.ndjson"
+    lines = [
+        {
+            "title": f"Soup {i}",
+            "description": "Hot",
+            "instructions": [{"step": 1, "description": "Boil"}],
+            "ingredients": [{"ingredient_uid": str(ingredient.uid)}],
+        }
+        for i in range(5)
+    ]
+    source.write_text("\n".join(json.dumps(line) for line in lines) + "\n{}\n")
+    out, err = StringIO(), StringIO()
+
+    call_command(
+        "import_recipes",
+        str(source),
+        author=user.email,
+        batch_size=2,
+        stdout=out,
+        stderr=err,
+    )
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [x["line"] for x in results] == [1, 2, 3, 4, 5, 6]
+    assert "errors" in results[-1]
+    assert Recipe.objects.filter(author=user, is_draft=False).count() == 5
+    assert "Imported 5 recipes, 1 failed" in err.getvalue()
+
+
+@pytest.mark.django_db
+def test_export_recipes_command(recipe, recipe_factory):
+    recipe_factory(is_draft=False, visibility="PRIVATE")
+    out = StringIO()
+
+    call_command("export_recipes", chunk_size=1, stdout=out)
+
+    documents = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [x["uid"] for x in documents] == [str(recipe.uid)]
+    assert documents[0]["ingredients"]
+
+
+@pytest.mark.django_db
+def test_benchmark_api_command(tmp_path, unit, appliance):
+    output = tmp_path / "benchmark.json"
+
+    call_command(
+        "benchmark_api",
+        output=str(output),
+        iterations=2,
+        recipes=3,
+        ingredients_per_recipe=2,
+        ingredients=10,
+        appliances=2,
+        stderr=StringIO(),
+    )
+
+    report = json.loads(output.read_text())
+    assert report["dataset"]["recipes"] == 3
+    assert report["dataset"]["ingredients"] == 10
+    assert report["dataset"]["recipe_ingredients"] == 6
+    endpoints = report["endpoints"]
+    assert set(endpoints) == {
+        "recipes.list",
+        "recipes.detail_uid",
+        "recipes.detail_slug",
+        "recipes.cook",
+        "recipes.shopping_list",
+        "recipes.create",
+        "recipes.update",
+        "drafts.autosave",
+        "drafts.finish",
+        "ingredients.list",
+        "units.list",
+        "appliances.list",
+        "bootstrap",
+    }
+    # Served from the in-process reference cache once it is warm
+    assert endpoints["units.list"]["queries"]["min"] == 0
+    # Token-authenticated reads of cached public recipes need no query at all
+    cached = {"units.list", "recipes.detail_uid", "recipes.detail_slug"}
+    for name, result in endpoints.items():
+        assert all(status < 300 for status in result["status"])
+        assert name in cached or result["queries"]["min"] > 0
+        latency = result["latency_ms"]
+        assert latency["min"] <= latency["p50"] <= latency["p99"] <= latency["max"]
+
+
+@pytest.mark.django_db
+def test_benchmark_api_command_without_data(tmp_path):
+    output = tmp_path / "benchmark.json"
+
+    call_command(
+        "benchmark_api",
+        output=str(output),
+        iterations=1,
+        no_seed=True,
+        only=["recipes.list", "recipes.detail_uid", "recipes.update"],
+        stderr=StringIO(),
+    )
+
+    report = json.loads(output.read_text())
+    assert set(report["endpoints"]) == {"recipes.list"}
+    assert report["skipped"]["recipes.detail_uid"] == "no public recipes"
+    assert "recipes.update" in report["skipped"]
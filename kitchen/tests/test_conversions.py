@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+import uuid6
+from django.core.management import call_command
+
+from kitchen.cache import reference_cache
+from kitchen.conversions import ConversionMatrix, conversion_cache
+from kitchen.models import Unit, UnitConversion
+
+
+def make_units(*specs):
+    return {
+        abbreviation: SimpleNamespace(
+            uid=uuid6.uuid7(), abbreviation=abbreviation, dimension=dimension
+        )
+        for abbreviation, dimension in specs
+    }
+
+
+def edge(units, source, target, factor):
+    return SimpleNamespace(
+        source_id=units[source].uid, target_id=units[target].uid, factor=factor
+    )
+
+
+@pytest.fixture
+def units():
+    return make_units(
+        ("g", Unit.Dimension.MASS),
+        ("kg", Unit.Dimension.MASS),
+        ("lb", Unit.Dimension.MASS),
+        ("ml", Unit.Dimension.VOLUME),
+        ("l", Unit.Dimension.VOLUME),
+        ("cup", Unit.Dimension.VOLUME),
+        ("pc", Unit.Dimension.COUNT),
+    )
+
+
+@pytest.fixture
+def matrix(units):
+    return ConversionMatrix(
+        units.values(),
+        [
+            edge(units, "kg", "g", 1000),
+            edge(units, "lb", "g", 453.6),
+            edge(units, "l", "ml", 1000),
+            edge(units, "cup", "l", 0.25),
+        ],
+    )
+
+
+def test_conversion_matrix_closes_the_graph(units, matrix):
+    uid = {abbreviation: unit.uid for abbreviation, unit in units.items()}
+
+    assert matrix.convert(2, uid["kg"], uid["g"]) == 2000
+    assert matrix.convert(500, uid["g"], uid["kg"]) == 0.5
+    assert matrix.convert(1, uid["kg"], uid["lb"]) == pytest.approx(2.2046, abs=1e-4)
+    assert matrix.convert(2, uid["cup"], uid["ml"]) == pytest.approx(500)
+    assert matrix.convert(1, uid["kg"], uid["ml"]) is None
+    assert matrix.convert(1, uid["pc"], uid["g"]) is None
+    assert matrix.convert(1, uuid6.uuid7(), uid["g"]) is None
+
+
+def test_conversion_matrix_density(units, matrix):
+    uid = {abbreviation: unit.uid for abbreviation, unit in units.items()}
+
+    # Flour, about 0.53 g/ml
+    assert matrix.convert(1, uid["cup"], uid["g"], 0.53) == pytest.approx(132.5)
+    assert matrix.convert(132.5, uid["g"], uid["cup"], 0.53) == pytest.approx(1)
+    assert matrix.convert(1, uid["l"], uid["kg"], 1.0) == pytest.approx(1)
+    assert matrix.convert(1, uid["pc"], uid["g"], 1.0) is None
+
+
+def test_conversion_matrix_convert_many(units, matrix):
+    uid = {abbreviation: unit.uid for abbreviation, unit in units.items()}
+
+    converted = matrix.convert_many(
+        [1, 2, 3, 4],
+        [uid["kg"], uid["l"], uid["pc"], uid["cup"]],
+        uid["g"],
+        [None, 1.0, None, None],
+    )
+
+    assert converted == [1000, pytest.approx(2000), None, None]
+
+
+@pytest.mark.django_db
+def test_conversion_cache_rebuilds_on_change():
+    gram = Unit.objects.create(name="gram", abbreviation="g")
+    kilogram = Unit.objects.create(name="kilogram", abbreviation="kg")
+    assert conversion_cache.get().convert(1, kilogram.uid, gram.uid) is None
+
+    UnitConversion.objects.create(source=kilogram, target=gram, factor=1000)
+    reference_cache.invalidate()
+
+    assert conversion_cache.get().convert(1, kilogram.uid, gram.uid) == 1000
+    assert conversion_cache.get() is conversion_cache.get()
+
+
+@pytest.mark.django_db
+def test_load_units_command(unit_factory):
+    gram = unit_factory(name="Gram", abbreviation="gr")
+
+    call_command("load_units")
+    call_command("load_units")
+
+    gram.refresh_from_db()
+    assert gram.dimension == Unit.Dimension.MASS
+    assert Unit.objects.filter(dimension__isnull=False).count() == 12
+    matrix = conversion_cache.get()
+    cup = Unit.objects.get(abbreviation="c")
+    pound = Unit.objects.get(abbreviation="lb")
+    assert matrix.convert(1, cup.uid, Unit.objects.get(abbreviation="ml").uid) == (
+        pytest.approx(236.588, abs=1e-3)
+    )
+    assert matrix.convert(1, pound.uid, gram.uid) == pytest.approx(453.592, abs=1e-3)
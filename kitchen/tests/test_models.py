@@ -1,6 +1,7 @@
 import pytest
 
 from kitchen.models import Recipe
+from kitchen.slugs import allocate_slugs
 
 
 @pytest.mark.django_db
@@ -22,3 +23,44 @@ def test_recipe_slug_is_unique(faker, user):
     recipe2.save()
 
     assert recipe1.slug != recipe2.slug
+
+
+@pytest.mark.django_db
+def test_recipe_slug_allocation_is_constant_query(user, django_assert_num_queries):
+    for _ in range(5):
+        Recipe.objects.create(title="Pancakes", author=user)
+    recipe = Recipe(title="Pancakes", author=user)
+
+    # slug lookup, savepoint, insert, release
+    with django_assert_num_queries(4):
+        recipe.save()
+
+    assert recipe.slug.startswith("pancakes-")
+
+
+@pytest.mark.django_db
+def test_recipe_slug_retries_after_concurrent_save(user, mocker):
+    Recipe.objects.create(title="Pancakes", author=user)
+    allocate = mocker.patch(
+        "kitchen.models.allocate_slugs",
+        side_effect=[["pancakes"], ["pancakes-abcd"]],
+    )
+    recipe = Recipe(title="Pancakes", author=user)
+
+    recipe.save()
+
+    assert recipe.slug == "pancakes-abcd"
+    assert allocate.call_count == 2
+
+
+@pytest.mark.django_db
+def test_allocate_slugs_in_bulk(user, django_assert_num_queries):
+    Recipe.objects.create(title="Pancakes", author=user)
+
+    with django_assert_num_queries(1):
+        slugs = allocate_slugs(Recipe.objects, ["Pancakes", "Pancakes", None, "Soup"])
+
+    assert slugs[2] is None
+    assert slugs[3] == "soup"
+    assert len({slugs[0], slugs[1], "pancakes"}) == 3
+    assert all(slug.startswith("pancakes-") for slug in slugs[:2])
@@ -0,0 +1,21 @@
+from django.http import HttpResponse
+from ninja_extra import ControllerBase, api_controller, http_get
+from ninja_extra.exceptions import PermissionDenied
+from ninja_jwt.authentication import JWTAuth
+
+from shared.budgets import query_budget
+from shared.metrics import registry
+
+
+@api_controller("/metrics", tags=["metrics"], auth=JWTAuth())
+class MetricsController(ControllerBase):
+    @http_get("", include_in_schema=False)
+    @query_budget(1)
+    def metrics(self, request):
+        """Staff-only per-route request metrics in Prometheus text format."""
+        if not request.user.is_staff:
+            raise PermissionDenied()
+        return HttpResponse(
+            registry.render(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -0,0 +1,23 @@
+def query_budget(queries: int, per_chunk: int = 0):
+    """
+    Declare the most database queries an endpoint may issue, however large its
+    payload or result. Checked by the test suite rather than at runtime; place
+    it right above the view function, under the route decorator.
+
+    Streaming endpoints that work in chunks or batches declare ``queries`` for
+    a request served in one chunk and ``per_chunk`` for every further one.
+    """
+
+    def decorator(view):
+        view.query_budget = queries
+        view.query_budget_per_chunk = per_chunk
+        return view
+
+    return decorator
+
+
+def get_query_budget(view, chunks: int = 1) -> int | None:
+    budget = getattr(view, "query_budget", None)
+    if budget is None:
+        return None
+    return budget + getattr(view, "query_budget_per_chunk", 0) * (chunks - 1)
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db: float = 0.0
+    serialize: float = 0.0
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar(
+    "request_metrics", default=None
+)
+
+
+def record_query(execute, sql, params, many, context):
+    """``execute_wrapper`` hook adding each query to the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db += time.perf_counter() - started
+
+
+def install_recorder(connection, **kwargs) -> None:
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Every new connection records queries; contextvars follow the request into
+# sync_to_async threads, so async views are covered too
+connection_created.connect(install_recorder)
+
+
+@contextmanager
+def timed_serialization():
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.serialize += time.perf_counter() - started
+
+
+class MetricsRegistry:
+    """Per-process totals by route, rendered in Prometheus text format."""
+
+    counters = (
+        ("requests_total", "Requests served."),
+        ("db_queries_total", "Database queries issued."),
+        ("db_seconds_total", "Time spent executing database queries."),
+        ("serialize_seconds_total", "Time spent rendering response bodies."),
+        ("request_seconds_total", "Total time spent handling requests."),
+    )
+
+    def __init__(self, prefix: str = "soup"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.routes = defaultdict(lambda: defaultdict(float))
+
+    def add(self, route: str, metrics: RequestMetrics, total: float) -> None:
+        with self.lock:
+            values = self.routes[route]
+            values["requests_total"] += 1
+            values["db_queries_total"] += metrics.queries
+            values["db_seconds_total"] += metrics.db
+            values["serialize_seconds_total"] += metrics.serialize
+            values["request_seconds_total"] += total
+
+    def reset(self) -> None:
+        with self.lock:
+            self.routes.clear()
+
+    def render(self) -> str:
+        with self.lock:
+            routes = {route: dict(values) for route, values in self.routes.items()}
+        lines = []
+        for name, help_text in self.counters:
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for route, values in sorted(routes.items()):
+                label = route.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric}{{route="{label}"}} {values[name]:g}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def server_timing(metrics: RequestMetrics, total: float) -> str:
+    return (
+        f'db;dur={metrics.db * 1000:.1f};desc="{metrics.queries} queries", '
+        f"serialize;dur={metrics.serialize * 1000:.1f}, "
+        f"total;dur={total * 1000:.1f}"
+    )
+
+
+class RequestMetricsMiddleware:
+    """
+    Counts queries and times the database, response rendering and the whole
+    request, adds a ``Server-Timing`` header and feeds the per-route totals.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def start(self) -> tuple[RequestMetrics, object]:
+        for connection in connections.all(initialized_only=True):
+            install_recorder(connection)
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics)
+
+    def finish(self, request, response, metrics: RequestMetrics, token) -> None:
+        _current.reset(token)
+        total = time.perf_counter() - metrics.started
+        match = request.resolver_match
+        route = f"{request.method} /{match.route}" if match else "unmatched"
+        registry.add(route, metrics, total)
+        response["Server-Timing"] = server_timing(metrics, total)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = self.start()
+        response = self.get_response(request)
+        self.finish(request, response, metrics, token)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = self.start()
+        response = await self.get_response(request)
+        self.finish(request, response, metrics, token)
+        return response
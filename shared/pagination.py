@@ -0,0 +1,168 @@
+import base64
+import binascii
+import json
+from typing import Any, Callable, Generic, Sequence, TypeVar
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Model, Q, QuerySet
+from ninja import Field, Schema
+from ninja.pagination import AsyncPaginationBase
+from ninja_extra.exceptions import ValidationError
+
+T = TypeVar("T")
+
+
+class CursorPage(Schema, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+
+class MergedQuerySet:
+    """
+    Disjoint subsets of ``queryset`` paginated as one feed, for OR filters
+    that no single index serves. Every branch gets the cursor, ordering and
+    page limit on its own, so each is a short scan of its own (partial)
+    index; the outer query keeps the best rows of their UNION ALL. The cost
+    follows the page size, not the table size.
+    """
+
+    def __init__(self, queryset: QuerySet, *branches: Q):
+        self.queryset = queryset
+        self.branches = branches
+
+    def page(self, ordering: Sequence[str], after: Q, limit: int) -> QuerySet:
+        if len(self.branches) == 1:
+            return self.queryset.filter(self.branches[0], after).order_by(*ordering)[
+                :limit
+            ]
+        pk = self.queryset.model._meta.pk.name
+        first, *rest = (
+            self.queryset.filter(branch, after).order_by(*ordering).values(pk)[:limit]
+            for branch in self.branches
+        )
+        return self.queryset.filter(
+            **{f"{pk}__in": first.union(*rest, all=True)}
+        ).order_by(*ordering)[:limit]
+
+
+class KeysetPagination(AsyncPaginationBase):
+    """
+    Cursor pagination over a fixed ordering.
+
+    The cursor encodes the ordering values of the last item on the page, so the
+    next page is a plain range filter on an index instead of OFFSET/COUNT, and
+    rows inserted in between never shift or duplicate already served items.
+    All ordering fields must share the same direction and the last one must be
+    unique to break ties. When a field can change in place, ``snapshot``
+    returns a token that moves with it; cursors carry the token and are
+    refused once it moved, instead of skipping or repeating rows.
+    """
+
+    class Input(Schema):
+        cursor: str | None = None
+        page_size: int | None = Field(None, ge=1)
+
+    class Output(Schema):
+        items: list[Any]
+        next_cursor: str | None = None
+
+    def __init__(
+        self,
+        *,
+        ordering: Sequence[str],
+        page_size: int = 20,
+        max_page_size: int = 100,
+        snapshot: Callable[[], str] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.snapshot = snapshot
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip("-") for field in self.ordering]
+        self.descending = self.ordering[0].startswith("-")
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        super().__init__(**kwargs)
+
+    def encode_cursor(self, item: Any) -> str:
+        values = [getattr(item, field) for field in self.fields]
+        if self.snapshot:
+            values.append(self.snapshot())
+        raw = json.dumps(values, default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str, model: type[Model]) -> list[Any]:
+        """The ordering values in ``cursor``, each parsed by its ``model`` field."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValidationError(detail="Invalid cursor", code="invalid")
+        size = len(self.fields) + bool(self.snapshot)
+        if not isinstance(values, list) or len(values) != size:
+            raise ValidationError(detail="Invalid cursor", code="invalid")
+        if self.snapshot and values.pop() != self.snapshot():
+            raise ValidationError(
+                detail="Cursor expired, start again from the first page",
+                code="expired",
+            )
+        try:
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise ValidationError(detail="Invalid cursor", code="invalid")
+        if any(value is None for value in values):
+            raise ValidationError(detail="Invalid cursor", code="invalid")
+        return values
+
+    def after(self, values: list[Any]) -> Q:
+        """(f1, f2, ...) strictly past (v1, v2, ...) in the paginator's direction."""
+        lookup = "lt" if self.descending else "gt"
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            equal = {f: v for f, v in zip(self.fields[:index], values[:index])}
+            condition |= Q(**equal, **{f"{field}__{lookup}": values[index]})
+        # Redundant, but a plain range the planner can start the index scan at
+        return Q(**{f"{self.fields[0]}__{lookup}e": values[0]}) & condition
+
+    def get_page_size(self, requested: int | None) -> int:
+        return min(requested or self.page_size, self.max_page_size)
+
+    def get_page_queryset(
+        self, queryset: QuerySet | MergedQuerySet, pagination: Input
+    ) -> QuerySet:
+        after = Q()
+        if pagination.cursor:
+            model = (
+                queryset.queryset.model
+                if isinstance(queryset, MergedQuerySet)
+                else queryset.model
+            )
+            after = self.after(self.decode_cursor(pagination.cursor, model))
+        # One extra row tells whether there is a next page without a COUNT
+        limit = self.get_page_size(pagination.page_size) + 1
+        if isinstance(queryset, MergedQuerySet):
+            return queryset.page(self.ordering, after, limit)
+        return queryset.filter(after).order_by(*self.ordering)[:limit]
+
+    def build_page(self, items: list[Any], pagination: Input) -> dict:
+        size = self.get_page_size(pagination.page_size)
+        has_next = len(items) > size
+        items = items[:size]
+        return {
+            "items": items,
+            "next_cursor": self.encode_cursor(items[-1]) if has_next else None,
+        }
+
+    def paginate_queryset(
+        self, queryset: QuerySet | MergedQuerySet, pagination: Input, **params: Any
+    ) -> Any:
+        items = list(self.get_page_queryset(queryset, pagination))
+        return self.build_page(items, pagination)
+
+    async def apaginate_queryset(
+        self, queryset: QuerySet | MergedQuerySet, pagination: Input, **params: Any
+    ) -> Any:
+        items = [item async for item in self.get_page_queryset(queryset, pagination)]
+        return self.build_page(items, pagination)
@@ -0,0 +1,33 @@
+from typing import Any
+
+import orjson
+from django.http import HttpRequest
+from ninja.parser import Parser
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+from shared.metrics import timed_serialization
+
+_encoder = NinjaJSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    UUIDs, enums and str subclasses are encoded natively; dates and times are
+    passed through to NinjaJSONEncoder so they keep the millisecond precision
+    and "Z" suffix of the stdlib renderer. The output is compact UTF-8.
+    """
+
+    media_type = "application/json"
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, request: HttpRequest, data: Any, *, response_status: int) -> Any:
+        with timed_serialization():
+            return orjson.dumps(data, default=_encoder.default, option=self.option)
+
+
+class ORJSONParser(Parser):
+    def parse_body(self, request: HttpRequest) -> dict:
+        return orjson.loads(request.body)
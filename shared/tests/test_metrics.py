@@ -0,0 +1,53 @@
+import re
+
+import pytest
+from ninja_extra import status
+
+from shared.metrics import registry
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.mark.django_db
+def test_server_timing_header(authenticated_client, recipe, django_assert_num_queries):
+    with django_assert_num_queries(2) as captured:
+        resp = authenticated_client.get("/api/kitchen/recipes/")
+
+    assert resp.status_code == status.HTTP_200_OK
+    timing = resp["Server-Timing"]
+    assert f'desc="{len(captured)} queries"' in timing
+    assert re.fullmatch(
+        r'db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=[\d.]+',
+        timing,
+    )
+
+
+@pytest.mark.django_db
+def test_metrics(get_authenticated_client, user, recipe):
+    user.is_staff = True
+    user.save()
+    authenticated_client = get_authenticated_client(user)
+    authenticated_client.get("/api/kitchen/recipes/")
+    authenticated_client.get("/api/kitchen/recipes/")
+
+    resp = authenticated_client.get("/api/metrics")
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = resp.content.decode()
+    assert "# TYPE soup_requests_total counter" in body
+    assert 'soup_requests_total{route="GET /api/kitchen/recipes/"} 2' in body
+    assert 'soup_db_queries_total{route="GET /api/kitchen/recipes/"} 4' in body
+    assert 'soup_serialize_seconds_total{route="GET /api/kitchen/recipes/"}' in body
+
+
+@pytest.mark.django_db
+def test_metrics_requires_staff(authenticated_client):
+    resp = authenticated_client.get("/api/metrics")
+
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+from django.test import RequestFactory
+from ninja.responses import NinjaJSONEncoder
+
+from kitchen.api.schemes import RecipeSchema
+from shared.renderers import ORJSONParser, ORJSONRenderer
+
+
+@pytest.mark.django_db
+def test_orjson_renderer_matches_stdlib(recipe):
+    recipe.title = "Crème brûlée"
+    data = RecipeSchema.from_orm(recipe).model_dump()
+
+    rendered = ORJSONRenderer().render(None, data, response_status=200)
+
+    expected = json.dumps(
+        data, cls=NinjaJSONEncoder, separators=(",", ":"), ensure_ascii=False
+    )
+    assert rendered == expected.encode()
+
+
+def test_orjson_parser():
+    request = RequestFactory().post(
+        "/", data=b'{"title": "Soup", "quantity": 1.5}', content_type="application/json"
+    )
+
+    assert ORJSONParser().parse_body(request) == {"title": "Soup", "quantity": 1.5}
+
+
+@pytest.mark.django_db
+def test_invalid_body_is_bad_request(authenticated_client):
+    resp = authenticated_client.post(
+        "/api/kitchen/recipes/", data=b"{", content_type="application/json"
+    )
+
+    assert resp.status_code == 400
@@ -1,9 +1,10 @@
 from ninja import Router
+from django.contrib.auth import get_user_model
 from django.http import HttpRequest, QueryDict
 from ninja_extra import status
 from social_django.utils import load_strategy, load_backend
-from ninja_jwt.tokens import RefreshToken
 from ninja_jwt.exceptions import TokenError, InvalidToken
+from ninja_jwt.settings import api_settings
 
 from users.api.schemes import (
     SocialAuthSchema,
@@ -12,6 +13,7 @@ from users.api.schemes import (
     TokenRefreshResponseSchema,
     TokenRefreshSchema,
 )
+from users.tokens import UserRefreshToken, add_user_claims
 
 router = Router()
 
@@ -37,7 +39,7 @@ def social_login(request: HttpRequest, backend: str, data: SocialAuthSchema):
 
         if user and getattr(user, "is_active", False):
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             user_data = UserSchema.model_validate(user, from_attributes=True)
             return status.HTTP_200_OK, {
                 "user": user_data,
@@ -65,13 +67,24 @@ def social_login(request: HttpRequest, backend: str, data: SocialAuthSchema):
 )
 def refresh_token(request: HttpRequest, data: TokenRefreshSchema):
     """
-    Refresh an access token using a refresh token.
+    Refresh an access token using a refresh token. The user claims are read
+    again, so staff or active changes reach the new access token.
     """
     try:
-        refresh = RefreshToken(data.refresh_token)
-        return status.HTTP_200_OK, {
-            "access_token": str(refresh.access_token),
-            "refresh_token": str(refresh),
-        }
+        refresh = UserRefreshToken(data.refresh_token)
     except (TokenError, InvalidToken) as e:
         return status.HTTP_400_BAD_REQUEST, {"error": str(e)}
+    user = (
+        get_user_model()
+        .objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]},
+            is_active=True,
+        )
+        .first()
+    )
+    if user is None:
+        return status.HTTP_400_BAD_REQUEST, {"error": "User not found or inactive"}
+    return status.HTTP_200_OK, {
+        "access_token": str(add_user_claims(refresh.access_token, user)),
+        "refresh_token": str(refresh),
+    }
@@ -11,6 +11,7 @@ from ninja_extra import (
 from ninja_extra.exceptions import APIException, PermissionDenied
 from ninja_jwt.authentication import JWTAuth
 
+from shared.budgets import query_budget
 from users.api.schemes import UserSchema, UserUpdateSchema
 
 user_model = get_user_model()
@@ -24,10 +25,12 @@ class ValidationException(APIException):
 @api_controller("/users", tags=["users"], auth=JWTAuth())
 class UserModelController(ControllerBase):
     @http_get("/me", response=UserSchema)
+    @query_budget(1)
     def me(self, request):
         return request.user
 
     @http_patch("/{uuid:uid}", response=UserSchema)
+    @query_budget(3)
     def update(self, request, uid: uuid.UUID, payload: UserUpdateSchema):
         user = request.user
         if user.uid != uid:
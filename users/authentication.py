@@ -1,36 +1,95 @@
-from typing import Optional, Any
+import uuid
+from functools import cached_property
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
 from django.http import HttpRequest
 from django.contrib.auth.models import AnonymousUser
+from django.utils.translation import gettext_lazy as _
+from ninja_jwt.authentication import AsyncJWTAuth, JWTAuth
+from ninja_jwt.exceptions import AuthenticationFailed
+from ninja_jwt.models import TokenUser as BaseTokenUser
+
+from users.tokens import has_user_claims
 
 
-class OptionalJWTAuth:
+class TokenUser(BaseTokenUser):
+    """
+    ``request.user`` built from the access token claims without a query.
+    Enough for endpoints that only need the uid, handler and flags; ``user``
+    loads the full CustomUser when something needs the model.
     """
-    JWT authentication that allows anonymous users.
-    If a valid token is provided, the user is authenticated.
-    If no token or invalid token, request.user is AnonymousUser.
 
-    This is used as auth=OptionalJWTAuth() in endpoints that should work
-    for both authenticated and unauthenticated users.
+    @cached_property
+    def uid(self) -> uuid.UUID:
+        return uuid.UUID(str(self.id))
+
+    @cached_property
+    def pk(self) -> uuid.UUID:
+        return self.uid
+
+    @cached_property
+    def handler(self) -> str | None:
+        return self.token.get("handler")
+
+    @cached_property
+    def is_active(self) -> bool:
+        return self.token.get("is_active", False)
+
+    @cached_property
+    def user(self):
+        return get_user_model().objects.get(uid=self.uid)
+
+
+class TokenUserAuthMixin:
+    def get_user(self, validated_token):
+        if not has_user_claims(validated_token):
+            # Issued before the claims were added: look the user up
+            return super().get_user(validated_token)
+        user = TokenUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"))
+        return user
+
+
+class TokenUserJWTAuth(TokenUserAuthMixin, JWTAuth):
+    """JWTAuth that sets a TokenUser on ``request.user`` instead of querying."""
+
+
+class AsyncTokenUserJWTAuth(TokenUserAuthMixin, AsyncJWTAuth):
+    async def authenticate(self, request: HttpRequest, token: str) -> Any:
+        request.user = AnonymousUser()
+        validated_token = self.get_validated_token(token)
+        if has_user_claims(validated_token):
+            user = self.get_user(validated_token)
+        else:
+            user = await sync_to_async(self.get_user)(validated_token)
+        request.user = user
+        return user
+
+
+class AsyncOptionalJWTAuth:
+    """
+    JWT authentication that allows anonymous users, for async endpoints that
+    work for both. A valid token sets a TokenUser built from its claims on
+    ``request.user``; no token or an invalid one leaves AnonymousUser. The
+    token is verified without leaving the event loop.
     """
 
-    def __call__(self, request: HttpRequest) -> Any:
-        from ninja_jwt.authentication import JWTAuth
+    def __init__(self):
+        self.jwt_auth = AsyncTokenUserJWTAuth()
 
-        # Get the Authorization header
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    async def __call__(self, request: HttpRequest) -> Any:
+        auth_header = request.META.get("HTTP_AUTHORIZATION", "")
 
-        if not auth_header or not auth_header.startswith('Bearer '):
-            # No token provided, set anonymous user and return True to allow access
+        if not auth_header or not auth_header.startswith("Bearer "):
             request.user = AnonymousUser()
             return True
 
         try:
-            # Try to authenticate with JWT
-            jwt_auth = JWTAuth()
-            result = jwt_auth(request)
+            result = await self.jwt_auth(request)
             return result if result is not None else True
         except Exception:
-            # If authentication fails, allow anonymous access
             request.user = AnonymousUser()
             return True
-
@@ -1,5 +1,9 @@
 import pytest
-from ninja_jwt.tokens import RefreshToken
+from ninja_jwt.exceptions import AuthenticationFailed
+from ninja_jwt.tokens import AccessToken, RefreshToken
+
+from users.authentication import TokenUser, TokenUserJWTAuth
+from users.tokens import UserRefreshToken
 
 
 @pytest.mark.django_db
@@ -66,3 +70,70 @@ def test_refresh_token_invalid_refresh_token_returns_400(client):
     assert resp.status_code == 400
     data = resp.json()
     assert data.get("error") or data.get("detail")
+
+
+@pytest.mark.django_db
+def test_token_user_from_claims(user, rf, django_assert_num_queries):
+    token = UserRefreshToken.for_user(user).access_token
+    request = rf.get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    with django_assert_num_queries(0):
+        TokenUserJWTAuth()(request)
+
+    assert isinstance(request.user, TokenUser)
+    assert request.user.uid == user.uid
+    assert request.user.handler == user.handler
+    assert request.user.is_authenticated
+    assert not request.user.is_staff
+    assert request.user.user == user
+
+
+@pytest.mark.django_db
+def test_token_user_inactive_claim(user, rf):
+    user.is_active = False
+    token = UserRefreshToken.for_user(user).access_token
+    request = rf.get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    with pytest.raises(AuthenticationFailed):
+        TokenUserJWTAuth()(request)
+
+
+@pytest.mark.django_db
+def test_token_without_claims_loads_user(user, rf):
+    token = RefreshToken.for_user(user).access_token
+    request = rf.get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    TokenUserJWTAuth()(request)
+
+    assert request.user == user
+
+
+@pytest.mark.django_db
+def test_refresh_token_reads_claims_again(client, user):
+    refresh = UserRefreshToken.for_user(user)
+    user.is_staff = True
+    user.save()
+
+    resp = client.post(
+        "/api/auth/token/refresh/",
+        data={"refresh_token": str(refresh)},
+        content_type="application/json",
+    )
+
+    assert resp.status_code == 200
+    assert AccessToken(resp.json()["access_token"])["is_staff"] is True
+
+
+@pytest.mark.django_db
+def test_refresh_token_inactive_user_returns_400(client, user):
+    refresh = UserRefreshToken.for_user(user)
+    user.is_active = False
+    user.save()
+
+    resp = client.post(
+        "/api/auth/token/refresh/",
+        data={"refresh_token": str(refresh)},
+        content_type="application/json",
+    )
+
+    assert resp.status_code == 400
@@ -0,0 +1,23 @@
+from ninja_jwt.tokens import RefreshToken, Token
+
+# Copied from the user into every token, so read endpoints can authorize a
+# request from the token alone (see users.authentication.TokenUser)
+USER_CLAIMS = ("handler", "is_staff", "is_active")
+
+
+def add_user_claims(token: Token, user) -> Token:
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def has_user_claims(token: Token) -> bool:
+    return all(claim in token for claim in USER_CLAIMS)
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token carrying ``USER_CLAIMS``; its access tokens copy them."""
+
+    @classmethod
+    def for_user(cls, user) -> "UserRefreshToken":
+        return add_user_claims(super().for_user(user), user)